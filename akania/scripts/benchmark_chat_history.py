@@ -0,0 +1,97 @@
+"""
+Request size and latency of long conversations: cookie history vs server-side store.
+
+Runs a conversation through /chat in-process with a fake LLM that returns long
+answers and prints, per turn:
+
+- the session cookie the previous implementation would send (the whole signed
+  chat history) and the time to sign/verify it
+- the cookie actually sent now (session id only)
+- the /chat latency and the number of history tokens put into the prompt
+
+Browsers drop cookies over 4096 bytes, so the old session silently lost its
+history once it crossed that line.
+
+Usage:
+    python akania/scripts/benchmark_chat_history.py --turns 20 --reply-words 150
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from base64 import b64decode, b64encode
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+os.environ.setdefault("KNOWLEDGE_RELOAD_INTERVAL", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from itsdangerous import TimestampSigner  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+
+import main  # noqa: E402
+
+BROWSER_COOKIE_LIMIT = 4096
+
+
+def legacy_cookie(chat_history, signer):
+    """Sign the history the way SessionMiddleware did when it lived in the cookie"""
+    start = time.perf_counter()
+    cookie = signer.sign(b64encode(json.dumps({"chat_history": chat_history}).encode("utf-8")))
+    json.loads(b64decode(signer.unsign(cookie)))
+    return len(cookie), time.perf_counter() - start
+
+
+def run(turns, reply_words):
+    reply = " ".join(f"word{i % 50}" for i in range(reply_words))
+    main.CHAT_LLM._llm = FakeListChatModel(responses=[reply])
+    signer = TimestampSigner("benchmark-secret")
+    legacy_history = []
+    rows = []
+
+    with TestClient(main.app) as client:
+        for turn in range(1, turns + 1):
+            question = f"Tell me more about African fintech companies, part {turn}"
+            cookie_bytes = len(client.cookies.get("session") or "")
+            start = time.perf_counter()
+            client.post("/chat", json={"message": question}).raise_for_status()
+            latency = time.perf_counter() - start
+
+            history = main.CONVERSATIONS.get(main_session_id(client))
+            history_tokens = sum(main.exchange_tokens(item) for item in main.trim_history(history[:-1]))
+            legacy_bytes, legacy_seconds = legacy_cookie(legacy_history, signer)
+            legacy_history = (legacy_history + [{k: history[-1][k] for k in ("user_message", "ai_response", "timestamp")}])[-20:]
+            rows.append({
+                "turn": turn,
+                "legacy_cookie_bytes": legacy_bytes,
+                "legacy_cookie_ms": round(legacy_seconds * 1000, 3),
+                "cookie_bytes": cookie_bytes,
+                "latency_ms": round(latency * 1000, 2),
+                "history_tokens": history_tokens,
+            })
+    return rows
+
+
+def main_session_id(client):
+    """Read the session id back out of the signed session cookie"""
+    payload = client.cookies.get("session").split(".")[0]
+    return json.loads(b64decode(payload + "=" * (-len(payload) % 4)))["session_id"]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark chat history transport for long conversations")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--reply-words", type=int, default=150)
+    args = parser.parse_args()
+
+    print(f"{'turn':>5} {'old cookie B':>13} {'old sign ms':>12} {'cookie B':>9} {'latency ms':>11} {'hist tokens':>12}")
+    for row in run(args.turns, args.reply_words):
+        flag = " (over browser limit)" if row["legacy_cookie_bytes"] > BROWSER_COOKIE_LIMIT else ""
+        print(f"{row['turn']:>5} {row['legacy_cookie_bytes']:>13} {row['legacy_cookie_ms']:>12} "
+              f"{row['cookie_bytes']:>9} {row['latency_ms']:>11} {row['history_tokens']:>12}{flag}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,98 @@
+"""
+Time-to-first-token benchmark: /chat vs /chat/stream with a local stub LLM.
+
+Starts the streaming-capable stub OpenAI server and the FastAPI app (uvicorn,
+one worker) in this process, sends the same questions to both endpoints and
+prints, per endpoint, the client-observed time until the first piece of the
+answer arrived and until the answer was complete.
+
+Usage:
+    python akania/scripts/benchmark_chat_stream.py --requests 20 --latency 0.3 --token-delay 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from load_test_chat import free_port, percentile  # noqa: E402
+from stub_llm_server import StubLLMServer  # noqa: E402
+
+REPLY = ("Sylndr is an Egyptian automotive marketplace that buys, refurbishes and sells used cars "
+         "with financing options for customers across Cairo and other cities.")
+
+
+async def time_blocking(client, question):
+    start = time.perf_counter()
+    response = await client.post("/chat", json={"message": question})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    # The whole answer arrives at once
+    return elapsed, elapsed
+
+
+async def time_streaming(client, question):
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/chat/stream", json={"message": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("data:") and "token" in json.loads(line[5:]):
+                first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first_token or total, total
+
+
+async def run(base_url, timer, requests):
+    samples = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await timer(client, "warm up")
+        for i in range(requests):
+            samples.append(await timer(client, f"Tell me about Sylndr ({i})"))
+    return samples
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-token for /chat and /chat/stream")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub LLM time to first token in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Stub LLM delay between tokens in seconds")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency, token_delay=args.token_delay, reply=REPLY) as stub:
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ["KNOWLEDGE_RELOAD_INTERVAL"] = "0"
+        import main
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"{'endpoint':>13} {'requests':>9} {'first p50 ms':>13} {'first p99 ms':>13} {'total p50 ms':>13}")
+        try:
+            for name, timer in (("/chat", time_blocking), ("/chat/stream", time_streaming)):
+                samples = asyncio.run(run(base_url, timer, args.requests))
+                firsts = [first for first, _ in samples]
+                totals = [total for _, total in samples]
+                print(f"{name:>13} {len(samples):>9} {statistics.median(firsts) * 1000:>13.0f} "
+                      f"{percentile(firsts, 0.99) * 1000:>13.0f} {statistics.median(totals) * 1000:>13.0f}")
+        finally:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,91 @@
+"""
+Offline benchmark: extraction prompt size before and after content reduction.
+
+Reads a directory of saved HTML pages (grouped into companies by the file name
+prefix before the first underscore, e.g. sylndr_home.html and
+sylndr_about.html), and for each company compares:
+
+- before: the scraped Documents as they used to be put into `{content}`
+- after: main-content extraction, cross-page de-duplication, relevance
+  scoring and the token budget
+
+and the time the reduction takes. LLM extraction time grows with the input
+tokens, so the token reduction is also the expected extraction speed-up.
+
+Usage:
+    python akania/scripts/benchmark_content_reduction.py --budget 1500
+    python akania/scripts/benchmark_content_reduction.py --html-dir saved_pages/ --name sylndr=Sylndr
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+
+from content_reducer import estimate_tokens, reduce_documents  # noqa: E402
+from fetcher import html_to_document  # noqa: E402
+
+DEFAULT_HTML_DIR = os.path.join(ROOT_DIR, 'akania', 'tests', 'fixtures', 'html')
+
+
+def load_companies(html_dir):
+    pages = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(html_dir, '*.html'))):
+        prefix = os.path.basename(path).split('_')[0]
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[prefix].append((f"https://{prefix}.example/{os.path.basename(path)}", f.read()))
+    return pages
+
+
+def run(html_dir, budget, names):
+    results = []
+    for prefix, pages in load_companies(html_dir).items():
+        company_name = names.get(prefix, prefix)
+        raw_docs = [html_to_document(url, html) for url, html in pages]
+        # The prompt template rendered the Document list with str()
+        tokens_before = estimate_tokens(str(raw_docs))
+
+        start = time.perf_counter()
+        docs = [html_to_document(url, html, main_content=True) for url, html in pages]
+        reduced = reduce_documents(docs, company_name, token_budget=budget)
+        reduce_seconds = time.perf_counter() - start
+
+        results.append({
+            "company": company_name,
+            "pages": len(pages),
+            "tokens_before": tokens_before,
+            "tokens_after": reduced.tokens_after,
+            "duplicates": reduced.duplicates,
+            "reduce_ms": round(reduce_seconds * 1000, 2),
+        })
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark content reduction before LLM extraction")
+    parser.add_argument("--html-dir", default=DEFAULT_HTML_DIR)
+    parser.add_argument("--budget", type=int, default=4000, help="Token budget per company")
+    parser.add_argument("--name", action="append", default=[],
+                        help="Company name for a file prefix, e.g. sylndr=Sylndr (default: the prefix)")
+    args = parser.parse_args()
+    names = dict(item.split("=", 1) for item in args.name)
+
+    rows = run(args.html_dir, args.budget, names)
+    print(f"{'company':<16} {'pages':>6} {'tokens before':>14} {'tokens after':>13} {'saved':>7} "
+          f"{'dup paras':>10} {'reduce ms':>10}")
+    for row in rows:
+        saved = 1 - row["tokens_after"] / row["tokens_before"] if row["tokens_before"] else 0.0
+        print(f"{row['company']:<16} {row['pages']:>6} {row['tokens_before']:>14} {row['tokens_after']:>13} "
+              f"{saved:>7.0%} {row['duplicates']:>10} {row['reduce_ms']:>10}")
+    before = sum(row["tokens_before"] for row in rows)
+    after = sum(row["tokens_after"] for row in rows)
+    if before:
+        print(f"Total: {before} -> {after} tokens ({1 - after / before:.0%} less)")
+
+
+if __name__ == "__main__":
+    main_cli()
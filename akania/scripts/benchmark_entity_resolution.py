@@ -0,0 +1,84 @@
+"""
+Speed and accuracy of duplicate detection over company profiles.
+
+Generates N synthetic companies with pronounceable names, own websites and
+countries, then adds a variant of every tenth one the way extraction produces
+them ("Kamozu Foods" -> "Kamozu Foods SARL", "KAMOZU-FOODS", "The Kamozu
+Foods Ltd"). Runs find_duplicates() (the bulk pass) and reports its time, the
+number of profile comparisons against the N*(N-1)/2 of comparing every pair,
+and precision/recall of the groups against the planted duplicates.
+
+Usage:
+    python akania/scripts/benchmark_entity_resolution.py --profiles 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+
+import entity_resolution  # noqa: E402
+
+SYLLABLES = ["ka", "mo", "zu", "le", "ri", "ba", "no", "ti", "se", "wa", "pe", "du", "fo", "gi", "ya", "ko"]
+WORDS = ["Foods", "Pay", "Logistics", "Energy", "Health", "Motors", "Farms", "Bank", "Tech", "Retail"]
+COUNTRIES = ["Kenya", "Nigeria", "Egypt", "Ghana", "Senegal", "Morocco", "Uganda", "Rwanda", "Ethiopia"]
+
+
+def company_name(rng: random.Random) -> str:
+    stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{stem.title()} {rng.choice(WORDS)}"
+
+
+def variant(name: str, rng: random.Random) -> str:
+    return rng.choice([f"{name} SARL", name.upper().replace(" ", "-"), f"The {name} Ltd", f"{name} S.A."])
+
+
+def synthetic_profiles(count: int, seed: int = 7):
+    """(profiles, set of frozensets of names that are the same company)"""
+    rng = random.Random(seed)
+    profiles, names, duplicates = [], set(), set()
+    while len(profiles) < count:
+        name = company_name(rng)
+        if entity_resolution.canonical_name(name) in names:
+            continue
+        names.add(entity_resolution.canonical_name(name))
+        domain = name.lower().replace(" ", "") + rng.choice([".com", ".co.ke", ".africa"])
+        base = {"company_name": name, "countries": rng.sample(COUNTRIES, rng.randint(1, 2)),
+                "source_urls": [f"https://www.{domain}/", "https://www.linkedin.com/company/x"]}
+        profiles.append(base)
+        if len(profiles) % 10 == 0:
+            other = variant(name, rng)
+            profiles.append({**base, "company_name": other, "source_urls": [f"https://{domain}/about"]})
+            duplicates.add(frozenset((name, other)))
+    rng.shuffle(profiles)
+    return profiles, duplicates
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Speed and accuracy of duplicate detection")
+    parser.add_argument("--profiles", type=int, default=100000)
+    args = parser.parse_args()
+
+    profiles, planted = synthetic_profiles(args.profiles)
+    index = entity_resolution.EntityIndex()
+    start = time.perf_counter()
+    groups = entity_resolution.find_duplicates(profiles, index)
+    seconds = time.perf_counter() - start
+    comparisons = index.comparisons
+
+    found = {frozenset(p["company_name"] for p in group) for group in groups}
+    true_positives = len(found & planted)
+    pairs = len(profiles) * (len(profiles) - 1) // 2
+    print(f"{len(profiles)} profiles ({len(planted)} planted duplicates): "
+          f"{seconds:.2f}s, {seconds / len(profiles) * 1e6:.0f}us per profile")
+    print(f"  comparisons: {comparisons} ({comparisons / len(profiles):.1f} per profile, "
+          f"all pairs would be {pairs})")
+    print(f"  groups found: {len(found)}, precision {true_positives / max(1, len(found)):.3f}, "
+          f"recall {true_positives / max(1, len(planted)):.3f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,77 @@
+"""
+Benchmark: load and query time of the profile store backends at scale.
+
+Writes N synthetic profiles into the one-JSON-file-per-company layout and into
+the SQLite store, then times a full load, a lookup by name and a country +
+sector query on each.
+
+Usage:
+    python akania/scripts/benchmark_profile_store.py --sizes 10000 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+
+from profile_store import JsonDirectoryProfileStore, SQLiteProfileStore  # noqa: E402
+
+COUNTRIES = ["Kenya", "Egypt", "Nigeria", "Ghana", "Mozambique", "Lesotho", "DRC", "Senegal", "Rwanda", "Morocco"]
+SECTORS = ["Agriculture", "Fintech", "Retail", "Automotive", "Healthcare", "Energy", "Logistics", "Aquaculture"]
+
+
+def synthetic_profiles(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "company_name": f"Company {i:06d}",
+            "countries": rng.sample(COUNTRIES, rng.randint(1, 3)),
+            "sector": rng.sample(SECTORS, rng.randint(1, 2)),
+            "business_description": "A synthetic African company used for benchmarking. " * 4,
+            "key_people": [{"name": f"Person {i}", "title": "CEO"}],
+            "transactions": None,
+            "source_urls": [f"https://company{i}.example.com"],
+        }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_store(name, store, size):
+    _, write_ms = timed(lambda: store.upsert_many(synthetic_profiles(size)))
+    profiles, load_ms = timed(store.all)
+    _, get_ms = timed(lambda: store.get(f"company {size // 2:06d}"))
+    matches, find_ms = timed(lambda: store.find(country="Kenya", sector="Fintech"))
+    print(f"{name:>7} {size:>8} {write_ms:>10.0f} {load_ms:>10.0f} {get_ms:>10.2f} {find_ms:>10.2f} {len(matches):>8}")
+    assert len(profiles) == size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark profile store backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000])
+    parser.add_argument("--skip-json", action="store_true", help="Only benchmark the SQLite store")
+    args = parser.parse_args()
+
+    print(f"{'backend':>7} {'profiles':>8} {'write ms':>10} {'load ms':>10} {'get ms':>10} {'find ms':>10} {'matches':>8}")
+    for size in args.sizes:
+        work_dir = tempfile.mkdtemp(prefix="profile_store_bench_")
+        try:
+            if not args.skip_json:
+                bench_store("json", JsonDirectoryProfileStore(os.path.join(work_dir, "json")), size)
+            sqlite_store = SQLiteProfileStore(os.path.join(work_dir, "profiles.sqlite"))
+            bench_store("sqlite", sqlite_store, size)
+            sqlite_store.close()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Memory footprint and query latency of the columnar profile table.
+
+Builds N synthetic profiles and compares, for facet queries such as
+country=Kenya or country=Kenya & sector=Fintech with a page of 20:
+
+- scan: filtering the plain list of profile dicts (what a query over the
+  knowledge base had to do before; also the JSON store's find())
+- sqlite: the SQLite profile store's indexed find()
+- table: ProfileTable.select() / page() (backend/profile_table.py)
+
+and the memory of the profile dicts, of the equivalent listing rows as plain
+dicts (name, countries, sector), and of the table (tracemalloc).
+
+Usage:
+    python akania/scripts/benchmark_profile_table.py --profiles 100000
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_profile_store import synthetic_profiles  # noqa: E402
+from profile_store import SQLiteProfileStore, normalize_facet  # noqa: E402
+from profile_table import ProfileTable  # noqa: E402
+
+QUERIES = [
+    {"country": "Kenya"},
+    {"country": "Kenya", "sector": "Fintech"},
+    {"sector": "Agriculture", "offset": 500},
+]
+
+
+def allocated(build):
+    """(result, bytes allocated by build and still alive)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed_us(fn, repeat: int) -> float:
+    """Median microseconds of fn()"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def scan(profiles, country=None, sector=None, offset=0, limit=20):
+    country_key, sector_key = normalize_facet(country), normalize_facet(sector)
+    matches = [
+        p for p in profiles
+        if (not country_key or country_key in {normalize_facet(c) for c in p.get("countries") or []})
+        and (not sector_key or sector_key in {normalize_facet(s) for s in p.get("sector") or []})
+    ]
+    return len(matches), matches[offset:offset + limit]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Memory and latency of the columnar profile table")
+    parser.add_argument("--profiles", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    profiles, profiles_bytes = allocated(lambda: list(synthetic_profiles(args.profiles)))
+    rows, rows_bytes = allocated(lambda: [
+        {"company_name": p["company_name"], "countries": list(p["countries"]), "sector": list(p["sector"])}
+        for p in profiles
+    ])
+    del rows
+    _, table_bytes = allocated(lambda: ProfileTable(profiles))
+    start = time.perf_counter()  # Timed again without tracemalloc's overhead
+    table = ProfileTable(profiles)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    mib = 1024 * 1024
+    print(f"{args.profiles} profiles")
+    print(f"  profile dicts:          {profiles_bytes / mib:8.1f} MiB")
+    print(f"  listing rows as dicts:  {rows_bytes / mib:8.1f} MiB")
+    print(f"  profile table:          {table_bytes / mib:8.1f} MiB (built in {build_ms:.0f}ms)")
+
+    with tempfile.TemporaryDirectory(prefix="profile_table_bench_") as work_dir:
+        store = SQLiteProfileStore(os.path.join(work_dir, "profiles.sqlite"))
+        store.upsert_many(profiles)
+
+        print(f"\n{'query':<42}{'matches':>8}{'scan us':>12}{'sqlite us':>12}{'table us':>10}")
+        for query in QUERIES:
+            options = {"offset": 0, **query}
+            total, page = table.page(limit=20, **options)
+            scan_total, scan_page = scan(profiles, limit=20, **options)
+            assert (total, [row["company_name"] for row in page]) == \
+                (scan_total, [p["company_name"] for p in scan_page])
+            scan_us = timed_us(lambda: scan(profiles, limit=20, **options), max(3, args.repeat // 10))
+            sqlite_us = timed_us(lambda: store.find(limit=20, **options), args.repeat)
+            table_us = timed_us(lambda: table.page(limit=20, **options), args.repeat)
+            label = " & ".join(f"{key}={value}" for key, value in query.items())
+            print(f"{label:<42}{total:>8}{scan_us:>12.0f}{sqlite_us:>12.0f}{table_us:>10.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,73 @@
+"""
+Latency of the query router against a large knowledge snapshot.
+
+Builds a snapshot of N synthetic profiles and reports, per question, whether
+the router answers it and how long routing takes (median), next to the time
+retrieval plus prompt building takes for the same question on the LLM path
+(which is then followed by the completion itself). Also reports the one-off
+cost of indexing names and facet values for a new knowledge generation.
+
+Usage:
+    python akania/scripts/benchmark_query_router.py --profiles 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_profile_store import synthetic_profiles  # noqa: E402
+from knowledge import KnowledgeSnapshot, profile_key  # noqa: E402
+from query_router import QueryRouter  # noqa: E402
+from retrieval import KnowledgeIndex  # noqa: E402
+
+QUESTIONS = [
+    "Which companies operate in Kenya?",
+    "How many fintech companies are in Nigeria?",
+    "Who is the CEO of Company 004242?",
+    "Where does Company 012345 operate?",
+    "Tell me about fintech companies expanding into Kenya",
+]
+
+
+def timed_us(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Latency of the query router")
+    parser.add_argument("--profiles", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    profiles = list(synthetic_profiles(args.profiles))
+    index = KnowledgeIndex()
+    index.build(profiles)
+    snapshot = KnowledgeSnapshot(1, {profile_key(p): p for p in profiles}, index)
+    router = QueryRouter()
+
+    start = time.perf_counter()
+    router.phrase_index(snapshot)
+    print(f"{args.profiles} profiles: profile table + phrase index built in "
+          f"{(time.perf_counter() - start) * 1000:.0f}ms (once per knowledge generation)")
+
+    print(f"\n{'question':<56}{'route':>10}{'router us':>11}{'retrieval us':>14}")
+    for question in QUESTIONS:
+        routed = router.route(question, snapshot)
+        router_us = timed_us(lambda: router.route(question, snapshot), args.repeat)
+        retrieval_us = timed_us(lambda: index.search(question, top_k=5), max(3, args.repeat // 10))
+        print(f"{question:<56}{routed.intent if routed else 'llm':>10}{router_us:>11.0f}{retrieval_us:>14.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,108 @@
+"""
+Offline benchmark: chat prompt size and latency as the knowledge base grows.
+
+Generates synthetic corpora from the profiles in data/, builds the retrieval
+index, and answers a fixed set of questions through get_ai_response with a
+stubbed LLM, comparing against stuffing every profile into the prompt.
+
+Usage:
+    python akania/scripts/benchmark_retrieval.py --sizes 10 100 1000 5000
+"""
+import argparse
+import asyncio
+import copy
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+
+import main  # noqa: E402
+
+QUESTIONS = [
+    "Tell me about Sylndr",
+    "Who is the founder of Lapaire Glasses?",
+    "Which companies operate in Mozambique?",
+    "What sectors are represented?",
+]
+
+
+def load_seed_profiles():
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(ROOT_DIR, 'data', '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles.append(json.load(f))
+    return profiles
+
+
+def synthetic_corpus(seed_profiles, size):
+    """Clone the seed profiles under distinct names until the corpus has `size` entries"""
+    corpus = []
+    for i in range(size):
+        company = copy.deepcopy(seed_profiles[i % len(seed_profiles)])
+        if i >= len(seed_profiles):
+            company['company_name'] = f"{company['company_name']} Variant {i}"
+        corpus.append(company)
+    return corpus
+
+
+def run(sizes, top_k, use_embeddings):
+    seed_profiles = load_seed_profiles()
+    stub_llm = FakeListChatModel(responses=["stub answer"])
+    original_companies = main.KNOWLEDGE.snapshot.companies
+    results = []
+
+    try:
+        for size in sizes:
+            corpus = synthetic_corpus(seed_profiles, size)
+
+            main.KNOWLEDGE.use_embeddings = use_embeddings
+            start = time.perf_counter()
+            snapshot = main.KNOWLEDGE.replace(corpus)
+            build_seconds = time.perf_counter() - start
+
+            full_prompt_chars = sum(len(main.format_company_context(company)) for company in corpus)
+            prompt_chars = []
+            latencies = []
+            for question in QUESTIONS:
+                messages = main.build_chat_messages(question, [], snapshot=snapshot, top_k=top_k)
+                prompt_chars.append(sum(len(content) for _, content in messages))
+
+                start = time.perf_counter()
+                asyncio.run(main.get_ai_response(question, [], llm=stub_llm))
+                latencies.append(time.perf_counter() - start)
+
+            results.append({
+                "profiles": size,
+                "index_build_ms": round(build_seconds * 1000, 2),
+                "avg_prompt_chars": round(sum(prompt_chars) / len(prompt_chars)),
+                "stuffed_prompt_chars": full_prompt_chars,
+                "avg_response_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            })
+    finally:
+        main.KNOWLEDGE.use_embeddings = main.RETRIEVAL_USE_EMBEDDINGS
+        main.KNOWLEDGE.replace(original_companies)
+
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval-based chat prompts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embeddings", action="store_true", help="Enable embedding re-ranking")
+    args = parser.parse_args()
+
+    print(f"{'profiles':>9} {'build ms':>10} {'prompt chars':>13} {'stuffed chars':>14} {'response ms':>12}")
+    for row in run(args.sizes, args.top_k, args.embeddings):
+        print(f"{row['profiles']:>9} {row['index_build_ms']:>10} {row['avg_prompt_chars']:>13} "
+              f"{row['stuffed_prompt_chars']:>14} {row['avg_response_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main_cli()
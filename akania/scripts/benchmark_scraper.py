@@ -0,0 +1,83 @@
+"""
+Throughput benchmark: concurrent scraper vs the old sequential WebBaseLoader loop.
+
+Serves synthetic pages with a fixed artificial latency from a local HTTP server
+(spread over several fake hosts on 127.0.0.x loopback addresses) and scrapes them both ways.
+
+Usage:
+    python akania/scripts/benchmark_scraper.py --pages 30 --latency 0.1
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+
+from langchain_community.document_loaders import WebBaseLoader  # noqa: E402
+
+from scraper import scrape_urls  # noqa: E402
+
+PAGE = "<html><head><title>Company page</title></head><body>{}</body></html>"
+
+
+def make_handler(latency):
+    class LatencyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = PAGE.format("Company profile text. " * 200).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return LatencyHandler
+
+
+def legacy_scrape_urls(urls):
+    """The previous implementation: a fresh WebBaseLoader per URL, one at a time"""
+    scraped_docs = []
+    for url in urls:
+        try:
+            scraped_docs.extend(WebBaseLoader([url]).load())
+        except Exception as e:
+            print(f"Failed to scrape {url}: {e}")
+    return scraped_docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraping throughput")
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.1, help="Artificial server latency in seconds")
+    parser.add_argument("--hosts", type=int, default=3, help="Number of distinct hosts to spread pages over")
+    args = parser.parse_args()
+
+    # One loopback server per fake host so per-host limits apply as in production
+    servers = []
+    for i in range(args.hosts):
+        server = ThreadingHTTPServer((f"127.0.0.{i + 1}", 0), make_handler(args.latency))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    hosts = [f"{host}:{port}" for host, port in (server.server_address for server in servers)]
+    urls = [f"http://{hosts[i % len(hosts)]}/page/{i}" for i in range(args.pages)]
+
+    try:
+        for name, scrape in (("sequential", legacy_scrape_urls), ("concurrent", scrape_urls)):
+            start = time.perf_counter()
+            docs = scrape(urls)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>11}: {len(docs)} pages in {elapsed:.2f}s ({len(docs) / elapsed:.1f} pages/s)")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
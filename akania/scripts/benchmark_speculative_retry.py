@@ -0,0 +1,129 @@
+"""
+Latency of sequential vs speculative retries in extract_company_data.
+
+Runs offline on the benchmark suite's fixtures (recorded Tavily responses, the
+saved HTML pages served locally, the stub LLM) with fixed latencies, for two
+kinds of companies:
+
+- easy: the first query finds the company's pages and the extraction is complete
+- hard: the first query only finds the home page, whose extraction lacks the
+  key fields, so the alternate query has to be tried too
+
+Sequential mode searches again after an incomplete first attempt; speculative
+mode runs both attempts at once and shares the scraped pages. Prints p50/p99
+latency per mode and kind, and the LLM calls and page fetches per company
+(the cost of speculating).
+
+Usage:
+    python akania/scripts/benchmark_speculative_retry.py --companies 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from benchmark_suite import (  # noqa: E402  (also puts akania/src on sys.path)
+    BENCHMARK_COMPANIES,
+    FixtureSiteServer,
+    RecordedTavilySearch,
+    isolate_environment,
+    latency_summary,
+    load_company_info_fixture,
+)
+
+
+class ThinFirstResultSearch(RecordedTavilySearch):
+    """Recorded search where the first query for a "hard" company only finds its home page"""
+
+    def invoke(self, payload):
+        from assistant import first_search_query
+
+        response = super().invoke(payload)
+        query = payload["query"]
+        if " hard " in query and query.startswith(first_search_query("").strip()):
+            response["results"] = response["results"][:1]
+        return response
+
+
+class ThinPageChain:
+    """Extraction chain that only gets the company name out of a single page"""
+
+    def __init__(self, chain):
+        self.chain = chain
+
+    def invoke(self, inputs):
+        from company_profiles import CompanyInfo
+
+        result = self.chain.invoke(inputs)
+        if result is not None and len(inputs["urls"]) < 2:
+            return CompanyInfo(company_name=result.company_name, source_urls=list(inputs["urls"]))
+        return result
+
+
+def run(companies: int, search_latency: float, page_latency: float, llm_latency: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="speculative_bench_") as work_dir:
+        isolate_environment(work_dir)
+        os.environ["PAGE_CACHE_ENABLED"] = "false"  # Every attempt really fetches its pages
+
+        from langchain_openai import ChatOpenAI
+
+        from assistant import build_extraction_chain, extract_company_data, is_result_incomplete
+        from stub_llm_server import StubLLMServer
+
+        results = {}
+        with FixtureSiteServer(latency=page_latency) as site, \
+                StubLLMServer(latency=llm_latency, structured_replies=load_company_info_fixture()) as stub:
+            search = ThinFirstResultSearch(site.base_url, latency=search_latency)
+            chain = ThinPageChain(build_extraction_chain(ChatOpenAI(
+                model="gpt-4o-mini-2024-07-18", base_url=stub.base_url, api_key="stub-key")))
+
+            for mode in ("sequential", "speculative"):
+                for kind in ("easy", "hard"):
+                    latencies, incomplete = [], 0
+                    llm_before, pages_before = stub.requests, site.requests
+                    for i in range(companies):
+                        company = BENCHMARK_COMPANIES[i % len(BENCHMARK_COMPANIES)]
+                        name, country = company.split(" (")
+                        # Distinct queries so the search cache never short-circuits an attempt
+                        query = f"{name} {mode} {kind} {i} ({country}"
+                        start = time.perf_counter()
+                        result = extract_company_data(query, speculative=(mode == "speculative"),
+                                                      search=search, chain=chain)
+                        latencies.append(time.perf_counter() - start)
+                        incomplete += is_result_incomplete(result)
+                    # Abandoned attempts may still be finishing their LLM call
+                    time.sleep(llm_latency + page_latency)
+                    results[(mode, kind)] = {
+                        **latency_summary(latencies),
+                        "incomplete": incomplete,
+                        "llm_calls_per_company": round((stub.requests - llm_before) / companies, 2),
+                        "page_fetches_per_company": round((site.requests - pages_before) / companies, 2),
+                    }
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare sequential and speculative extraction retries")
+    parser.add_argument("--companies", type=int, default=10, help="Companies per kind (easy, hard) and mode")
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = run(args.companies, args.search_latency, args.page_latency, args.llm_latency)
+
+    print(f"\nsearch {args.search_latency * 1000:.0f}ms, page {args.page_latency * 1000:.0f}ms, "
+          f"LLM {args.llm_latency * 1000:.0f}ms, {args.companies} companies per row")
+    print(f"{'mode':<12}{'kind':<6}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'LLM/co':>8}{'pages/co':>10}"
+          f"{'incomplete':>12}")
+    for (mode, kind), row in results.items():
+        print(f"{mode:<12}{kind:<6}{row['p50_ms']:>9.0f}{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}"
+              f"{row['llm_calls_per_company']:>8}{row['page_fetches_per_company']:>10}{row['incomplete']:>12}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,108 @@
+"""
+Cold-start benchmark for the chat server.
+
+Starts `uvicorn main:app` in a fresh process (optionally over a synthetic
+SQLite profile store with N profiles) and polls it to measure:
+
+- live: time until the server answers at all (/health/live, or /health on
+  versions without it)
+- ready: time until the knowledge base is loaded (/health/ready answers 200;
+  on versions without it, the first /health answer, since those loaded the
+  knowledge base before serving)
+
+and prints the startup breakdown the server reports. Point --backend-dir at
+another checkout (e.g. a git worktree of an older commit) to compare.
+
+Usage:
+    python akania/scripts/benchmark_startup.py --profiles 10000 --runs 3
+    python akania/scripts/benchmark_startup.py --backend-dir /tmp/old/backend
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_profile_store import synthetic_profiles  # noqa: E402
+from load_test_chat import free_port  # noqa: E402
+from profile_store import SQLiteProfileStore  # noqa: E402
+
+
+def wait_for(client: httpx.Client, paths, deadline: float):
+    """Poll until one of `paths` answers 200; returns (path, response)"""
+    while time.perf_counter() < deadline:
+        for path in paths:
+            try:
+                response = client.get(path)
+            except httpx.TransportError:
+                break  # Not listening yet
+            if response.status_code == 200:
+                return path, response
+        time.sleep(0.01)
+    raise TimeoutError(f"server did not answer {paths} in time")
+
+
+def measure_once(backend_dir: str, env: dict, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            deadline = started + timeout
+            live_path, _ = wait_for(client, ["/health/live", "/health"], deadline)
+            live = time.perf_counter() - started
+            if live_path == "/health/live":
+                _, ready_response = wait_for(client, ["/health/ready"], deadline)
+                startup = ready_response.json().get("startup", {})
+            else:
+                startup = {}
+            ready = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"live_ms": live * 1000, "ready_ms": ready * 1000, "startup": startup}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure chat server cold start (liveness and readiness)")
+    parser.add_argument("--backend-dir", default=os.path.join(ROOT_DIR, 'backend'))
+    parser.add_argument("--profiles", type=int, default=0,
+                        help="Serve a synthetic SQLite store with this many profiles (0: the configured store)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, KNOWLEDGE_RELOAD_INTERVAL="0", OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "stub-key"))
+    with tempfile.TemporaryDirectory(prefix="startup_bench_") as work_dir:
+        if args.profiles:
+            db_path = os.path.join(work_dir, "profiles.sqlite")
+            store = SQLiteProfileStore(db_path)
+            store.upsert_many(synthetic_profiles(args.profiles))
+            store.close()
+            env["PROFILE_STORE_URL"] = f"sqlite:///{db_path}"
+            env["KNOWLEDGE_INDEX_PATH"] = os.path.join(work_dir, "index", "knowledge_index.json")
+
+        runs = [measure_once(args.backend_dir, env, args.timeout) for _ in range(args.runs)]
+
+    print(f"{'run':>4} {'live ms':>10} {'ready ms':>10}  server breakdown")
+    for i, run in enumerate(runs, 1):
+        breakdown = " ".join(f"{phase}={value}" for phase, value in run["startup"].items())
+        print(f"{i:>4} {run['live_ms']:>10.0f} {run['ready_ms']:>10.0f}  {breakdown}")
+    print(f"median live {statistics.median(r['live_ms'] for r in runs):.0f}ms, "
+          f"ready {statistics.median(r['ready_ms'] for r in runs):.0f}ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,458 @@
+"""
+Offline benchmark suite for the whole system, for comparing commits.
+
+Runs without network access or API keys:
+
+- recorded Tavily responses (akania/tests/fixtures/tavily/responses.json) are
+  replayed with a fixed search latency
+- the saved HTML pages (akania/tests/fixtures/html) are served by a local HTTP
+  server with a fixed page latency
+- the LLM is the local stub OpenAI server, which answers extraction requests
+  with the canned CompanyInfo profiles (akania/tests/fixtures/llm)
+
+and measures website discovery, scraping, extraction pipeline throughput
+(one LLM call per company, and batched multi-company calls), profile store / knowledge base load time and /chat latency under concurrent
+users. Results are written to a JSON file; --compare prints the change of the
+headline metrics against an earlier results file.
+
+Usage:
+    python akania/scripts/benchmark_suite.py --output bench.json
+    python akania/scripts/benchmark_suite.py --quick --only discovery scraping
+    python akania/scripts/benchmark_suite.py --output new.json --compare old.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (os.path.join(ROOT_DIR, 'akania', 'src'), os.path.join(ROOT_DIR, 'backend'), SCRIPTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'akania', 'tests', 'fixtures')
+HTML_DIR = os.path.join(FIXTURES_DIR, 'html')
+TAVILY_FIXTURE = os.path.join(FIXTURES_DIR, 'tavily', 'responses.json')
+COMPANY_INFO_FIXTURE = os.path.join(FIXTURES_DIR, 'llm', 'company_info.json')
+
+BENCHMARK_COMPANIES = ["Sylndr (Egypt)", "Lapaire Glasses (Kenya)"]
+SECTIONS = ("discovery", "scraping", "pipeline", "profile_store", "chat")
+
+# Metrics compared by --compare, and whether a larger value is better
+HEADLINE_METRICS = {
+    "discovery.cold_p50_ms": False,
+    "discovery.warm_p50_ms": False,
+    "scraping.pages_per_second": True,
+    "pipeline.companies_per_second": True,
+    "pipeline_batched.companies_per_second": True,
+    "pipeline_batched.llm_calls_per_company": False,
+    "profile_store.knowledge_load_ms": False,
+    "chat.p50_ms": False,
+    "chat.p99_ms": False,
+    "chat.requests_per_second": True,
+}
+
+
+class RecordedTavilySearch:
+    """Replays recorded Tavily responses in place of TavilySearch.invoke"""
+
+    def __init__(self, base_url: str, path: str = TAVILY_FIXTURE, latency: float = 0.0):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.responses = json.load(f)
+        self.base_url = base_url
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, payload: Dict) -> Dict:
+        query = payload["query"]
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        for company_key, response in self.responses.items():
+            if company_key in query.lower():
+                response = copy.deepcopy(response)
+                response["query"] = query
+                for result in response["results"]:
+                    result["url"] = result["url"].replace("{base_url}", self.base_url)
+                return response
+        return {"query": query, "results": [], "response_time": 0.0}
+
+
+class _SiteHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FixtureSiteServer:
+    """Serves the saved HTML pages locally with a fixed latency per request"""
+
+    def __init__(self, html_dir: str = HTML_DIR, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.html_dir = html_dir
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _SiteHTTPServer((host, 0), self._make_handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page_urls(self) -> List[str]:
+        return [f"{self.base_url}/{name}" for name in sorted(os.listdir(self.html_dir)) if name.endswith(".html")]
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site._lock:
+                    site.requests += 1
+                time.sleep(site.latency)
+                name = os.path.basename(self.path.split("?")[0])
+                path = os.path.join(site.html_dir, name)
+                if not name.endswith(".html") or not os.path.exists(path):
+                    self.send_error(404)
+                    return
+                with open(path, 'rb') as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FixtureSiteServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def load_company_info_fixture() -> List[Dict]:
+    with open(COMPANY_INFO_FIXTURE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def isolate_environment(work_dir: str):
+    """Point every cache and store at a scratch directory and switch off network-bound extras"""
+    os.environ["PAGE_CACHE_DIR"] = os.path.join(work_dir, "page_cache")
+    os.environ["SEARCH_CACHE_DB"] = os.path.join(work_dir, "search_cache.sqlite")
+    os.environ["PROFILE_STORE_URL"] = f"sqlite:///{os.path.join(work_dir, 'profiles.sqlite')}"
+    os.environ["FINGERPRINT_DB"] = os.path.join(work_dir, "fingerprints.sqlite")
+    os.environ["KNOWLEDGE_INDEX_PATH"] = os.path.join(work_dir, "index", "knowledge_index.json")
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ["KNOWLEDGE_RELOAD_INTERVAL"] = "0"
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+
+
+def latency_summary(seconds: List[float]) -> Dict:
+    from load_test_chat import percentile
+
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 0.99) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2),
+    }
+
+
+def bench_discovery(site: FixtureSiteServer, search_latency: float, rounds: int) -> Dict:
+    """Website discovery per company: cold (API call) and warm (search cache hit)"""
+    from search_cache import SearchCache
+    from website_discovery import WebsiteDiscoveryService
+
+    tavily = RecordedTavilySearch(site.base_url, latency=search_latency)
+    cold, warm = [], []
+    for _ in range(rounds):
+        service = WebsiteDiscoveryService(search_cache=SearchCache())
+        service.tavily_search = tavily
+        service.serp_search = None
+        service.engines = {}
+        service.register_engine("tavily", service.search_with_tavily)
+        for company in BENCHMARK_COMPANIES:
+            for samples in (cold, warm):
+                start = time.perf_counter()
+                urls = service.discover_company_websites(company)
+                samples.append(time.perf_counter() - start)
+                assert urls, f"no URLs discovered for {company}"
+    cold_summary, warm_summary = latency_summary(cold), latency_summary(warm)
+    return {
+        "lookups": len(cold) + len(warm),
+        "api_calls": tavily.calls,
+        "cold_p50_ms": cold_summary["p50_ms"],
+        "cold_p99_ms": cold_summary["p99_ms"],
+        "warm_p50_ms": warm_summary["p50_ms"],
+        "warm_p99_ms": warm_summary["p99_ms"],
+    }
+
+
+def bench_scraping(site: FixtureSiteServer, copies: int) -> Dict:
+    """Concurrent scraping of the fixture pages (page cache and rate limiting off)"""
+    from scraper import scrape_urls_async
+    from telemetry import trace_run
+
+    urls = [f"{url}?copy={i}" for i in range(copies) for url in site.page_urls()]
+
+    async def scrape():
+        return await scrape_urls_async(urls, main_content=True, cache=None, rate_limiter=None)
+
+    with trace_run("scraping") as run:
+        start = time.perf_counter()
+        documents = asyncio.run(scrape())
+        wall = time.perf_counter() - start
+    fetch = run.summary().get("fetch", {})
+    return {
+        "pages": len(urls),
+        "scraped": len(documents),
+        "wall_seconds": round(wall, 3),
+        "pages_per_second": round(len(documents) / wall, 2) if wall else 0.0,
+        "fetch_p50_ms": fetch.get("p50_ms"),
+        "fetch_p95_ms": fetch.get("p95_ms"),
+        "bytes": fetch.get("bytes", 0),
+    }
+
+
+def bench_pipeline(site: FixtureSiteServer, search_latency: float, llm_latency: float, companies: int,
+                   batch_token_budget: int = 0) -> Dict:
+    """Batch extraction throughput: replayed search, local pages, stub LLM, real chain and store"""
+    from langchain_openai import ChatOpenAI
+
+    from assistant import (build_batch_extraction_chain, build_extraction_chain, format_batch_sections,
+                           search_company_urls)
+    from company_profiles import save_company_profile
+    from extraction_orchestrator import ExtractionPipeline
+    from scraper import scrape_urls_async
+    from stub_llm_server import StubLLMServer
+
+    tavily = RecordedTavilySearch(site.base_url, latency=search_latency)
+    # Distinct queries (also between the single and batched runs) so neither the
+    # search cache nor the checkpoint short-circuits the run
+    run_label = "batched " if batch_token_budget else ""
+    queries = [f"{company.split(' (')[0]} {run_label}{i} ({company.split('(')[1]}"
+               for i in range(companies // len(BENCHMARK_COMPANIES) + 1) for company in BENCHMARK_COMPANIES][:companies]
+
+    with StubLLMServer(latency=llm_latency, structured_replies=load_company_info_fixture()) as stub:
+        llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", base_url=stub.base_url, api_key="stub-key")
+        chain = build_extraction_chain(llm)
+        batch_chain = build_batch_extraction_chain(llm)
+
+        async def search_fn(search_query):
+            return await asyncio.to_thread(search_company_urls, tavily, search_query)
+
+        async def scrape_fn(urls):
+            return await scrape_urls_async(urls, main_content=True, cache=None, rate_limiter=None)
+
+        async def extract_fn(content, urls):
+            return await chain.ainvoke({"content": content, "urls": urls})
+
+        async def batch_extract_fn(entries):
+            return await batch_chain.ainvoke({"companies": format_batch_sections(entries)})
+
+        async def save_fn(result):
+            await asyncio.to_thread(save_company_profile, result)
+
+        pipeline = ExtractionPipeline(search_fn=search_fn, scrape_fn=scrape_fn, extract_fn=extract_fn,
+                                      save_fn=save_fn, batch_extract_fn=batch_extract_fn,
+                                      batch_token_budget=batch_token_budget, max_in_flight=companies)
+        report = asyncio.run(pipeline.run(queries))
+        llm_requests = stub.requests
+
+    wall = report["wall_seconds"]
+    return {
+        "companies": len(queries),
+        "saved": report["saved"],
+        "wall_seconds": wall,
+        "companies_per_second": round(report["processed"] / wall, 3) if wall else 0.0,
+        "llm_requests": llm_requests,
+        "llm_calls_per_company": round(llm_requests / len(queries), 3) if queries else 0.0,
+        "llm": report["llm"],
+        "search_calls": tavily.calls,
+        "stages": report["stages"],
+        "spans": report["spans"],
+    }
+
+
+def bench_profile_store(size: int) -> Dict:
+    """SQLite profile store write/load and knowledge base (index) build time"""
+    from benchmark_profile_store import synthetic_profiles
+    from knowledge import KnowledgeBase
+    from profile_store import SQLiteProfileStore
+
+    with tempfile.TemporaryDirectory(prefix="profile_store_suite_") as work_dir:
+        store = SQLiteProfileStore(os.path.join(work_dir, "profiles.sqlite"))
+        start = time.perf_counter()
+        store.upsert_many(synthetic_profiles(size))
+        write_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        profiles = store.all()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        knowledge = KnowledgeBase(store, os.path.join(work_dir, "index", "knowledge_index.json"))
+        start = time.perf_counter()
+        snapshot = knowledge.load()
+        knowledge_load_ms = (time.perf_counter() - start) * 1000
+        store.close()
+
+    return {
+        "profiles": len(profiles),
+        "write_ms": round(write_ms, 2),
+        "load_ms": round(load_ms, 2),
+        "knowledge_load_ms": round(knowledge_load_ms, 2),
+        "knowledge_companies": len(snapshot.companies),
+    }
+
+
+def bench_chat(users: int, requests_per_user: int, llm_latency: float) -> Dict:
+    """/chat latency and throughput under concurrent users with the stub LLM"""
+    import uvicorn
+
+    from load_test_chat import free_port, run_users
+    from profile_store import get_profile_store
+    from stub_llm_server import StubLLMServer
+
+    get_profile_store().import_json_dir(os.path.join(ROOT_DIR, 'data'))
+    with StubLLMServer(latency=llm_latency) as stub:
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        import main
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(run_users(base_url, "/chat", 1, 1))  # Warm up imports and connections
+            latencies, wall = asyncio.run(run_users(base_url, "/chat", users, requests_per_user))
+        finally:
+            server.should_exit = True
+
+    return {
+        "users": users,
+        **latency_summary(latencies),
+        "requests_per_second": round(len(latencies) / wall, 2) if wall else 0.0,
+        "companies_loaded": len(main.KNOWLEDGE.snapshot.companies),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sections=SECTIONS, quick: bool = False, search_latency: float = 0.2, page_latency: float = 0.05,
+              llm_latency: float = 0.3, users: int = 20) -> Dict:
+    """Run the selected benchmark sections and return the results document"""
+    results = {}
+    with FixtureSiteServer(latency=page_latency) as site:
+        if "discovery" in sections:
+            results["discovery"] = bench_discovery(site, search_latency, rounds=3 if not quick else 1)
+        if "scraping" in sections:
+            results["scraping"] = bench_scraping(site, copies=10 if not quick else 2)
+        if "pipeline" in sections:
+            results["pipeline"] = bench_pipeline(site, search_latency, llm_latency, companies=20 if not quick else 4)
+            results["pipeline_batched"] = bench_pipeline(site, search_latency, llm_latency,
+                                                         companies=20 if not quick else 4, batch_token_budget=16000)
+    if "profile_store" in sections:
+        results["profile_store"] = bench_profile_store(10000 if not quick else 500)
+    if "chat" in sections:
+        results["chat"] = bench_chat(users if not quick else 4, 5 if not quick else 2, llm_latency)
+
+    return {
+        "suite": "offline",
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "quick": quick,
+            "search_latency": search_latency,
+            "page_latency": page_latency,
+            "llm_latency": llm_latency,
+            "users": users,
+        },
+        "results": results,
+    }
+
+
+def headline(document: Dict) -> Dict[str, float]:
+    """The HEADLINE_METRICS present in a results document"""
+    values = {}
+    for metric in HEADLINE_METRICS:
+        section, name = metric.split(".", 1)
+        value = document.get("results", {}).get(section, {}).get(name)
+        if isinstance(value, (int, float)):
+            values[metric] = value
+    return values
+
+
+def print_comparison(old: Dict, new: Dict):
+    old_values, new_values = headline(old), headline(new)
+    print(f"\nCompared with {old.get('commit') or 'previous run'}:")
+    print(f"{'metric':<34}{'before':>12}{'after':>12}{'change':>9}")
+    for metric, higher_is_better in HEADLINE_METRICS.items():
+        if metric not in old_values or metric not in new_values:
+            continue
+        before, after = old_values[metric], new_values[metric]
+        change = (after - before) / before if before else 0.0
+        better = (change > 0) == higher_is_better
+        marker = "" if abs(change) < 0.05 else (" +" if better else " !")
+        print(f"{metric:<34}{before:>12}{after:>12}{change:>8.0%}{marker}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (no network, no API keys)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare the headline metrics with")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="Run only these sections")
+    parser.add_argument("--quick", action="store_true", help="Small sizes, for a smoke run")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Replayed search API latency in seconds")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="Local page server latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Stub LLM latency in seconds")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent /chat users")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_suite_")
+    isolate_environment(work_dir)
+    document = run_suite(args.only or SECTIONS, quick=args.quick, search_latency=args.search_latency,
+                         page_latency=args.page_latency, llm_latency=args.llm_latency, users=args.users)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    for metric, value in headline(document).items():
+        print(f"{metric:<34}{value:>12}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), document)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,131 @@
+"""
+/chat throughput at 1 vs N uvicorn workers, and per-worker knowledge load time.
+
+Starts the stub OpenAI server in this process, writes a synthetic SQLite
+profile store (--profiles) and the shared knowledge snapshot file, then for
+each worker count starts `uvicorn main:app --workers W` the way
+start_server.py --production does, waits until every worker is ready and runs
+N concurrent users against /chat. Retrieval over a large store is CPU work,
+so throughput scales with workers up to the number of cores.
+
+Each configuration also reports the knowledge load time the workers report in
+/health/ready, with the snapshot file (production mode) and without it (every
+worker reads the store and builds the index).
+
+Usage:
+    python akania/scripts/benchmark_workers.py --workers 1 4 --profiles 10000 --users 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'akania', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_profile_store import synthetic_profiles  # noqa: E402
+from load_test_chat import free_port, percentile, run_users  # noqa: E402
+from profile_store import SQLiteProfileStore  # noqa: E402
+from stub_llm_server import StubLLMServer  # noqa: E402
+
+
+def wait_until_ready(base_url: str, workers: int, timeout: float) -> list:
+    """Poll /health/ready until it has answered 200 several times in a row; returns the knowledge_ms seen"""
+    deadline = time.perf_counter() + timeout
+    needed, streak, knowledge_ms = workers * 4, 0, set()
+    with httpx.Client(base_url=base_url, timeout=5) as client:
+        while time.perf_counter() < deadline:
+            try:
+                response = client.get("/health/ready", headers={"Connection": "close"})
+            except httpx.TransportError:
+                response = None
+            if response is not None and response.status_code == 200:
+                streak += 1
+                knowledge_ms.add(response.json().get("startup", {}).get("knowledge_ms"))
+                if streak >= needed:
+                    return sorted(ms for ms in knowledge_ms if ms is not None)
+            else:
+                streak = 0
+                time.sleep(0.05)
+    raise TimeoutError(f"{workers} worker(s) not ready after {timeout}s")
+
+
+def measure(workers: int, env: dict, users: int, requests_per_user: int, timeout: float) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        knowledge_ms = wait_until_ready(base_url, workers, timeout)
+        asyncio.run(run_users(base_url, "/chat", workers * 2, 1))  # Warm up every worker
+        latencies, wall = asyncio.run(run_users(base_url, "/chat", users, requests_per_user))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "workers": workers,
+        "requests_per_second": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "knowledge_ms": knowledge_ms,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare /chat throughput at different worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--profiles", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5, help="Requests per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="workers_bench_") as work_dir, \
+            StubLLMServer(latency=args.latency) as stub:
+        db_path = os.path.join(work_dir, "profiles.sqlite")
+        store = SQLiteProfileStore(db_path)
+        store.upsert_many(synthetic_profiles(args.profiles))
+        store.close()
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "stub-key"),
+            OPENAI_BASE_URL=stub.base_url,
+            PROFILE_STORE_URL=f"sqlite:///{db_path}",
+            KNOWLEDGE_INDEX_PATH=os.path.join(work_dir, "index", "knowledge_index.json"),
+            KNOWLEDGE_RELOAD_INTERVAL="0",
+            CONVERSATION_STORE_URL=f"sqlite:///{os.path.join(work_dir, 'conversations.sqlite')}",
+            ANSWER_CACHE_ENABLED="false",
+        )
+        snapshot_path = os.path.join(work_dir, "knowledge_snapshot.bin")
+        subprocess.run([sys.executable, "snapshot_file.py", "--output", snapshot_path],
+                       cwd=BACKEND_DIR, env=env, check=True)
+
+        rows = []
+        for workers in args.workers:
+            for mode, extra in (("store", {}), ("snapshot", {"KNOWLEDGE_SNAPSHOT_PATH": snapshot_path})):
+                row = measure(workers, {**env, **extra}, args.users, args.requests, args.timeout)
+                rows.append({"mode": mode, **row})
+
+    print(f"\n{args.profiles} profiles, {args.users} users x {args.requests} requests, "
+          f"stub LLM {args.latency * 1000:.0f}ms, {os.cpu_count()} CPU(s)")
+    print(f"{'workers':>8} {'knowledge':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  per-worker load ms")
+    for row in rows:
+        loads = ", ".join(f"{ms:.0f}" for ms in row["knowledge_ms"])
+        print(f"{row['workers']:>8} {row['mode']:>10} {row['requests_per_second']:>8.1f} {row['p50_ms']:>8.0f} "
+              f"{row['p99_ms']:>8.0f}  {loads}")
+
+
+if __name__ == "__main__":
+    main_cli()
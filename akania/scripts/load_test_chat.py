@@ -0,0 +1,108 @@
+"""
+Load test for /chat with a local stub LLM: blocking vs async chat path.
+
+Starts the stub OpenAI server and the FastAPI app (uvicorn, one worker) in this
+process, then runs N concurrent users against:
+
+- /chat-blocking: the previous implementation (a new ChatOpenAI client per
+  request and a synchronous invoke inside the async endpoint)
+- /chat: the shared async client with ainvoke and a concurrency limit
+
+and prints p50/p99 latency and throughput for each.
+
+Usage:
+    python akania/scripts/load_test_chat.py --users 20 --requests 5 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from stub_llm_server import StubLLMServer  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def add_blocking_route(main):
+    """Register the pre-async chat implementation for comparison"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
+
+    @main.app.post("/chat-blocking")
+    async def chat_blocking(message: main.ChatMessage):
+        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
+        prompt = ChatPromptTemplate.from_messages(main.build_chat_messages(message.message, []))
+        response = (prompt | llm).invoke({})
+        return {"response": response.content}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_users(base_url, path, users, requests_per_user):
+    latencies = []
+
+    async def user(user_id):
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            for i in range(requests_per_user):
+                start = time.perf_counter()
+                response = await client.post(path, json={"message": f"Tell me about Sylndr ({user_id}/{i})"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return latencies, time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Load test /chat with a stub LLM")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=5, help="Requests per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as stub:
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ["KNOWLEDGE_RELOAD_INTERVAL"] = "0"
+        import main
+
+        add_blocking_route(main)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"{'mode':>9} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+        try:
+            for mode, path in (("blocking", "/chat-blocking"), ("async", "/chat")):
+                asyncio.run(run_users(base_url, path, 1, 1))  # Warm up imports and connections
+                latencies, wall = asyncio.run(run_users(base_url, path, args.users, args.requests))
+                print(f"{mode:>9} {len(latencies):>9} {statistics.median(latencies) * 1000:>9.0f} "
+                      f"{percentile(latencies, 0.99) * 1000:>9.0f} {len(latencies) / wall:>8.1f}")
+        finally:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    main_cli()
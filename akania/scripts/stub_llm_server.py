@@ -0,0 +1,184 @@
+"""
+Local stand-in for the OpenAI chat completions API, for offline benchmarks.
+
+Answers POST /v1/chat/completions with a canned reply after a fixed latency,
+using a thread per request so concurrent calls overlap like a real provider.
+Requests with "stream": true get the reply as SSE chunks, one word every
+`token_delay` seconds after the initial latency.
+
+Structured-output requests (a `response_format` JSON schema or `tools`) are
+answered with one of the canned `structured_replies`: the profile whose
+company name (first word) appears in the prompt, so the extraction chain gets
+valid CompanyInfo JSON. A batched extraction request (CompanyInfoBatch schema)
+gets one entry per "### Company N: ..." section of its prompt.
+
+Usage:
+    with StubLLMServer(latency=0.2) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+"""
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Numbered company sections of a batched extraction prompt
+BATCH_SECTION = re.compile(r"^[ \t]*### Company (\d+): (.*)$", re.MULTILINE)
+
+
+def _schema_name(request: Dict) -> str:
+    if request.get("tools"):
+        return request["tools"][0]["function"]["name"]
+    return ((request.get("response_format") or {}).get("json_schema") or {}).get("name", "")
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 256
+
+
+class StubLLMServer:
+    """OpenAI-compatible chat completions stub with configurable latency"""
+
+    def __init__(self, latency: float = 0.2, reply: str = "This is a stub answer about African companies.",
+                 host: str = "127.0.0.1", port: int = 0, token_delay: float = 0.0,
+                 structured_replies: Optional[List[Dict]] = None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.structured_replies = structured_replies or []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def structured_reply(self, request: Dict) -> Dict:
+        """Canned profile for a structured-output request (the one named in the prompt)"""
+        prompt = " ".join(str(message.get("content") or "") for message in request.get("messages", []))
+        if _schema_name(request) == "CompanyInfoBatch":
+            return {"companies": [{"company_number": int(number), "info": self.profile_for(section)}
+                                  for number, section in BATCH_SECTION.findall(prompt)]}
+        return self.profile_for(prompt)
+
+    def profile_for(self, text: str) -> Dict:
+        """The canned profile whose company name (first word) appears in the text"""
+        prompt = text.lower()
+        for profile in self.structured_replies:
+            name_words = (profile.get("company_name") or "").lower().split()
+            if name_words and name_words[0] in prompt:
+                return profile
+        return self.structured_replies[0] if self.structured_replies else {}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+
+                if request.get("stream"):
+                    self._stream_reply(request)
+                    return
+                # A non-streamed reply still takes the full generation time
+                time.sleep(stub.token_delay * (len(stub.reply.split(" ")) - 1))
+
+                message = {"role": "assistant", "content": stub.reply}
+                if request.get("tools"):
+                    message = {"role": "assistant", "content": None, "tool_calls": [{
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {
+                            "name": request["tools"][0]["function"]["name"],
+                            "arguments": json.dumps(stub.structured_reply(request)),
+                        },
+                    }]}
+                elif request.get("response_format"):
+                    message = {"role": "assistant", "content": json.dumps(stub.structured_reply(request))}
+
+                body = json.dumps({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }],
+                    "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _stream_reply(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                words = stub.reply.split(" ")
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(stub.token_delay)
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else f" {word}"},
+                            "finish_reason": None,
+                        }],
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                final = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                self._write_chunk(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self._write_chunk(b"")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
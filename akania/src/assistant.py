@@ -3,25 +3,30 @@ Console assistant for answering questions about African companies.
 Based on your notebook implementation.
 """
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_tavily import TavilySearch
 from langchain_core.prompts import ChatPromptTemplate
-from company_profiles import CompanyInfo, save_company_profile
+from company_profiles import CompanyInfo, CompanyInfoBatch, save_company_profile
+from content_reducer import estimate_tokens, reduce_documents
+from entity_resolution import get_entity_resolver, merge_profiles
+from fingerprint_store import content_hash, get_fingerprint_store
+from page_cache import normalize_url
+from profile_store import get_profile_store
+from rate_limiter import limited_call
 from scraper import extract_urls_from_tavily, scrape_urls
+from search_cache import get_search_cache
+from telemetry import span
 
 # Load environment
 load_dotenv('../../.env')
 
-def extract_company_data(company_query: str):
-    """Extract company data - from your notebook with retry mechanism"""
-    try:
-        # Setup
-        search = TavilySearch(max_results=5, topic="general")
-        llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """
+# Run the alternate-query attempt alongside the first one instead of after it
+EXTRACTION_SPECULATIVE_RETRY = os.getenv('EXTRACTION_SPECULATIVE_RETRY', '').lower() in ('1', 'true', 'yes')
+
+EXTRACTION_SYSTEM_PROMPT = """
             You are a data extraction expert. Extract company information from the provided web content.
 
             **Instructions:**
@@ -43,89 +48,384 @@ def extract_company_data(company_query: str):
 
             web contents: {content}
             urls: {urls}
-            """),
-        ])
-        
-        llm_with_structured_output = llm.with_structured_output(CompanyInfo)
-        chain = prompt | llm_with_structured_output
+            """
+
+BATCH_EXTRACTION_SYSTEM_PROMPT = """
+            You are a data extraction expert. The web content below covers several companies,
+            one numbered section per company. Extract the information of each section separately.
+
+            **Instructions:**
+            - Extract only factual information that is explicitly mentioned in that section's content
+            - Never mix information from different sections
+            - If information is not found, leave the field empty/null
+            - Use exact names and terms from the source
+            - Return one entry per section, with the section's company number
+
+            **Extract the following information for each company:**
+            - Company name
+            - Countries where it operates (focus on African countries if mentioned)
+            - Industry/sector
+            - Business description (About 100 words)
+            - Key people (names and titles)
+            - transactions involving the company
+            - Source urls (the urls of its section)
+
+            {companies}
+            """
+
+# Rough size of the structured CompanyInfo reply, for the daily token budget
+EXTRACTION_COMPLETION_TOKENS = 400
+
+# Section header, urls and numbering around each company of a batched request
+BATCH_SECTION_OVERHEAD_TOKENS = 40
+
+def extraction_token_estimate(content: str) -> int:
+    """Estimated tokens of one extraction call (prompt plus reply)"""
+    return estimate_tokens(EXTRACTION_SYSTEM_PROMPT) + estimate_tokens(content) + EXTRACTION_COMPLETION_TOKENS
+
+def extraction_output_tokens(result) -> int:
+    """Estimated tokens of a structured extraction reply"""
+    return estimate_tokens(result.model_dump_json()) if result is not None else 0
+
+def extraction_tokens_used(token_estimate: int, result, replies: int = 1) -> int:
+    """Tokens of a finished extraction call: its estimate with the reply allowance replaced by the reply it got"""
+    return token_estimate - replies * EXTRACTION_COMPLETION_TOKENS + extraction_output_tokens(result)
+
+def batch_section_tokens(content: str) -> int:
+    """Estimated tokens one company adds to a batched extraction call (its section plus its reply)"""
+    return estimate_tokens(content) + BATCH_SECTION_OVERHEAD_TOKENS + EXTRACTION_COMPLETION_TOKENS
+
+def batch_extraction_token_estimate(contents) -> int:
+    """Estimated tokens of one batched extraction call (prompt plus reply)"""
+    return estimate_tokens(BATCH_EXTRACTION_SYSTEM_PROMPT) + sum(batch_section_tokens(content) for content in contents)
+
+def format_batch_sections(entries) -> str:
+    """Numbered prompt sections for (company_query, content, urls) entries"""
+    return "\n\n".join(
+        f"### Company {number}: {company_query}\nurls: {urls}\nweb contents: {content}"
+        for number, (company_query, content, urls) in enumerate(entries, 1)
+    )
+
+def results_by_company(batch, count: int):
+    """CompanyInfo per section of a CompanyInfoBatch reply, None for sections it left out"""
+    results = [None] * count
+    for entry in (batch.companies if batch is not None else []):
+        if 1 <= entry.company_number <= count and results[entry.company_number - 1] is None:
+            results[entry.company_number - 1] = entry.info
+    return results
+
+def reduce_for_extraction(docs, company_query: str, token_budget=None):
+    """Reduce scraped pages to the extraction input, traced as a "reduce" span"""
+    with span("reduce", company=company_query, pages=len(docs)) as current:
+        content = reduce_documents(docs, company_name_from_query(company_query), token_budget)
+        current.set(tokens_before=content.tokens_before, tokens_after=content.tokens_after)
+    return content
+
+def build_extraction_chain(llm=None):
+    """Prompt | LLM chain returning structured CompanyInfo"""
+    if llm is None:
+        llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
+    prompt = ChatPromptTemplate.from_messages([("system", EXTRACTION_SYSTEM_PROMPT)])
+    return prompt | llm.with_structured_output(CompanyInfo)
+
+def build_batch_extraction_chain(llm=None):
+    """Prompt | LLM chain extracting several companies at once into a CompanyInfoBatch"""
+    if llm is None:
+        llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
+    prompt = ChatPromptTemplate.from_messages([("system", BATCH_EXTRACTION_SYSTEM_PROMPT)])
+    return prompt | llm.with_structured_output(CompanyInfoBatch)
+
+def first_search_query(company_query: str) -> str:
+    """Query used for the first search attempt"""
+    return f"I need only website urls for {company_query}"
+
+def company_name_from_query(company_query: str) -> str:
+    """Company name without the country ("Sylndr (Egypt)" gives Sylndr)"""
+    return company_query.split('(')[0].strip()
+
+def alternate_search_query(company_query: str) -> str:
+    """Query used to retry when the first attempt gave incomplete data"""
+    company_name = company_name_from_query(company_query)  # Extract company name without country
+    return f"{company_name} company about business information profile"
+
+def search_company_urls(search, search_query: str, max_urls: int = 3):
+    """Search with Tavily and return the top result URLs (cached across attempts and runs)"""
+    def run_search():
+        tavily_response = limited_call("tavily", search.invoke, {"query": search_query})
+
+        if not tavily_response or not tavily_response.get('results'):
+            return []
 
-        def try_extraction(search_query: str):
-            """Helper function to try extraction with a specific query"""
-            # Search with Tavily
-            tavily_response = search.invoke({"query": search_query})
+        return extract_urls_from_tavily(tavily_response)[:max_urls]
 
-            if not tavily_response or not tavily_response.get('results'):
-                return None
+    with span("search", engine="tavily", query=search_query) as current:
+        called = []
 
-            # Extract URLs (limit to 3)
-            urls = extract_urls_from_tavily(tavily_response)[:3]
+        def counted_search():
+            called.append(True)
+            return run_search()
 
-            if not urls:
-                return None
+        search_cache = get_search_cache()
+        if search_cache:
+            urls = search_cache.get_or_search("tavily", search_query, max_urls, counted_search)
+        else:
+            urls = counted_search()
+        current.set(urls=len(urls), cached=not called)
+        return urls
 
-            # Scrape all URLs
-            scraped_docs = scrape_urls(urls)
+def is_result_incomplete(result):
+    """Check if result has empty/missing key fields"""
+    if not result:
+        return True
+    
+    # Check for empty key fields
+    empty_fields = (
+        not result.company_name or
+        not result.countries or
+        not result.sector or
+        not result.business_description
+    )
+    return empty_fields
+
+def merge_company_info(primary, secondary):
+    """
+    Field-level merge of two results for the same company
+
+    Every CompanyInfo field is merged (see entity_resolution.merge_profiles):
+    empty fields of `primary` are filled from `secondary`, and list fields
+    (countries, sector, key people, source URLs) get the items of `secondary`
+    they do not already have.
+    """
+    if primary is None or secondary is None:
+        return primary if primary is not None else secondary
+
+    current = primary.model_dump()
+    merged = merge_profiles(current, secondary.model_dump())
+    return type(primary)(**merged) if merged != current else primary
+
+def merge_results(result, retry_result):
+    """Combine the first attempt with the retry attempt, preferring the more complete one"""
+    # Use retry result if it's more complete
+    if retry_result and not is_result_incomplete(retry_result):
+        print("✅ Retry successful - using improved data")
+        return merge_company_info(retry_result, result)
+
+    # Merge results if both have some data
+    if result and retry_result:
+        print("🔄 Merged data from both searches")
+        return merge_company_info(result, retry_result)
+
+    return result
+
+class SharedScrapes:
+    """Pages scraped for one company, shared by its concurrent attempts (each URL is fetched once)"""
+
+    def __init__(self, scrape=scrape_urls):
+        self._scrape = scrape
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def scrape(self, urls):
+        """Main-content documents of the URLs, in order (pages another attempt is fetching are awaited)"""
+        own, futures = [], []
+        with self._lock:
+            for url in urls:
+                key = normalize_url(url)
+                if key not in self._pages:
+                    self._pages[key] = Future()
+                    own.append(url)
+                futures.append(self._pages[key])
+
+        if own:
+            try:
+                docs = self._scrape(own, main_content=True)
+            except BaseException as e:
+                for url in own:
+                    self._pages[normalize_url(url)].set_exception(e)
+                raise
+            by_url = {}
+            for doc in docs:
+                by_url.setdefault(normalize_url(doc.metadata.get("source", "")), []).append(doc)
+            for url in own:
+                self._pages[normalize_url(url)].set_result(by_url.get(normalize_url(url), []))
+
+        return [doc for future in futures for doc in future.result()]
+
+def race_attempts(first_attempt, retry_attempt, result_of=lambda value: value):
+    """
+    Run the first and the retry attempt concurrently
+
+    Each attempt is called with a threading.Event that is set as soon as
+    either attempt returns a complete result; the other one is then abandoned
+    (it checks the event before its LLM call) and counts as None.
+
+    Args:
+        result_of: The CompanyInfo of an attempt's return value, checked for completeness
+
+    Returns:
+        (first return value, retry return value, name of the attempt that completed first or None);
+        an attempt that had not finished when the race ended returns None
+    """
+    cancelled = threading.Event()
+    results = {"first": None, "retry": None}
+    winner = None
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        pending = {executor.submit(first_attempt, cancelled): "first",
+                   executor.submit(retry_attempt, cancelled): "retry"}
+        while pending and winner is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"{name} attempt error: {e}")
+                if winner is None and results[name] is not None and not is_result_incomplete(result_of(results[name])):
+                    winner = name
+        cancelled.set()
+    finally:
+        # Never wait for the slower attempt once a complete result is in
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results["first"], results["retry"], winner
 
-            if not scraped_docs:
-                return None
+def unchanged_profile(company_query: str, urls, text_hash: str):
+    """The saved profile if the company's sources match its fingerprint, else None"""
+    fingerprint = get_fingerprint_store().unchanged(company_query, urls, text_hash)
+    if fingerprint is None or not fingerprint.profile_name:
+        return None
+    store = get_profile_store()
+    profile = store.get(fingerprint.profile_name)
+    if profile is None:
+        # Merged into a duplicate since: found by its name or, like domain merges, by its sources
+        merged_into = get_entity_resolver(store).resolve({"company_name": fingerprint.profile_name,
+                                                          "source_urls": fingerprint.urls})
+        profile = store.get(merged_into) if merged_into else None
+    return CompanyInfo(**profile) if profile else None
+
+def extract_company_data(company_query: str, refresh: bool = False, speculative: bool = None,
+                         search=None, chain=None):
+    """
+    Extract company data - from your notebook with retry mechanism
+
+    With refresh, the LLM is skipped when the first search finds the same URLs
+    with the same page text as the saved profile.
+
+    With speculative (default EXTRACTION_SPECULATIVE_RETRY), the alternate-query
+    attempt runs alongside the first one instead of after it, sharing the pages
+    both attempts scrape; the first complete result wins and the slower attempt
+    is abandoned, so hard companies take one round trip instead of two.
+    """
+    try:
+        # Setup
+        search = search if search is not None else TavilySearch(max_results=5, topic="general")
+        chain = chain if chain is not None else build_extraction_chain()
+        speculative = EXTRACTION_SPECULATIVE_RETRY if speculative is None else speculative
+        scrapes = SharedScrapes() if speculative else None
+        # Set once the first attempt has compared its sources with the fingerprint
+        fingerprint_checked = threading.Event()
+
+        def try_extraction(search_query: str, first_attempt: bool = False, cancelled=None):
+            """
+            Helper function to try extraction with a specific query
+
+            Returns:
+                (result, sources): sources are the first attempt's {"urls", "hash", "unchanged"}
+                (None for the retry attempt or when nothing was scraped)
+            """
+            try:
+                # Search with Tavily (limit to 3 URLs)
+                urls = search_company_urls(search, search_query)
+
+                if not urls:
+                    return None, None
+
+                # Scrape all URLs (main page content only)
+                if scrapes:
+                    scraped_docs = scrapes.scrape(urls)
+                else:
+                    scraped_docs = scrape_urls(urls, main_content=True)
+
+                if not scraped_docs:
+                    return None, None
+
+                # Keep the relevant, de-duplicated paragraphs within the token budget
+                content = reduce_for_extraction(scraped_docs, company_query)
+                print(f"✂️ Content: {content.tokens_before} -> {content.tokens_after} tokens")
+
+                sources = None
+                if first_attempt:
+                    sources = {"urls": urls, "hash": content_hash(content.text), "unchanged": False}
+                    stored = unchanged_profile(company_query, urls, sources["hash"]) if refresh else None
+                    if stored:
+                        sources["unchanged"] = True
+                        if cancelled is not None:
+                            cancelled.set()  # The retry attempt must not call the LLM either
+                        return stored, sources
+                elif refresh and cancelled is not None:
+                    # Only the first attempt may find the sources unchanged: wait for its check
+                    fingerprint_checked.wait()
+            finally:
+                if first_attempt:
+                    fingerprint_checked.set()
+
+            if cancelled is not None and cancelled.is_set():
+                return None, sources  # The other attempt already has a complete result
 
             # Extract structured data
-            result = chain.invoke({
-                "content": scraped_docs,
-                "urls": urls
-            })
-
-            return result
-
-        def is_result_incomplete(result):
-            """Check if result has empty/missing key fields"""
-            if not result:
-                return True
-            
-            # Check for empty key fields
-            empty_fields = (
-                not result.company_name or
-                not result.countries or
-                not result.sector or
-                not result.business_description
+            tokens_in = extraction_token_estimate(content.text)
+            with span("llm", company=company_query, tokens_in=tokens_in) as current:
+                result = limited_call("openai", chain.invoke, {
+                    "content": content.text,
+                    "urls": urls
+                }, tokens=tokens_in, usage=lambda reply: extraction_tokens_used(tokens_in, reply))
+                current.set(tokens_out=extraction_output_tokens(result))
+
+            return result, sources
+
+        search_query = first_search_query(company_query)
+        alternate_query = alternate_search_query(company_query)
+        if speculative:
+            # Both queries at once; the first complete result wins
+            print(f"🔍 Speculative search: {search_query} | {alternate_query}")
+            first, retry, winner = race_attempts(
+                lambda cancelled: try_extraction(search_query, first_attempt=True, cancelled=cancelled),
+                lambda cancelled: try_extraction(alternate_query, cancelled=cancelled),
+                result_of=lambda attempt: attempt[0],
             )
-            return empty_fields
-
-        # First attempt with original query
-        print(f"🔍 First search: I need only website urls for {company_query}")
-        result = try_extraction(f"I need only website urls for {company_query}")
-        
-        # If result is incomplete, try alternate query
-        if is_result_incomplete(result):
-            company_name = company_query.split('(')[0].strip()  # Extract company name without country
-            alternate_query = f"{company_name} company about business information profile"
-            print(f"🔄 Retry search: {alternate_query}")
-            
-            retry_result = try_extraction(alternate_query)
-            
-            # Use retry result if it's more complete
-            if retry_result and not is_result_incomplete(retry_result):
-                result = retry_result
-                print("✅ Retry successful - using improved data")
-            elif retry_result:
-                # Merge results if both have some data
-                if result and retry_result:
-                    # Use non-empty fields from retry result
-                    if not result.company_name and retry_result.company_name:
-                        result.company_name = retry_result.company_name
-                    if not result.countries and retry_result.countries:
-                        result.countries = retry_result.countries
-                    if not result.sector and retry_result.sector:
-                        result.sector = retry_result.sector
-                    if not result.business_description and retry_result.business_description:
-                        result.business_description = retry_result.business_description
-                    if not result.key_people and retry_result.key_people:
-                        result.key_people = retry_result.key_people
-                    print("🔄 Merged data from both searches")
+            # An attempt still running when the race ended counts as None, sources included
+            result, sources = first or (None, None)
+            retry_result = retry[0] if retry else None
+            if sources and sources["unchanged"]:
+                print("⏭️ Sources unchanged since the last extraction - keeping the saved profile")
+                return result
+            if winner == "first":
+                result = merge_company_info(result, retry_result)
+            else:
+                result = merge_results(result, retry_result)
+        else:
+            # First attempt with original query
+            print(f"🔍 First search: {search_query}")
+            result, sources = try_extraction(search_query, first_attempt=True)
+            if sources and sources["unchanged"]:
+                print("⏭️ Sources unchanged since the last extraction - keeping the saved profile")
+                return result
+
+            # If result is incomplete, try alternate query
+            if is_result_incomplete(result):
+                print(f"🔄 Retry search: {alternate_query}")
+
+                retry_result, _ = try_extraction(alternate_query)
+                result = merge_results(result, retry_result)
 
         # Save to JSON
         if result:
-            save_company_profile(result)
+            # The key differs from the result's name when it was merged into a duplicate
+            key = save_company_profile(result)
+            # Only sources of a first attempt that finished (and so went into the result) are recorded
+            if sources:
+                get_fingerprint_store().record(company_query, sources["urls"], sources["hash"],
+                                               key or result.company_name)
 
         return result
 
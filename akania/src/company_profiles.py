@@ -1,10 +1,15 @@
 """
 Data models and storage for company profiles.
 """
+import os
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
-import json
-from pathlib import Path
+from entity_resolution import get_entity_resolver
+from profile_store import ProfileStore, get_profile_store
+from telemetry import span
+
+# Merge profiles of a company saved under another spelling of its name into the stored one
+ENTITY_RESOLUTION_ENABLED = os.getenv('ENTITY_RESOLUTION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
 
 class KeyPeople(BaseModel):
     """Model for key people in a company"""
@@ -21,33 +26,44 @@ class CompanyInfo(BaseModel):
     transactions: Optional[str] = Field(default=None, description="transactions involving the company")
     source_urls: List[str] = Field(default_factory=list, description="Source urls for the company")
 
-def save_company_profile(company_info: CompanyInfo):
-    """Save company profile as JSON file"""
+class NumberedCompanyInfo(BaseModel):
+    """Info about one company of a batched extraction request"""
+    company_number: int = Field(description="Number of the company section the info was extracted from")
+    info: CompanyInfo = Field(description="Info about the company of that section")
+
+class CompanyInfoBatch(BaseModel):
+    """Info about each company of a batched extraction request"""
+    companies: List[NumberedCompanyInfo] = Field(default_factory=list, description="One entry per company section")
+
+def save_company_profile(company_info: CompanyInfo, store: Optional[ProfileStore] = None) -> Optional[str]:
+    """
+    Save (upsert) a company profile in the profile store
+
+    With ENTITY_RESOLUTION_ENABLED, a profile of a company that is already
+    stored under another name ("Moni Shop SARL" for "Moni-Shop") is merged
+    into the stored profile instead of becoming a duplicate.
+
+    Returns:
+        Normalized name key the profile was stored under
+    """
     if not company_info.company_name:
-        return
-    
-    Path("data").mkdir(exist_ok=True)
-    safe_name = company_info.company_name.replace(" ", "_").replace("(", "").replace(")", "")
-    filename = f"data/{safe_name}.json"
+        return None
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(company_info.model_dump(), f, indent=2, ensure_ascii=False)
+    store = store or get_profile_store()
+    with span("save", company=company_info.company_name) as saving:
+        if ENTITY_RESOLUTION_ENABLED:
+            key, duplicate = get_entity_resolver(store).save(company_info)
+            saving.set(merged_into=duplicate)
+        else:
+            key, duplicate = store.upsert(company_info), None
     
-    print(f"💾 Saved to {filename}")
+    if duplicate:
+        print(f"🔗 Merged {company_info.company_name} into the existing profile (key: {key})")
+    else:
+        print(f"💾 Saved {company_info.company_name} (key: {key})")
+    return key
 
-def load_profiles() -> List[Dict]:
+def load_profiles(store: Optional[ProfileStore] = None) -> List[Dict]:
     """Load all saved profiles"""
-    data_dir = Path("data")
-    if not data_dir.exists():
-        return []
-    
-    profiles = []
-    for file in data_dir.glob("*.json"):
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                profiles.append(data)
-        except:
-            continue
-    
-    return profiles
+    store = store or get_profile_store()
+    return store.all()
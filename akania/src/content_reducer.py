@@ -0,0 +1,210 @@
+"""
+Content reduction between scraping and LLM extraction.
+
+Scraped pages carry navigation, footers, cookie banners, scripts and text
+repeated on every page of a site. Before the pages go into the extraction
+prompt they are reduced to:
+
+1. main content only (main_content_text, used by the fetcher at parse time)
+2. paragraphs de-duplicated across all pages of the company
+3. scored for relevance against the company name and profile keywords
+4. the best paragraphs that fit a hard token budget, in page order
+"""
+import math
+import os
+import re
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+# Elements that never hold company content
+BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "footer", "header",
+    "aside", "form", "button", "select", "input", "label",
+]
+
+# class/id fragments of boilerplate containers
+BOILERPLATE_HINTS = re.compile(
+    r"cookie|consent|gdpr|navbar|navigation|menu|footer|sidebar|breadcrumb|newsletter|subscribe|"
+    r"social|share|popup|modal|banner|skip-link|related-posts|comments",
+    re.IGNORECASE,
+)
+
+# Elements rendered on their own line
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6",
+    "table", "tr", "td", "th", "dd", "dt", "dl", "blockquote", "pre", "figcaption", "address",
+]
+
+# Words that mark paragraphs useful for a CompanyInfo profile
+RELEVANCE_KEYWORDS = {
+    "about", "acquired", "acquisition", "africa", "african", "based", "billion", "ceo", "chairman",
+    "chief", "countries", "country", "customers", "director", "employees", "expanded", "expansion",
+    "founded", "founder", "founders", "funding", "headquartered", "headquarters", "industry",
+    "investment", "investors", "launched", "leadership", "million", "mission", "operates",
+    "operations", "partnership", "platform", "products", "raised", "revenue", "round", "sector",
+    "seed", "series", "services", "team",
+}
+
+MIN_PARAGRAPH_WORDS = 4
+DEFAULT_TOKEN_BUDGET = int(os.getenv('EXTRACTION_TOKEN_BUDGET', '4000'))
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about 4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def _is_boilerplate(element) -> bool:
+    if element.name in ("html", "body", "main", "article"):
+        return False
+    attrs = getattr(element, "attrs", None) or {}
+    if "hidden" in attrs or attrs.get("aria-hidden") == "true":
+        return True
+    if "display:none" in (attrs.get("style") or "").replace(" ", ""):
+        return True
+    hints = " ".join(attrs.get("class") or []) + " " + (attrs.get("id") or "") + " " + (attrs.get("role") or "")
+    return bool(BOILERPLATE_HINTS.search(hints)) or attrs.get("role") in ("navigation", "banner", "contentinfo")
+
+
+def main_content_text(soup: BeautifulSoup) -> str:
+    """
+    Text of the page's main content, one block per line
+
+    Drops boilerplate elements, then reads <main>, <article> or [role=main]
+    when the page has one, else the whole body.
+    """
+    for element in soup.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+    for element in soup.find_all(True):
+        if element.decomposed:
+            continue
+        if _is_boilerplate(element):
+            element.decompose()
+
+    root = (soup.find("main") or soup.find("article") or soup.find(attrs={"role": "main"})
+            or soup.body or soup)
+    for br in root.find_all("br"):
+        br.replace_with("\n")
+    for block in root.find_all(BLOCK_TAGS):
+        block.insert_before("\n")
+        block.insert_after("\n")
+
+    lines = (WHITESPACE_PATTERN.sub(" ", line).strip() for line in root.get_text().split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def company_name_tokens(company_name: str) -> set:
+    return {word for word in _words(company_name) if len(word) > 1}
+
+
+def score_paragraph(words: List[str], name_tokens: set, position: int) -> float:
+    """Relevance of a paragraph: company name and profile keywords, per word, favouring early text"""
+    if not words:
+        return 0.0
+    name_hits = sum(1 for word in words if word in name_tokens)
+    keyword_hits = sum(1 for word in words if word in RELEVANCE_KEYWORDS)
+    return (3 * name_hits + keyword_hits) / math.sqrt(len(words)) + 0.5 / (1 + position)
+
+
+def _page_text(document) -> str:
+    return getattr(document, "page_content", document) or ""
+
+
+def _page_source(document, index: int) -> str:
+    metadata = getattr(document, "metadata", None) or {}
+    return metadata.get("source") or f"page {index + 1}"
+
+
+class ReducedContent:
+    """Extraction input built from the scraped pages of one company"""
+
+    def __init__(self, text: str, tokens_before: int, tokens_after: int, paragraphs: int,
+                 duplicates: int, kept: int):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.paragraphs = paragraphs
+        self.duplicates = duplicates
+        self.kept = kept
+
+    def to_dict(self) -> Dict:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "paragraphs": self.paragraphs,
+            "duplicates": self.duplicates,
+            "kept": self.kept,
+        }
+
+
+def reduce_documents(documents: List, company_name: str, token_budget: Optional[int] = None) -> ReducedContent:
+    """
+    Reduce scraped pages to the most relevant, de-duplicated paragraphs within a token budget
+
+    Args:
+        documents: scraped Documents (or plain strings)
+        company_name: name used to score relevance
+        token_budget: maximum estimated tokens of the returned text
+
+    Returns:
+        ReducedContent with the prompt text, grouped by source page in page order
+    """
+    token_budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    name_tokens = company_name_tokens(company_name)
+    seen = set()
+    candidates = []  # (score, page index, position, paragraph, tokens)
+    tokens_before = 0
+    paragraphs = 0
+    duplicates = 0
+
+    for page_index, document in enumerate(documents):
+        text = _page_text(document)
+        tokens_before += estimate_tokens(text)
+        metadata = getattr(document, "metadata", None) or {}
+        blocks = [metadata["description"]] if metadata.get("description") else []
+        blocks.extend(text.split("\n"))
+
+        for position, block in enumerate(blocks):
+            paragraph = WHITESPACE_PATTERN.sub(" ", block).strip()
+            words = _words(paragraph)
+            if not words:
+                continue
+            paragraphs += 1
+            if len(words) < MIN_PARAGRAPH_WORDS and not name_tokens.intersection(words):
+                continue
+            key = " ".join(words)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            candidates.append((score_paragraph(words, name_tokens, position), page_index, position,
+                               paragraph, estimate_tokens(paragraph) + 1))
+
+    headers = {index: f"Source: {_page_source(document, index)}" for index, document in enumerate(documents)}
+    selected = []
+    used = 0
+    used_pages = set()
+    for candidate in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        page_index, tokens = candidate[1], candidate[4]
+        header_tokens = 0 if page_index in used_pages else estimate_tokens(headers[page_index]) + 2
+        if used + tokens + header_tokens > token_budget:
+            continue
+        selected.append(candidate)
+        used += tokens + header_tokens
+        used_pages.add(page_index)
+
+    sections = []
+    for page_index in sorted(used_pages):
+        page_paragraphs = [c[3] for c in sorted(selected, key=lambda c: c[2]) if c[1] == page_index]
+        sections.append("\n".join([headers[page_index]] + page_paragraphs))
+    text = "\n\n".join(sections)
+
+    return ReducedContent(text, tokens_before, estimate_tokens(text), paragraphs, duplicates, len(selected))
@@ -0,0 +1,447 @@
+"""
+Entity resolution for company profiles.
+
+The same company is often extracted under slightly different names
+("Moni-Shop", "Moni Shop SARL", "MONI SHOP"), which the profile store keys
+apart, so the chat prompt gets several profiles of one company. This module
+decides when two profiles describe the same company and merges them, at
+ingest (save_company_profile) and as a bulk pass over an existing store.
+
+Two profiles are the same company when:
+
+- their canonical names are equal: normalized name without legal-form
+  suffixes (SARL, Ltd, S.A., ...) and without spaces, so "Moni-Shop" and
+  "Moni Shop SARL" are both "monishop"; or
+- their names are near-identical (character trigram Jaccard similarity of at
+  least NAME_SIMILARITY) and their countries do not contradict each other; or
+- they cite the same website and it looks like the own site of both: the
+  domain is not a social network or company directory, and its name contains
+  (or is similar to) both company names ("Merec" and "Merec Industries", both
+  citing merecindustries.com). A news site citing two companies is not
+  enough.
+
+Comparing every pair is quadratic, so candidates come from blocking: an
+inverted index from blocking keys (canonical name, name tokens, name
+trigrams, own domains) to profiles. Only profiles sharing a key (or two
+trigrams) are compared, and keys shared by more than MAX_BLOCK_SIZE
+profiles (common tokens and trigrams such as "africa" or "ban") are not used
+for candidates, so the work per profile stays bounded as the store grows.
+
+Usage (bulk pass over data/, or any store URL):
+    python entity_resolution.py --dry-run
+    python entity_resolution.py --store sqlite:///data/profiles.sqlite
+"""
+import argparse
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from page_cache import normalize_url
+from profile_store import DATA_DIR, ProfileStore, as_profile_dict, normalize_company_name, open_profile_store
+
+# Minimum trigram similarity of two names that are the same company on their own
+NAME_SIMILARITY = 0.85
+
+# Minimum trigram similarity of a name and a domain label for the domain to be the company's own
+DOMAIN_NAME_SIMILARITY = 0.5
+
+# Re-read profiles written this many seconds before the last sync, so a write
+# committed slightly out of timestamp order is not missed
+SYNC_SAFETY_WINDOW = 2.0
+
+# Blocking keys shared by more profiles than this are too common to find candidates with
+MAX_BLOCK_SIZE = 200
+
+# Legal forms dropped from the end of a name
+LEGAL_SUFFIXES = {
+    "sarl", "sarlu", "suarl", "sa", "sas", "sasu", "ltd", "limited", "plc", "inc", "incorporated", "llc", "llp",
+    "corp", "corporation", "co", "gmbh", "ag", "bv", "nv", "pty", "pte", "spa", "srl", "lda", "ltda", "sae",
+}
+
+# Sites that host pages about many companies, so sharing them says nothing
+SHARED_DOMAINS = {
+    "facebook.com", "linkedin.com", "x.com", "twitter.com", "instagram.com", "youtube.com", "tiktok.com",
+    "wikipedia.org", "crunchbase.com", "pitchbook.com", "dnb.com", "bloomberg.com", "zoominfo.com",
+    "mapcarta.com", "google.com", "medium.com", "github.com", "glassdoor.com", "cbinsights.com",
+    "swfinstitute.org", "tracxn.com", "owler.com", "apollo.io", "rocketreach.co",
+}
+
+# Second-level labels under country domains ("co" in example.co.ke)
+SECOND_LEVEL_LABELS = {"co", "com", "org", "net", "ac", "gov", "edu", "or", "ne", "gob", "gouv"}
+
+
+def canonical_name(name: str) -> str:
+    """Normalized name without trailing legal forms ("Moni Shop S.A.R.L." -> "moni shop")"""
+    words = normalize_company_name(name).split()
+    if words and words[0] == "the" and len(words) > 1:
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    # Dotted legal forms are split into letters ("s a r l"): drop trailing single letters that spell one
+    for size in range(min(4, len(words) - 1), 1, -1):
+        tail = words[-size:]
+        if all(len(word) == 1 for word in tail) and "".join(tail) in LEGAL_SUFFIXES:
+            words = words[:-size]
+            break
+    return " ".join(words)
+
+
+def name_trigrams(compact: str) -> Set[str]:
+    """Character trigrams of a compact name, with start and end markers"""
+    padded = f"^{compact}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def registrable_domain(url: str) -> str:
+    """Domain a site is registered under ("https://www.shop.example.co.ke/x" -> "example.co.ke")"""
+    host = (urlsplit(url.strip()).hostname or "").lower().rstrip(".")
+    labels = [label for label in host.split(".") if label]
+    if len(labels) < 2 or host.replace(".", "").isdigit():
+        return ""
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def own_domains(profile: Dict) -> Set[str]:
+    """Domains of a profile's sources that can be the company's own website"""
+    domains = set()
+    for url in profile.get("source_urls") or []:
+        domain = registrable_domain(url) if isinstance(url, str) else ""
+        if domain and domain not in SHARED_DOMAINS:
+            domains.add(domain)
+    return domains
+
+
+def _countries(profile: Dict) -> Set[str]:
+    countries = profile.get("countries") or []
+    if isinstance(countries, str):
+        countries = [countries]
+    return {normalize_company_name(country) for country in countries if isinstance(country, str)} - {""}
+
+
+class Entity:
+    """What resolution compares of one profile"""
+
+    __slots__ = ("key", "name", "compact", "trigrams", "domains", "countries")
+
+    def __init__(self, key: str, profile: Dict):
+        self.key = key
+        self.name = canonical_name(profile.get("company_name") or "")
+        self.compact = self.name.replace(" ", "")
+        self.trigrams = name_trigrams(self.compact)
+        self.domains = own_domains(profile)
+        self.countries = _countries(profile)
+
+    def blocking_keys(self) -> Set[str]:
+        keys = {f"n:{self.compact}"}
+        keys.update(f"t:{word}" for word in self.name.split() if len(word) > 1)
+        keys.update(f"g:{gram}" for gram in self.trigrams)
+        keys.update(f"d:{domain}" for domain in self.domains)
+        return keys
+
+    def owns(self, label: str) -> bool:
+        """Whether a domain label looks like this company's own site ("merecindustries" for "Merec")"""
+        if len(self.compact) >= 3 and (self.compact in label or (len(label) >= 3 and label in self.compact)):
+            return True
+        return jaccard(name_trigrams(label), self.trigrams) >= DOMAIN_NAME_SIMILARITY
+
+    def same_company(self, other: "Entity") -> bool:
+        if not self.compact or not other.compact:
+            return False
+        if self.compact == other.compact:
+            return True
+        for domain in self.domains & other.domains:
+            label = domain.split(".")[0]
+            if self.owns(label) and other.owns(label):
+                return True
+        if jaccard(self.trigrams, other.trigrams) >= NAME_SIMILARITY:
+            return not (self.countries and other.countries) or bool(self.countries & other.countries)
+        return False
+
+
+class EntityIndex:
+    """Blocking index over profiles: finds the stored profile a new one duplicates"""
+
+    def __init__(self, max_block_size: int = MAX_BLOCK_SIZE):
+        self.max_block_size = max_block_size
+        self.entities: Dict[str, Entity] = {}
+        self.blocks: Dict[str, Set[str]] = {}
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entities
+
+    def add(self, key: str, profile: Dict):
+        self.remove(key)
+        entity = self.entities[key] = Entity(key, profile)
+        for block in entity.blocking_keys():
+            self.blocks.setdefault(block, set()).add(key)
+
+    def remove(self, key: str):
+        entity = self.entities.pop(key, None)
+        if entity is None:
+            return
+        for block in entity.blocking_keys():
+            members = self.blocks.get(block)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self.blocks[block]
+
+    def candidates(self, entity: Entity) -> Set[str]:
+        """Keys of the profiles sharing a usable name, token or domain block, or two trigram blocks"""
+        found, trigram_hits = set(), Counter()
+        for block in entity.blocking_keys():
+            members = self.blocks.get(block)
+            # Equal canonical names are always compared, however common
+            if not members or (len(members) > self.max_block_size and not block.startswith("n:")):
+                continue
+            if block.startswith("g:"):
+                trigram_hits.update(members)
+            else:
+                found |= members
+        found.update(key for key, hits in trigram_hits.items() if hits >= 2)
+        return found
+
+    def match(self, profile: Dict, exclude: Optional[str] = None) -> Optional[str]:
+        """Key of the indexed profile that is the same company (the most similar name if several)"""
+        entity = Entity(exclude or "", profile)
+        best, best_score = None, -1.0
+        for key in self.candidates(entity):
+            if key == exclude:
+                continue
+            other = self.entities[key]
+            self.comparisons += 1
+            if entity.same_company(other):
+                score = 1.0 if entity.compact == other.compact else jaccard(entity.trigrams, other.trigrams)
+                if score > best_score or (score == best_score and key < best):
+                    best, best_score = key, score
+        return best
+
+
+def _merge_key(value):
+    """Identity of a list item when merging (people by name, URLs normalized, strings case-insensitively)"""
+    if isinstance(value, dict):
+        return str(value.get("name") or "").strip().lower()
+    if isinstance(value, str):
+        return normalize_url(value) if value.startswith(("http://", "https://")) else value.strip().lower()
+    return value
+
+
+def merge_profiles(primary: Dict, secondary: Dict) -> Dict:
+    """
+    Field-level merge of two profiles of the same company
+
+    Empty fields of `primary` are filled from `secondary`, and list fields
+    (countries, sector, key people, source URLs) get the items of `secondary`
+    they do not already have. The inputs are left untouched.
+    """
+    merged = dict(primary)
+    for field, other in secondary.items():
+        value = merged.get(field)
+        if isinstance(value, list):
+            items, seen = list(value), {_merge_key(item) for item in value}
+            for item in other or []:
+                if _merge_key(item) not in seen:
+                    seen.add(_merge_key(item))
+                    items.append(item)
+            merged[field] = items
+        elif not value and other:
+            merged[field] = other
+    return merged
+
+
+def completeness(profile: Dict) -> Tuple[int, int]:
+    """How much a profile says: non-empty fields, then number of list items"""
+    values = [value for value in profile.values() if value]
+    return len(values), sum(len(value) for value in values if isinstance(value, list))
+
+
+class EntityResolver:
+    """Resolves profiles saved into one store against the profiles it already holds"""
+
+    def __init__(self, store: ProfileStore, max_block_size: int = MAX_BLOCK_SIZE):
+        self.store = store
+        self.index = EntityIndex(max_block_size)
+        self.merged = 0
+        self._version = None
+        self._synced_at = 0.0
+        # (store size, start, end) of this resolver's last upsert, to tell it from other writers' changes
+        self._own_write = None
+        self._lock = threading.Lock()
+
+    def _only_own_write(self, version: tuple) -> bool:
+        """Whether the store changed by this resolver's last upsert alone since the last sync"""
+        if self._own_write is None:
+            return False
+        count, started, finished = self._own_write
+        return version[0] == count and started - SYNC_SAFETY_WINDOW <= version[1] <= finished
+
+    def _sync(self):
+        """Index profiles other writers stored since the last sync (lock held)"""
+        version = self.store.version()
+        if version == self._version or self._only_own_write(version):
+            self._version = version
+            return
+        if self._version is None:
+            profiles = self.store.all()
+        else:
+            # Also re-reads this resolver's writes since the last sync, which is harmless
+            profiles = self.store.changed_since(self._synced_at - SYNC_SAFETY_WINDOW)
+        for profile in profiles:
+            key = normalize_company_name(profile.get("company_name") or "")
+            if key:
+                self.index.add(key, profile)
+        self._version, self._synced_at, self._own_write = version, version[1], None
+
+    def resolve(self, profile: Dict) -> Optional[str]:
+        """Key of the stored profile that is the same company under another name"""
+        with self._lock:
+            self._sync()
+            return self._resolve(profile)
+
+    def _resolve(self, profile: Dict) -> Optional[str]:
+        key = normalize_company_name(profile.get("company_name") or "")
+        if key in self.index:
+            return None
+        while True:
+            duplicate = self.index.match(profile, exclude=key)
+            if duplicate is None or self.store.get(duplicate) is not None:
+                return duplicate
+            self.index.remove(duplicate)  # Deleted from the store since it was indexed
+
+    def save(self, profile) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Upsert a profile, merged into the stored profile of the same company if there is one
+
+        A profile whose own name is already stored replaces it, as a plain
+        upsert does. A duplicate under another name is merged into the stored
+        profile, which keeps its name (so its key and file do not change) and
+        gets the new profile's values, filled in from the stored ones.
+
+        Returns:
+            (key the profile was stored under, key it was merged into or None)
+        """
+        data = as_profile_dict(profile)
+        with self._lock:
+            self._sync()
+            duplicate = self._resolve(data)
+            if duplicate is not None:
+                existing = self.store.get(duplicate)
+                data = merge_profiles(data, existing)
+                data["company_name"] = existing["company_name"]
+                self.merged += 1
+            name_key = normalize_company_name(data.get("company_name") or "")
+            count = self._version[0] + (0 if name_key in self.index else 1)
+            started = time.time()
+            key = self.store.upsert(data)
+            if key:
+                self.index.add(key, data)
+                # No version read here: the next save's one read tells this write from others
+                self._own_write = (count, started, time.time())
+        return key, duplicate
+
+
+# One resolver per open store, dropped with the store
+_resolvers: "weakref.WeakKeyDictionary[ProfileStore, EntityResolver]" = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+
+def get_entity_resolver(store: ProfileStore) -> EntityResolver:
+    """The shared resolver of a store (its index is built from the store on first use)"""
+    with _resolvers_lock:
+        resolver = _resolvers.get(store)
+        if resolver is None:
+            resolver = _resolvers[store] = EntityResolver(store)
+        return resolver
+
+
+def find_duplicates(profiles: Iterable[Dict], index: Optional[EntityIndex] = None) -> List[List[Dict]]:
+    """
+    Groups of profiles that are the same company, each with two or more profiles
+
+    Every profile is matched against the groups found so far and joins the
+    group of its match (or starts one), so the cost grows with the number of
+    profiles times the size of their blocks, not with the number of pairs.
+    """
+    index = index if index is not None else EntityIndex()
+    groups: Dict[str, List[Dict]] = {}
+    for profile in profiles:
+        key = normalize_company_name(profile.get("company_name") or "")
+        if not key:
+            continue
+        duplicate = key if key in index else index.match(profile, exclude=key)
+        if duplicate is None:
+            groups[key] = [profile]
+            index.add(key, profile)
+        else:
+            groups[duplicate].append(profile)
+            # Later profiles may match any spelling of the group's name
+            index.add(key, profile)
+            groups[key] = groups[duplicate]
+    unique = {id(group): group for group in groups.values()}
+    return [group for group in unique.values() if len(group) > 1]
+
+
+def deduplicate_store(store: ProfileStore, dry_run: bool = False) -> List[Tuple[str, List[str]]]:
+    """
+    Merge every group of duplicate profiles in a store into one profile
+
+    The most complete profile of a group keeps its name and is filled in from
+    the others, which are deleted.
+
+    Returns:
+        (kept company name, merged company names) per group
+    """
+    merges = []
+    for group in find_duplicates(store.all()):
+        ranked = sorted(group, key=lambda p: (completeness(p), -len(p.get("company_name") or "")), reverse=True)
+        kept, others = ranked[0], ranked[1:]
+        merges.append((kept["company_name"], [p["company_name"] for p in others]))
+        if dry_run:
+            continue
+        merged = kept
+        for other in others:
+            merged = merge_profiles(merged, other)
+        kept_key = normalize_company_name(kept["company_name"])
+        for other in others:
+            if normalize_company_name(other["company_name"]) != kept_key:
+                store.delete(other["company_name"])
+        store.upsert(merged)
+    return merges
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge duplicate company profiles")
+    parser.add_argument("--store", default=f"json:///{DATA_DIR}",
+                        help="Store URL (json:///dir or sqlite:///path; default: the data/ directory)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the duplicates")
+    args = parser.parse_args()
+
+    store = open_profile_store(args.store)
+    before = store.count()
+    merges = deduplicate_store(store, dry_run=args.dry_run)
+    for kept, others in merges:
+        print(f"🔗 {kept} <- {', '.join(others)}")
+    verb = "Found" if args.dry_run else "Merged"
+    print(f"{verb} {sum(len(others) for _, others in merges)} duplicate profiles in {len(merges)} groups "
+          f"({before} profiles{'' if args.dry_run else f' -> {store.count()}'})")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
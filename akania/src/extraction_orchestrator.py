@@ -0,0 +1,597 @@
+"""
+Batch extraction pipeline for many companies.
+
+Runs search -> scrape -> LLM extraction -> save as a pipelined producer/consumer
+graph: each stage has its own worker pool and queue, so the stages overlap
+across companies. The number of companies in flight is bounded (backpressure),
+finished companies are checkpointed so a crashed run resumes where it left off,
+and a per-stage throughput report is printed at the end, together with the
+latency histograms of the traced spans (search, fetch, reduce, llm, save).
+With --trace-log every span is also written as a JSON line.
+
+Every saved company gets a source fingerprint (URLs plus a hash of the reduced
+page text). A --refresh run processes companies again, ignoring the checkpoint,
+but skips the LLM for those whose sources are unchanged.
+
+With --batch-token-budget, the reduced content of several companies is packed
+into one LLM request (numbered sections, up to --batch-size companies within
+the token budget) whose CompanyInfoBatch reply is mapped back to the
+companies, so the fixed cost of a call (system prompt, schema, round trip) is
+shared. Companies the reply leaves out, or the whole batch if the call or its
+parsing fails, fall back to single-company calls.
+
+Usage:
+    python extraction_orchestrator.py --input companies.txt --checkpoint batch_checkpoint.jsonl
+    python extraction_orchestrator.py "Sylndr (Egypt)" "Lapaire Glasses (Kenya)"
+    python extraction_orchestrator.py --refresh --input companies.txt
+    python extraction_orchestrator.py --trace-log traces.jsonl --input companies.txt
+    python extraction_orchestrator.py --batch-token-budget 12000 --input companies.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_tavily import TavilySearch
+from assistant import (
+    alternate_search_query,
+    batch_extraction_token_estimate,
+    batch_section_tokens,
+    build_batch_extraction_chain,
+    build_extraction_chain,
+    extraction_output_tokens,
+    extraction_token_estimate,
+    extraction_tokens_used,
+    first_search_query,
+    format_batch_sections,
+    is_result_incomplete,
+    merge_results,
+    reduce_for_extraction,
+    results_by_company,
+    search_company_urls,
+)
+from company_profiles import save_company_profile
+from fingerprint_store import FingerprintStore, content_hash, get_fingerprint_store
+from profile_store import get_profile_store
+from rate_limiter import limited_acall
+from scraper import get_page_cache, pooled_fetcher, scrape_urls_async
+from search_cache import get_search_cache
+from telemetry import configure_trace_log, print_run_summary, span, trace_run
+
+# Load environment
+load_dotenv('../../.env')
+
+# Checkpoint statuses that count as done when resuming ("error" items are retried)
+FINISHED_STATUSES = {"saved", "no_data", "unchanged"}
+
+# Token budget of one batched multi-company extraction call (0 = one call per company)
+EXTRACTION_BATCH_TOKEN_BUDGET = int(os.getenv('EXTRACTION_BATCH_TOKEN_BUDGET', '0'))
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def record(self, seconds: float, failed: bool = False):
+        self.processed += 1
+        self.busy_seconds += seconds
+        if failed:
+            self.failed += 1
+
+    def to_dict(self, wall_seconds: float) -> Dict:
+        return {
+            "stage": self.name,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_seconds": round(self.busy_seconds / self.processed, 3) if self.processed else 0.0,
+            "throughput_per_second": round(self.processed / wall_seconds, 3) if wall_seconds else 0.0,
+        }
+
+
+class BatchItem:
+    """One company moving through the pipeline"""
+
+    def __init__(self, company_query: str):
+        self.company_query = company_query
+        self.attempt = 1
+        self.search_query = ""
+        self.urls: List[str] = []
+        self.docs: List = []
+        self.fingerprint = None  # (urls, content hash) of the first attempt
+        self.first_result = None
+        self.result = None
+        self.stored_as = None  # Key the result was saved under (a duplicate's key when merged into it)
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished companies"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+
+    def finished_queries(self) -> set:
+        """Queries already finished by a previous run"""
+        if not self.path or not os.path.exists(self.path):
+            return set()
+
+        finished = set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line of a crashed run
+                if entry.get("status") in FINISHED_STATUSES:
+                    finished.add(entry["query"])
+        return finished
+
+    def record(self, query: str, status: str, company_name: Optional[str] = None):
+        if not self.path:
+            return
+        entry = {
+            "query": query,
+            "status": status,
+            "company_name": company_name,
+            "timestamp": datetime.now().isoformat(),
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def default_stage_functions() -> Dict[str, Callable]:
+    """Real search/scrape/extract/save stages backed by Tavily, the scraper and OpenAI"""
+    search = TavilySearch(max_results=5, topic="general")
+    chain = build_extraction_chain()
+    batch_chain = build_batch_extraction_chain()
+
+    async def search_fn(search_query: str) -> List[str]:
+        return await asyncio.to_thread(search_company_urls, search, search_query)
+
+    async def scrape_fn(urls: List[str]):
+        return await scrape_urls_async(urls, main_content=True)
+
+    async def extract_fn(content: str, urls):
+        tokens = extraction_token_estimate(content)
+        return await limited_acall("openai", chain.ainvoke, {"content": content, "urls": urls}, tokens=tokens,
+                                   usage=lambda reply: extraction_tokens_used(tokens, reply))
+
+    async def batch_extract_fn(entries):
+        tokens = batch_extraction_token_estimate(content for _, content, _ in entries)
+        return await limited_acall("openai", batch_chain.ainvoke, {"companies": format_batch_sections(entries)},
+                                   tokens=tokens, usage=lambda reply: extraction_tokens_used(tokens, reply, len(entries)))
+
+    async def save_fn(result):
+        return await asyncio.to_thread(save_company_profile, result)
+
+    return {
+        "search": search_fn,
+        "scrape": scrape_fn,
+        "extract": extract_fn,
+        "batch_extract": batch_extract_fn,
+        "save": save_fn,
+    }
+
+
+class ExtractionPipeline:
+    """Pipelined batch runner for extract_company_data-style extraction"""
+
+    def __init__(self, search_fn: Callable = None, scrape_fn: Callable = None,
+                 extract_fn: Callable = None, save_fn: Callable = None,
+                 search_workers: int = 2, scrape_workers: int = 4, llm_workers: int = 2,
+                 max_in_flight: int = 10, checkpoint_path: Optional[str] = None,
+                 token_budget: Optional[int] = None, refresh: bool = False,
+                 fingerprints: Optional[FingerprintStore] = None,
+                 profile_exists: Optional[Callable[[str], bool]] = None,
+                 batch_extract_fn: Callable = None, batch_token_budget: int = 0,
+                 batch_size: int = 8, batch_wait: float = 0.5):
+        stage_fns = (search_fn, scrape_fn, extract_fn, save_fn) + ((batch_extract_fn,) if batch_token_budget else ())
+        if not all(stage_fns):
+            defaults = default_stage_functions()
+            search_fn = search_fn or defaults["search"]
+            scrape_fn = scrape_fn or defaults["scrape"]
+            extract_fn = extract_fn or defaults["extract"]
+            save_fn = save_fn or defaults["save"]
+            batch_extract_fn = batch_extract_fn or defaults["batch_extract"]
+
+        self.search_fn = search_fn
+        self.scrape_fn = scrape_fn
+        self.extract_fn = extract_fn
+        self.save_fn = save_fn
+        self.batch_extract_fn = batch_extract_fn
+        self.batch_token_budget = batch_token_budget
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.search_workers = search_workers
+        self.scrape_workers = scrape_workers
+        self.llm_workers = llm_workers
+        self.max_in_flight = max_in_flight
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.token_budget = token_budget
+        self.refresh = refresh
+        self.fingerprints = fingerprints or get_fingerprint_store()
+        self.profile_exists = profile_exists or (lambda name: get_profile_store().get(name) is not None)
+        self.scraped_queries = set()
+        self.extracted_queries = set()
+        self.unchanged = 0
+        self.content_tokens = {"before": 0, "after": 0}
+        self.llm_calls = 0
+        self.batching = {"batches": 0, "batched_companies": 0, "fallbacks": 0}
+        self._batched_items = 0
+        self._in_pipeline = 0
+        self.stats = {name: StageStats(name) for name in ("search", "scrape", "extract", "save")}
+        self.results: Dict[str, object] = {}
+
+    async def run(self, company_queries: List[str]) -> Dict:
+        """Process all queries and return the throughput report"""
+        # A refresh revisits every company; fingerprints decide what is re-extracted
+        finished = set() if self.refresh else self.checkpoint.finished_queries()
+        queries = list(dict.fromkeys(company_queries))  # Duplicates run once and are not "skipped"
+        pending = [query for query in queries if query not in finished]
+        skipped = len(queries) - len(pending)
+
+        self._search_queue = asyncio.Queue()
+        self._scrape_queue = asyncio.Queue()
+        self._extract_queue = asyncio.Queue()
+        self._batch_queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._remaining = len(pending)
+        self._all_done = asyncio.Event()
+        if not pending:
+            self._all_done.set()
+
+        start = time.perf_counter()
+        # Tasks copy the context, so every span of the workers lands in this run's histograms
+        # and every company is scraped through one connection pool and one set of per-host limits
+        async with pooled_fetcher():
+            with trace_run("batch") as run_trace:
+                workers = (
+                    [asyncio.create_task(self._worker(self._search_queue, self._search_stage)) for _ in range(self.search_workers)]
+                    + [asyncio.create_task(self._worker(self._scrape_queue, self._scrape_stage)) for _ in range(self.scrape_workers)]
+                    + [asyncio.create_task(self._worker(self._extract_queue, self._extract_stage)) for _ in range(self.llm_workers)]
+                )
+                if self.batch_token_budget:
+                    workers += [asyncio.create_task(self._batch_worker()) for _ in range(self.llm_workers)]
+                feeder = asyncio.create_task(self._feed(pending))
+
+                try:
+                    await self._all_done.wait()
+                    await feeder
+                finally:
+                    for task in workers + [feeder]:
+                        task.cancel()
+                    await asyncio.gather(*workers, feeder, return_exceptions=True)
+
+        wall_seconds = time.perf_counter() - start
+        return {
+            "companies": len(queries),
+            "skipped_from_checkpoint": skipped,
+            "processed": len(pending),
+            "saved": sum(1 for result in self.results.values() if result),
+            "wall_seconds": round(wall_seconds, 3),
+            "stages": [stats.to_dict(wall_seconds) for stats in self.stats.values()],
+            "content_tokens": dict(self.content_tokens),
+            "llm": {
+                "calls": self.llm_calls,
+                "companies": len(self.extracted_queries),
+                "calls_per_company": round(self.llm_calls / len(self.extracted_queries), 3)
+                if self.extracted_queries else 0.0,
+                **(self.batching if self.batch_token_budget else {}),
+            },
+            "sources": {
+                "skipped_unchanged": self.unchanged,
+                "rescraped": len(self.scraped_queries),
+                "reextracted": len(self.extracted_queries),
+            },
+            "caches": cache_stats(),
+            "spans": run_trace.summary(),
+        }
+
+    async def _feed(self, queries: List[str]):
+        for query in queries:
+            # Backpressure: wait until a company leaves the pipeline
+            await self._in_flight.acquire()
+            item = BatchItem(query)
+            self._in_pipeline += 1
+            item.search_query = first_search_query(query)
+            await self._search_queue.put(item)
+
+    async def _worker(self, queue: asyncio.Queue, stage: Callable):
+        while True:
+            item = await queue.get()
+            try:
+                await stage(item)
+            except Exception as e:
+                print(f"Error processing {item.company_query}: {e}")
+                await self._finish(item, status="error")
+            finally:
+                queue.task_done()
+
+    async def _timed(self, stage_name: str, coroutine):
+        start = time.perf_counter()
+        failed = True
+        try:
+            value = await coroutine
+            failed = not value
+            return value
+        finally:
+            self.stats[stage_name].record(time.perf_counter() - start, failed=failed)
+
+    async def _search_stage(self, item: BatchItem):
+        item.urls = await self._timed("search", self.search_fn(item.search_query))
+        if not item.urls:
+            await self._attempt_done(item, None)
+            return
+        await self._scrape_queue.put(item)
+
+    async def _scrape_stage(self, item: BatchItem):
+        self.scraped_queries.add(item.company_query)
+        item.docs = await self._timed("scrape", self.scrape_fn(item.urls))
+        if not item.docs:
+            await self._attempt_done(item, None)
+            return
+        await self._extract_queue.put(item)
+
+    async def _extract_stage(self, item: BatchItem):
+        # Only the relevant, de-duplicated paragraphs within the token budget reach the LLM
+        content = reduce_for_extraction(item.docs, item.company_query, self.token_budget)
+        self.content_tokens["before"] += content.tokens_before
+        self.content_tokens["after"] += content.tokens_after
+
+        if item.attempt == 1:
+            item.fingerprint = (item.urls, content_hash(content.text))
+            if self.refresh:
+                previous = self.fingerprints.unchanged(item.company_query, *item.fingerprint)
+                if previous and self.profile_exists(previous.profile_name):
+                    # Same URLs and same page text as the saved profile: no LLM call
+                    self.unchanged += 1
+                    await self._finish(item, status="unchanged")
+                    return
+
+        self.extracted_queries.add(item.company_query)
+        if self.batch_token_budget:
+            await self._batch_queue.put((item, content))
+            return
+        await self._attempt_done(item, await self._extract_single(item, content))
+
+    async def _extract_single(self, item: BatchItem, content):
+        self.llm_calls += 1
+        tokens_in = extraction_token_estimate(content.text)
+        with span("llm", company=item.company_query, attempt=item.attempt, tokens_in=tokens_in) as current:
+            result = await self._timed("extract", self.extract_fn(content.text, item.urls))
+            current.set(tokens_out=extraction_output_tokens(result))
+        return result
+
+    async def _next_batch(self, carry):
+        """
+        Collect companies for one batched call: up to batch_size within the token budget
+
+        Waits up to batch_wait for more companies, unless every company still in
+        the pipeline is already in a batch. Returns the batch and the company that
+        did not fit (the first of the next batch).
+        """
+        if carry is None:
+            carry = await self._batch_queue.get()
+            self._batched_items += 1
+        first = carry
+        batch = [first]
+        tokens = batch_extraction_token_estimate([first[1].text])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size and self._batched_items < self._in_pipeline:
+            try:
+                entry = self._batch_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._batch_queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            self._batched_items += 1
+            section = batch_section_tokens(entry[1].text)
+            if tokens + section > self.batch_token_budget:
+                return batch, entry
+            batch.append(entry)
+            tokens += section
+        return batch, None
+
+    async def _batch_worker(self):
+        carry = None
+        while True:
+            batch, carry = await self._next_batch(carry)
+            try:
+                results = await self._extract_batch(batch)
+            except Exception as e:
+                print(f"Error in batched extraction: {e}")
+                for item, _ in batch:
+                    self._batched_items -= 1
+                    await self._finish(item, status="error")
+                continue
+            for (item, _), result in zip(batch, results):
+                self._batched_items -= 1
+                try:
+                    await self._attempt_done(item, result)
+                except Exception as e:
+                    print(f"Error processing {item.company_query}: {e}")
+                    await self._finish(item, status="error")
+
+    async def _extract_batch(self, batch) -> List:
+        """One LLM call for several companies; companies it does not cover fall back to single calls"""
+        if len(batch) == 1:
+            item, content = batch[0]
+            return [await self._extract_single(item, content)]
+
+        self.llm_calls += 1
+        self.batching["batches"] += 1
+        self.batching["batched_companies"] += len(batch)
+        entries = [(item.company_query, content.text, item.urls) for item, content in batch]
+        tokens_in = batch_extraction_token_estimate(text for _, text, _ in entries)
+        with span("llm", companies=len(batch), batched=True, tokens_in=tokens_in) as current:
+            try:
+                reply = await self._timed("extract", self.batch_extract_fn(entries))
+            except Exception as e:
+                print(f"Batched extraction of {len(batch)} companies failed, extracting them one by one: {e}")
+                reply = None
+            results = results_by_company(reply, len(batch))
+            current.set(tokens_out=sum(extraction_output_tokens(result) for result in results))
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        self.batching["fallbacks"] += len(missing)
+        singles = await asyncio.gather(*(self._extract_single(*batch[index]) for index in missing))
+        for index, result in zip(missing, singles):
+            results[index] = result
+        return results
+
+    async def _attempt_done(self, item: BatchItem, result):
+        if item.attempt == 1 and is_result_incomplete(result):
+            # Retry with the alternate query; the company keeps its in-flight slot
+            item.first_result = result
+            item.attempt = 2
+            item.search_query = alternate_search_query(item.company_query)
+            print(f"🔄 Retry search: {item.search_query}")
+            await self._search_queue.put(item)
+            return
+
+        if item.attempt == 2:
+            result = merge_results(item.first_result, result)
+
+        item.result = result
+        if result:
+            await self._timed("save", self._save(item, result))
+            if item.fingerprint:
+                self.fingerprints.record(item.company_query, *item.fingerprint, item.stored_as or result.company_name)
+            await self._finish(item, status="saved")
+        else:
+            await self._finish(item, status="no_data")
+
+    async def _save(self, item: BatchItem, result) -> bool:
+        item.stored_as = await self.save_fn(result)
+        return True
+
+    async def _finish(self, item: BatchItem, status: str):
+        self.results[item.company_query] = item.result
+        company_name = item.result.company_name if item.result else None
+        self.checkpoint.record(item.company_query, status, company_name)
+        print(f"{'✅' if status in ('saved', 'unchanged') else '❌'} {item.company_query}: {status}")
+
+        self._in_flight.release()
+        self._in_pipeline -= 1
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._all_done.set()
+
+
+def cache_stats() -> Dict:
+    """Hit ratios of the shared search and page caches"""
+    caches = {}
+    search_cache = get_search_cache()
+    if search_cache:
+        caches["search"] = search_cache.stats()
+    page_cache = get_page_cache()
+    if page_cache:
+        caches["pages"] = page_cache.stats()
+    return caches
+
+
+def run_batch(company_queries: List[str], **pipeline_options) -> Dict:
+    """Run the batch pipeline synchronously and return the throughput report"""
+    pipeline = ExtractionPipeline(**pipeline_options)
+    return asyncio.run(pipeline.run(company_queries))
+
+
+def read_queries(path: str) -> List[str]:
+    """Read one company query per line, ignoring blanks and # comments"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def print_report(report: Dict):
+    print("\n📊 Batch extraction report")
+    print("=" * 50)
+    print(f"Companies: {report['companies']} (skipped from checkpoint: {report['skipped_from_checkpoint']})")
+    print(f"Saved: {report['saved']}/{report['processed']} in {report['wall_seconds']}s")
+    print(f"{'stage':<10}{'done':>8}{'failed':>8}{'avg s':>10}{'items/s':>10}")
+    for stage in report["stages"]:
+        print(f"{stage['stage']:<10}{stage['processed']:>8}{stage['failed']:>8}"
+              f"{stage['avg_seconds']:>10}{stage['throughput_per_second']:>10}")
+    content_tokens = report.get("content_tokens")
+    if content_tokens and content_tokens["before"]:
+        print(f"Extraction input: {content_tokens['before']} -> {content_tokens['after']} tokens "
+              f"({1 - content_tokens['after'] / content_tokens['before']:.0%} less)")
+    sources = report.get("sources")
+    if sources:
+        print(f"Sources: {sources['skipped_unchanged']} unchanged (skipped), "
+              f"{sources['rescraped']} re-scraped, {sources['reextracted']} re-extracted")
+    for name, stats in report.get("caches", {}).items():
+        print(f"{name} cache: hit ratio {stats['hit_ratio']} "
+              f"({stats['hits']} hits, {stats['misses']} misses)")
+    if "search" in report.get("caches", {}):
+        print(f"Search API calls saved: {report['caches']['search']['saved_calls']}")
+    llm = report.get("llm")
+    if llm:
+        batching = (f", {llm['batches']} batches of {llm['batched_companies']} companies, "
+                    f"{llm['fallbacks']} single-call fallbacks") if "batches" in llm else ""
+        print(f"LLM calls: {llm['calls']} for {llm['companies']} companies "
+              f"({llm['calls_per_company']} per company{batching})")
+    if report.get("spans"):
+        print("Span latencies:")
+        print_run_summary(report["spans"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch extraction of African company profiles")
+    parser.add_argument("queries", nargs="*", help="Company queries, e.g. \"Sylndr (Egypt)\"")
+    parser.add_argument("--input", help="File with one company query per line")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl", help="Checkpoint file used to resume runs")
+    parser.add_argument("--search-workers", type=int, default=2)
+    parser.add_argument("--scrape-workers", type=int, default=4)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--max-in-flight", type=int, default=10, help="Maximum companies in the pipeline at once")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Revisit finished companies, re-extracting only those whose sources changed")
+    parser.add_argument("--trace-log", help="Write every traced span as a JSON line to this file (or stderr)")
+    parser.add_argument("--batch-token-budget", type=int, default=EXTRACTION_BATCH_TOKEN_BUDGET,
+                        help="Pack several companies into one LLM call within this many tokens (0: one call each)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Maximum companies per batched LLM call (keep --max-in-flight above it)")
+    args = parser.parse_args()
+    configure_trace_log(args.trace_log)
+
+    queries = list(args.queries)
+    if args.input:
+        queries.extend(read_queries(args.input))
+    if not queries:
+        parser.error("no company queries given")
+
+    if not os.getenv('OPENAI_API_KEY') or not os.getenv('TAVILY_API_KEY'):
+        print("❌ Please set OPENAI_API_KEY and TAVILY_API_KEY in .env file")
+        return
+
+    report = run_batch(
+        queries,
+        search_workers=args.search_workers,
+        scrape_workers=args.scrape_workers,
+        llm_workers=args.llm_workers,
+        max_in_flight=args.max_in_flight,
+        checkpoint_path=args.checkpoint,
+        refresh=args.refresh,
+        batch_token_budget=args.batch_token_budget,
+        batch_size=args.batch_size,
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Asynchronous page fetcher used by the scraper.
+
+One pooled HTTP client is shared by every request of a fetcher, with a global
+and a per-host concurrency limit, timeouts and retries with exponential backoff.
+With a RateLimiter, every request also waits for its host's token bucket and
+reports the response status back so throttled hosts are slowed down.
+"""
+import asyncio
+import random
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from content_reducer import main_content_text
+from page_cache import PageCache
+from rate_limiter import RateLimiter
+from telemetry import span
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def html_to_document(url: str, html: str, main_content: bool = False) -> Document:
+    """
+    Convert a fetched HTML page to a Document, like WebBaseLoader does
+
+    With main_content, the text is the page's main content only (no scripts,
+    navigation, footers or banners), one block per line.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if soup.title and soup.title.string:
+        metadata["title"] = soup.title.string.strip()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description and description.get("content"):
+        metadata["description"] = description.get("content")
+    html_tag = soup.find("html")
+    if html_tag and html_tag.get("lang"):
+        metadata["language"] = html_tag.get("lang")
+    text = main_content_text(soup) if main_content else soup.get_text()
+    return Document(page_content=text, metadata=metadata)
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After header in seconds (the HTTP-date form is ignored)"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def host_of(url: str) -> str:
+    """Host part of a URL, used as the key for per-host limits"""
+    return urlsplit(url).netloc.lower()
+
+
+class AsyncFetcher:
+    """Concurrent HTTP fetcher with a shared connection pool"""
+
+    def __init__(self, max_concurrency: int = 10, per_host_limit: int = 2, timeout: float = 15.0,
+                 retries: int = 2, backoff: float = 0.5, headers: Optional[Dict[str, str]] = None,
+                 cache: Optional[PageCache] = None, main_content: bool = False,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = headers or DEFAULT_HEADERS
+        self.cache = cache
+        self.main_content = main_content
+        self.rate_limiter = rate_limiter
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = host_of(url)
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def _sleep_before_retry(self, attempt: int):
+        delay = self.backoff * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def fetch_html(self, url: str) -> str:
+        """Fetch the raw HTML of a URL, using the page cache when one is configured"""
+        if self._client is None:
+            raise RuntimeError("AsyncFetcher must be used as an async context manager")
+
+        with span("fetch", url=url, host=host_of(url)) as current:
+            # The cache reads and writes SQLite and body files: keep that off the event loop
+            cached = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+            if cached and cached.fresh:
+                current.set(cache="fresh", bytes=len(cached.body))
+                return cached.body
+
+            conditional_headers = cached.conditional_headers() if cached else {}
+            response = await self._get(url, conditional_headers)
+            current.set(status=response.status_code)
+
+            if response.status_code == 304 and cached:
+                await asyncio.to_thread(self.cache.mark_revalidated, url, response.headers.get("ETag"),
+                                        response.headers.get("Last-Modified"))
+                current.set(cache="revalidated", bytes=len(cached.body))
+                return cached.body
+
+            response.raise_for_status()
+            if self.cache:
+                await asyncio.to_thread(self.cache.store, url, response.text, response.headers.get("ETag"),
+                                        response.headers.get("Last-Modified"))
+            current.set(cache="miss", bytes=len(response.content))
+            return response.text
+
+    async def _get(self, url: str, extra_headers: Dict[str, str]) -> httpx.Response:
+        """GET with the concurrency limits applied, retrying transient failures"""
+        host_key = f"host:{host_of(url)}"
+        async with self._global_limit, self._host_limit(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire_async(host_key)
+                    response = await self._client.get(url, headers=extra_headers)
+                    if self.rate_limiter:
+                        self.rate_limiter.report(host_key, response.status_code, retry_after_seconds(response))
+                    if response.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                        await self._sleep_before_retry(attempt)
+                        continue
+                    return response
+                except (httpx.TimeoutException, httpx.TransportError):
+                    if attempt >= self.retries:
+                        raise
+                    await self._sleep_before_retry(attempt)
+
+        raise RuntimeError(f"Retries exhausted for {url}")
+
+    async def fetch(self, url: str, main_content: Optional[bool] = None) -> Optional[Document]:
+        """Fetch a URL as a Document, or None if it could not be fetched (main_content defaults to the fetcher's)"""
+        try:
+            html = await self.fetch_html(url)
+        except Exception as e:
+            print(f"Failed to scrape {url}: {e}")
+            return None
+        # Parsing a large page takes long enough to stall every other fetch on the loop
+        return await asyncio.to_thread(html_to_document, url, html,
+                                       self.main_content if main_content is None else main_content)
+
+    async def stream(self, urls: List[str], main_content: Optional[bool] = None) -> AsyncIterator[Document]:
+        """Yield documents as soon as each one arrives (completion order)"""
+        tasks = [asyncio.ensure_future(self.fetch(url, main_content)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                document = await next_done
+                if document is not None:
+                    yield document
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_all(self, urls: List[str], main_content: Optional[bool] = None) -> List[Document]:
+        """Fetch all URLs concurrently, keeping the input order and dropping failures"""
+        documents = await asyncio.gather(*(self.fetch(url, main_content) for url in urls))
+        return [document for document in documents if document is not None]
@@ -0,0 +1,108 @@
+"""
+Source fingerprints for incremental re-extraction.
+
+For every company that was extracted and saved, records the URLs its profile
+was built from and a hash of the reduced page text that went to the LLM. A
+refresh run compares the fresh search/scrape against the fingerprint and skips
+the LLM call when both are unchanged and the profile is still in the store.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from profile_store import normalize_company_name
+
+
+def fingerprint_key(company_query: str) -> str:
+    """Key of a company query ("Sylndr (Egypt)" and "sylndr (Egypt)" share one)"""
+    return normalize_company_name(company_query)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Fingerprint:
+    def __init__(self, key: str, urls: List[str], content_hash: str, profile_name: Optional[str],
+                 updated_at: float):
+        self.key = key
+        self.urls = urls
+        self.content_hash = content_hash
+        self.profile_name = profile_name
+        self.updated_at = updated_at
+
+    def matches(self, urls: List[str], text_hash: str) -> bool:
+        return self.urls == sorted(urls) and self.content_hash == text_hash
+
+
+class FingerprintStore:
+    """SQLite table of the last extracted sources per company"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                company_key TEXT PRIMARY KEY,
+                urls TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                profile_name TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, company_query: str) -> Optional[Fingerprint]:
+        key = fingerprint_key(company_query)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT urls, content_hash, profile_name, updated_at FROM fingerprints WHERE company_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Fingerprint(key, json.loads(row[0]), row[1], row[2], row[3])
+
+    def record(self, company_query: str, urls: List[str], text_hash: str, profile_name: Optional[str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints (company_key, urls, content_hash, profile_name, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint_key(company_query), json.dumps(sorted(urls)), text_hash, profile_name, time.time()),
+            )
+            self._db.commit()
+
+    def unchanged(self, company_query: str, urls: List[str], text_hash: str) -> Optional[Fingerprint]:
+        """The stored fingerprint if the sources are the same as last time, else None"""
+        fingerprint = self.get(company_query)
+        if fingerprint is not None and fingerprint.matches(urls, text_hash):
+            return fingerprint
+        return None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {"companies": self.count(), "db_path": self.db_path}
+
+    def close(self):
+        self._db.close()
+
+
+# Shared store for the assistant and the batch pipeline
+_fingerprint_store: Optional[FingerprintStore] = None
+
+
+def get_fingerprint_store() -> FingerprintStore:
+    """Process-wide fingerprint store at FINGERPRINT_DB"""
+    global _fingerprint_store
+    if _fingerprint_store is None:
+        _fingerprint_store = FingerprintStore(os.getenv('FINGERPRINT_DB', '.fingerprints.sqlite'))
+    return _fingerprint_store
@@ -0,0 +1,237 @@
+"""
+Persistent on-disk cache for scraped pages.
+
+Page bodies are stored content-addressed (by SHA-256) so identical pages served
+under different URLs are kept once; a small SQLite index maps normalized URLs to
+bodies along with their ETag/Last-Modified validators. Entries are fresh for a
+configurable TTL, revalidated with conditional requests afterwards, and evicted
+least-recently-used first once the cache grows past its size cap.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "srsltid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL used as the cache key"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class CachedPage:
+    """A cached page body with its validators"""
+
+    def __init__(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str],
+                 fetched_at: float, fresh: bool):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.fresh = fresh
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers for revalidating a stale entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """Content-addressed page cache with TTL, conditional revalidation and LRU eviction"""
+
+    def __init__(self, cache_dir: str = ".page_cache", ttl_seconds: float = 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024, clock=time.time):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                content_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_by_access ON pages (last_access)")
+        self._db.commit()
+
+    def _object_path(self, content_hash: str) -> str:
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash)
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """
+        Find a cached page for the URL
+
+        Returns:
+            The cached page (check `fresh` to know whether it needs revalidation),
+            or None on a miss. Fresh lookups count as hits.
+        """
+        url_key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, etag, last_modified, fetched_at FROM pages WHERE url_key = ?",
+                (url_key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            content_hash, etag, last_modified, fetched_at = row
+            try:
+                with open(self._object_path(content_hash), "r", encoding="utf-8") as f:
+                    body = f.read()
+            except OSError:
+                self._db.execute("DELETE FROM pages WHERE url_key = ?", (url_key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            now = self.clock()
+            fresh = now - fetched_at < self.ttl_seconds
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._db.execute("UPDATE pages SET last_access = ? WHERE url_key = ?", (now, url_key))
+            self._db.commit()
+
+        return CachedPage(url, body, etag, last_modified, fetched_at, fresh)
+
+    def store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Cache a freshly downloaded page body"""
+        data = body.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._object_path(content_hash)
+        now = self.clock()
+
+        url_key = normalize_url(url)
+
+        with self._lock:
+            previous = self._db.execute("SELECT content_hash FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._db.execute("INSERT OR IGNORE INTO objects (content_hash, size) VALUES (?, ?)",
+                             (content_hash, len(data)))
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url_key, content_hash, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url_key, content_hash, etag, last_modified, now, now),
+            )
+            if previous and previous[0] != content_hash:
+                self._drop_object_if_unused(previous[0])
+            self._db.commit()
+            self.stores += 1
+            self._evict()
+
+    def mark_revalidated(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Restart the TTL of an entry after the server answered 304 Not Modified"""
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url_key = ?",
+                (now, now, etag, last_modified, normalize_url(url)),
+            )
+            self._db.commit()
+            self.revalidated += 1
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _drop_object_if_unused(self, content_hash: str) -> int:
+        """Delete a body no page refers to any more; returns the bytes freed (lock held)"""
+        still_used = self._db.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1",
+                                      (content_hash,)).fetchone()
+        if still_used:
+            return 0
+
+        size = self._db.execute("SELECT size FROM objects WHERE content_hash = ?", (content_hash,)).fetchone()
+        self._db.execute("DELETE FROM objects WHERE content_hash = ?", (content_hash,))
+        try:
+            os.remove(self._object_path(content_hash))
+        except OSError:
+            pass
+        return size[0] if size else 0
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits its size cap (lock held)"""
+        total = self._total_bytes()
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT url_key, content_hash FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            url_key, content_hash = row
+            self._db.execute("DELETE FROM pages WHERE url_key = ?", (url_key,))
+            self.evictions += 1
+
+            total -= self._drop_object_if_unused(content_hash)
+        self._db.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes": self.total_bytes(),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
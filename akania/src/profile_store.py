@@ -0,0 +1,486 @@
+"""
+Pluggable storage for company profiles.
+
+ProfileStore is the interface used by the extraction side (save_company_profile)
+and the chat backend. Two backends are provided:
+
+- SQLiteProfileStore: one indexed database with upserts keyed by normalized
+  company name and secondary indexes on country and sector.
+- JsonDirectoryProfileStore: the original one-JSON-file-per-company layout,
+  kept for compatibility and used as the import/export format.
+"""
+import abc
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+DEFAULT_STORE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'profiles.sqlite')}"
+
+# A CompanyInfo model or its model_dump() dict
+ProfileLike = Any
+
+
+def normalize_company_name(name: str) -> str:
+    """Lookup key for a company name: accents, case, punctuation and spacing removed"""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def normalize_facet(value: str) -> str:
+    """Lookup key for a country or sector value"""
+    return " ".join(value.lower().split()) if value else ""
+
+
+def _mtime(file_path: str) -> float:
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return 0.0
+
+
+def as_profile_dict(profile: ProfileLike) -> Dict:
+    if hasattr(profile, "model_dump"):
+        return profile.model_dump()
+    return dict(profile)
+
+
+class ProfileStore(abc.ABC):
+    """Interface for company profile storage backends"""
+
+    @abc.abstractmethod
+    def upsert(self, profile: ProfileLike) -> Optional[str]:
+        """Insert or replace a profile; returns its normalized name key (None if unnamed)"""
+
+    def upsert_many(self, profiles: Iterable[ProfileLike]) -> int:
+        """Upsert several profiles; returns how many were stored"""
+        return sum(1 for profile in profiles if self.upsert(profile))
+
+    @abc.abstractmethod
+    def get(self, company_name: str) -> Optional[Dict]:
+        """Profile by (normalized) company name"""
+
+    @abc.abstractmethod
+    def find(self, country: Optional[str] = None, sector: Optional[str] = None,
+             limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Profiles operating in a country and/or sector"""
+
+    @abc.abstractmethod
+    def all(self) -> List[Dict]:
+        """Every stored profile, ordered by normalized name"""
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        """Number of stored profiles"""
+
+    @abc.abstractmethod
+    def delete(self, company_name: str) -> bool:
+        """Remove a profile by (normalized) company name; returns whether it existed"""
+
+    def keys(self) -> set:
+        """Normalized names of every stored profile"""
+        return {normalize_company_name(p.get("company_name") or "") for p in self.all()}
+
+    @abc.abstractmethod
+    def version(self) -> tuple:
+        """Cheap value that changes whenever the stored profiles change"""
+
+    @abc.abstractmethod
+    def changed_since(self, timestamp: float) -> List[Dict]:
+        """Profiles written at or after the timestamp (see last_modified())"""
+
+    @abc.abstractmethod
+    def last_modified(self) -> float:
+        """Timestamp of the most recent write, to pass to changed_since()"""
+
+    def import_json_dir(self, data_dir: str, newer_than: Optional[float] = None) -> int:
+        """Bulk import every *.json profile file in a directory (modified after `newer_than` if given)"""
+        profiles = []
+        for file_path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+            if newer_than is not None and _mtime(file_path) <= newer_than:
+                continue
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except Exception as e:
+                print(f"Error loading {file_path}: {e}")
+        return self.upsert_many(profiles)
+
+    def export_json_dir(self, data_dir: str) -> int:
+        """Write every profile back out as one pretty-printed JSON file per company"""
+        return JsonDirectoryProfileStore(data_dir).upsert_many(self.all())
+
+    def close(self):
+        pass
+
+
+class JsonDirectoryProfileStore(ProfileStore):
+    """Original layout: one JSON file per company, scanned on every query"""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self._files_by_key: Optional[Dict[str, str]] = None
+        # Lowercased file path -> normalized name of the profile in it
+        self._keys_by_file: Dict[str, str] = {}
+        # Older files holding a profile of an already indexed name
+        self._extra_files: Dict[str, List[str]] = {}
+
+    def _filename(self, company_name: str, key: str) -> str:
+        """File of a profile: its name with unsafe characters replaced, made unique per normalized name"""
+        safe_name = re.sub(r"[^\w.-]+", "_", company_name.replace("(", "").replace(")", "")).strip("_.") or "company"
+        file_path = os.path.join(self.data_dir, f"{safe_name}.json")
+        owner = self._keys_by_file.get(file_path.lower())
+        if owner is not None and owner != key:
+            # Another company's file ("FooBar" and "Foo(Bar)" both make FooBar.json)
+            digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+            file_path = os.path.join(self.data_dir, f"{safe_name}_{digest}.json")
+        return file_path
+
+    def _file_index(self) -> Dict[str, str]:
+        """Normalized name -> file path, built with one directory scan"""
+        if self._files_by_key is None:
+            self._files_by_key, self._keys_by_file, self._extra_files = {}, {}, {}
+            for file_path in sorted(glob.glob(os.path.join(self.data_dir, '*.json'))):
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        name = json.load(f).get("company_name") or ""
+                except Exception:
+                    continue
+                key = normalize_company_name(name)
+                if key in self._files_by_key:
+                    self._extra_files.setdefault(key, []).append(self._files_by_key[key])
+                self._files_by_key[key] = file_path
+                self._keys_by_file[file_path.lower()] = key
+        return self._files_by_key
+
+    def _remove_files(self, key: str, keep: Optional[str] = None) -> bool:
+        """Delete every file holding a profile of the name, except `keep`"""
+        removed = False
+        indexed = self._file_index().pop(key, None)
+        for file_path in self._extra_files.pop(key, []) + ([indexed] if indexed else []):
+            if file_path == keep:
+                continue
+            self._keys_by_file.pop(file_path.lower(), None)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                removed = True
+        return removed
+
+    def upsert(self, profile: ProfileLike) -> Optional[str]:
+        data = as_profile_dict(profile)
+        if not data.get("company_name"):
+            return None
+        os.makedirs(self.data_dir, exist_ok=True)
+        key = normalize_company_name(data["company_name"])
+        self._file_index()
+        file_path = self._filename(data["company_name"], key)
+        # Replace files saved under differently spelled names of the same company
+        self._remove_files(key, keep=file_path)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        self._file_index()[key] = file_path
+        self._keys_by_file[file_path.lower()] = key
+        return key
+
+    def all(self) -> List[Dict]:
+        profiles = []
+        for file_path in glob.glob(os.path.join(self.data_dir, '*.json')):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except Exception:
+                continue
+        return sorted(profiles, key=lambda p: normalize_company_name(p.get("company_name") or ""))
+
+    def get(self, company_name: str) -> Optional[Dict]:
+        file_path = self._file_index().get(normalize_company_name(company_name))
+        if not file_path:
+            return None
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def find(self, country: Optional[str] = None, sector: Optional[str] = None,
+             limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        country_key, sector_key = normalize_facet(country), normalize_facet(sector)
+        matches = [
+            p for p in self.all()
+            if (not country_key or country_key in {normalize_facet(c) for c in p.get("countries") or []})
+            and (not sector_key or sector_key in {normalize_facet(s) for s in p.get("sector") or []})
+        ]
+        return matches[offset:offset + limit if limit is not None else None]
+
+    def count(self) -> int:
+        return len(glob.glob(os.path.join(self.data_dir, '*.json')))
+
+    def delete(self, company_name: str) -> bool:
+        return self._remove_files(normalize_company_name(company_name))
+
+    def _mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for file_path in glob.glob(os.path.join(self.data_dir, '*.json')):
+            try:
+                mtimes[file_path] = os.path.getmtime(file_path)
+            except OSError:
+                continue
+        return mtimes
+
+    def keys(self) -> set:
+        # Other processes may have written files: rescan
+        self._files_by_key = None
+        return set(self._file_index())
+
+    def version(self) -> tuple:
+        mtimes = self._mtimes()
+        return (len(mtimes), max(mtimes.values(), default=0.0))
+
+    def last_modified(self) -> float:
+        return self.version()[1]
+
+    def changed_since(self, timestamp: float) -> List[Dict]:
+        profiles = []
+        for file_path, mtime in self._mtimes().items():
+            if mtime < timestamp:
+                continue
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except Exception:
+                continue
+        return profiles
+
+
+class SQLiteProfileStore(ProfileStore):
+    """SQLite backend with name, country and sector indexes"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                name_key TEXT PRIMARY KEY,
+                company_name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS profile_countries (
+                name_key TEXT NOT NULL,
+                country TEXT NOT NULL,
+                PRIMARY KEY (country, name_key)
+            );
+            CREATE TABLE IF NOT EXISTS profile_sectors (
+                name_key TEXT NOT NULL,
+                sector TEXT NOT NULL,
+                PRIMARY KEY (sector, name_key)
+            );
+            CREATE TABLE IF NOT EXISTS json_imports (
+                data_dir TEXT PRIMARY KEY,
+                newest_mtime REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS countries_by_name ON profile_countries (name_key);
+            CREATE INDEX IF NOT EXISTS sectors_by_name ON profile_sectors (name_key);
+            CREATE INDEX IF NOT EXISTS profiles_by_updated_at ON profiles (updated_at);
+        """)
+        self._db.commit()
+
+    def _upsert(self, data: Dict) -> Optional[str]:
+        """Write one profile without committing (lock held)"""
+        key = normalize_company_name(data.get("company_name") or "")
+        if not key:
+            return None
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO profiles (name_key, company_name, data, updated_at) VALUES (?, ?, ?, ?)",
+            (key, data["company_name"], json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        self._db.execute("DELETE FROM profile_countries WHERE name_key = ?", (key,))
+        self._db.execute("DELETE FROM profile_sectors WHERE name_key = ?", (key,))
+        self._db.executemany(
+            "INSERT OR IGNORE INTO profile_countries (name_key, country) VALUES (?, ?)",
+            [(key, normalize_facet(country)) for country in data.get("countries") or [] if country],
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO profile_sectors (name_key, sector) VALUES (?, ?)",
+            [(key, normalize_facet(sector)) for sector in data.get("sector") or [] if sector],
+        )
+        return key
+
+    def upsert(self, profile: ProfileLike) -> Optional[str]:
+        with self._lock:
+            key = self._upsert(as_profile_dict(profile))
+            self._db.commit()
+        return key
+
+    def upsert_many(self, profiles: Iterable[ProfileLike]) -> int:
+        stored = 0
+        with self._lock:
+            for profile in profiles:
+                if self._upsert(as_profile_dict(profile)):
+                    stored += 1
+            self._db.commit()
+        return stored
+
+    def get(self, company_name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM profiles WHERE name_key = ?",
+                                   (normalize_company_name(company_name),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, country: Optional[str] = None, sector: Optional[str] = None,
+             limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        query = "SELECT p.data FROM profiles p"
+        params: List = []
+        if country:
+            query += " JOIN profile_countries c ON c.name_key = p.name_key AND c.country = ?"
+            params.append(normalize_facet(country))
+        if sector:
+            query += " JOIN profile_sectors s ON s.name_key = p.name_key AND s.sector = ?"
+            params.append(normalize_facet(sector))
+        query += " ORDER BY p.name_key LIMIT ? OFFSET ?"
+        params.extend([limit if limit is not None else -1, offset])
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM profiles ORDER BY name_key").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def delete(self, company_name: str) -> bool:
+        key = normalize_company_name(company_name)
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM profiles WHERE name_key = ?", (key,)).rowcount
+            self._db.execute("DELETE FROM profile_countries WHERE name_key = ?", (key,))
+            self._db.execute("DELETE FROM profile_sectors WHERE name_key = ?", (key,))
+            self._db.commit()
+        return bool(deleted)
+
+    def keys(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT name_key FROM profiles")}
+
+    def version(self) -> tuple:
+        with self._lock:
+            return tuple(self._db.execute("SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM profiles").fetchone())
+
+    def last_modified(self) -> float:
+        return self.version()[1]
+
+    def changed_since(self, timestamp: float) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM profiles WHERE updated_at >= ?", (timestamp,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def import_json_updates(self, data_dir: str) -> int:
+        """
+        Import the JSON profile files of a directory written since the last call
+
+        Files are compared by modification time with the newest one imported
+        from the directory before, so profiles saved as JSON (an older version,
+        a JSON store, a hand edit) keep reaching this store after its first import.
+        """
+        data_dir = os.path.abspath(data_dir)
+        with self._lock:
+            row = self._db.execute("SELECT newest_mtime FROM json_imports WHERE data_dir = ?", (data_dir,)).fetchone()
+        newest = max((_mtime(path) for path in glob.glob(os.path.join(data_dir, '*.json'))), default=0.0)
+        if row and newest <= row[0]:
+            return 0
+        imported = self.import_json_dir(data_dir, newer_than=row[0] if row else None)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO json_imports (data_dir, newest_mtime) VALUES (?, ?)",
+                             (data_dir, newest))
+            self._db.commit()
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_profile_store(store_url: str) -> ProfileStore:
+    """
+    Open a store from a URL
+
+    Args:
+        store_url: "sqlite:///path/to/profiles.sqlite" or "json:///path/to/data_dir"
+
+    Returns:
+        The matching ProfileStore backend
+    """
+    if store_url.startswith("sqlite:///"):
+        return SQLiteProfileStore(store_url[len("sqlite:///"):])
+    if store_url.startswith("json:///"):
+        return JsonDirectoryProfileStore(store_url[len("json:///"):])
+    raise ValueError(f"Unsupported profile store URL: {store_url}")
+
+
+# Shared store for the extraction side and the chat backend
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """
+    Process-wide profile store configured by PROFILE_STORE_URL
+
+    A SQLite store imports the JSON files in data/ when it is opened: all of
+    them the first time, then those modified since the previous import.
+    """
+    global _profile_store
+    if _profile_store is None:
+        store = open_profile_store(os.getenv('PROFILE_STORE_URL', DEFAULT_STORE_URL))
+        if isinstance(store, SQLiteProfileStore):
+            imported = store.import_json_updates(DATA_DIR)
+            if imported:
+                print(f"Imported {imported} profiles from {DATA_DIR} into {store.db_path}")
+        _profile_store = store
+    return _profile_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the company profile store")
+    parser.add_argument("--store", default=os.getenv('PROFILE_STORE_URL', DEFAULT_STORE_URL),
+                        help="Store URL (sqlite:///path or json:///dir)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import a directory of JSON profiles")
+    import_parser.add_argument("data_dir")
+    export_parser = subparsers.add_parser("export", help="Export all profiles as JSON files")
+    export_parser.add_argument("data_dir")
+    subparsers.add_parser("stats", help="Show the number of stored profiles")
+    args = parser.parse_args()
+
+    store = open_profile_store(args.store)
+    if args.command == "import":
+        print(f"📥 Imported {store.import_json_dir(args.data_dir)} profiles")
+    elif args.command == "export":
+        print(f"📤 Exported {store.export_json_dir(args.data_dir)} profiles to {args.data_dir}")
+    else:
+        print(f"📊 {store.count()} profiles in {args.store}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
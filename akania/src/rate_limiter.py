@@ -0,0 +1,310 @@
+"""
+Central rate limiting and spend control for outbound calls.
+
+Every outbound call takes a token from a bucket keyed by what it talks to:
+
+- "provider:<name>" for APIs (tavily, serpapi, openai)
+- "host:<hostname>" for scraped websites (politeness towards target sites)
+
+Buckets adapt to the responses: a 429 or 5xx halves the key's rate and blocks
+it for an exponential backoff (or the Retry-After the server sent), and each
+success recovers a tenth of the configured rate. A daily budget per provider
+(requests and/or LLM tokens) raises BudgetExceeded once it is spent. Calls
+reserve their spend before they go out, so concurrent callers cannot overshoot
+it together, and settle the reservation with the tokens actually used.
+
+All timing goes through an injectable clock and sleep, so the limiter can be
+tested with a fake clock.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+# Statuses that mean "slow down"
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class BudgetExceeded(RuntimeError):
+    """The daily request or token budget of a provider is used up"""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)"""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, now: float, cost: float = 1.0):
+        self._refill(now)
+        self.tokens -= cost
+
+
+class _KeyState:
+    """Bucket plus adaptive backoff state of one key"""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.base_rate = rate
+        self.bucket = TokenBucket(rate, burst, now)
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a client exception (openai, httpx, requests), if any"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+class RateLimiter:
+    """Per-provider and per-host token buckets with adaptive backoff and daily budgets"""
+
+    def __init__(self, provider_rates: Optional[Dict[str, float]] = None, host_rate: float = 2.0,
+                 burst: float = 4.0, daily_budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                 min_rate_fraction: float = 0.1, backoff: float = 1.0, max_backoff: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 wall_clock: Callable[[], float] = time.time):
+        """
+        Args:
+            provider_rates: requests per second per provider, e.g. {"openai": 5}
+            host_rate: requests per second to any single scraped host
+            burst: bucket capacity (requests that may go out back to back)
+            daily_budgets: e.g. {"openai": {"tokens": 2_000_000}, "tavily": {"requests": 1000}}
+            min_rate_fraction: lowest rate backoff can push a key to, relative to its base rate
+            backoff: first backoff delay after a throttling response, doubled per failure
+        """
+        self.provider_rates = provider_rates or {}
+        self.host_rate = host_rate
+        self.burst = burst
+        self.daily_budgets = daily_budgets or {}
+        self.min_rate_fraction = min_rate_fraction
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.wall_clock = wall_clock
+        self._keys: Dict[str, _KeyState] = {}
+        self._spend: Dict[str, Dict[str, int]] = {}
+        self._spend_day = None
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> _KeyState:
+        """State of a key, created with its configured rate (lock held)"""
+        state = self._keys.get(key)
+        if state is None:
+            kind, _, name = key.partition(":")
+            rate = self.provider_rates.get(name, self.host_rate) if kind == "provider" else self.host_rate
+            state = self._keys[key] = _KeyState(rate, self.burst, self.clock())
+        return state
+
+    def _reserve(self, key: str, cost: float) -> float:
+        """Take the tokens if available and return 0, else return the seconds to wait"""
+        with self._lock:
+            state = self._state(key)
+            now = self.clock()
+            wait = max(state.blocked_until - now, state.bucket.wait_time(now, cost))
+            if wait <= 0:
+                state.bucket.take(now, cost)
+                return 0.0
+            state.waited_seconds += wait
+            return wait
+
+    def acquire(self, key: str, cost: float = 1.0):
+        """Block until the key allows another call"""
+        while True:
+            wait = self._reserve(key, cost)
+            if wait <= 0:
+                return
+            self.sleep(wait)
+
+    async def acquire_async(self, key: str, cost: float = 1.0):
+        """Wait (without blocking the event loop) until the key allows another call"""
+        while True:
+            wait = self._reserve(key, cost)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def report(self, key: str, status: Optional[int], retry_after: Optional[float] = None):
+        """Feed a call's outcome back: throttling statuses slow the key down, successes recover it"""
+        with self._lock:
+            state = self._state(key)
+            bucket = state.bucket
+            if status in THROTTLE_STATUS:
+                state.failures += 1
+                state.throttled += 1
+                delay = retry_after if retry_after is not None else min(
+                    self.max_backoff, self.backoff * (2 ** (state.failures - 1)))
+                state.blocked_until = max(state.blocked_until, self.clock() + delay)
+                bucket.rate = max(state.base_rate * self.min_rate_fraction, bucket.rate / 2)
+            elif status is not None and status < 400:
+                state.failures = 0
+                bucket.rate = min(state.base_rate, bucket.rate + state.base_rate * 0.1)
+
+    def _today_spend(self, provider: str) -> Dict[str, int]:
+        """Spend counters of a provider for the current UTC day (lock held)"""
+        day = datetime.fromtimestamp(self.wall_clock(), tz=timezone.utc).date()
+        if day != self._spend_day:
+            self._spend_day = day
+            self._spend = {}
+        return self._spend.setdefault(provider, {"requests": 0, "tokens": 0})
+
+    def reserve_spend(self, provider: str, requests: int = 1, tokens: int = 0):
+        """
+        Check the provider's daily budget and count a call against it in one step
+
+        Returns:
+            The UTC day the spend was counted on, for settle_spend()
+
+        Raises:
+            BudgetExceeded: the budget is spent, reservations of calls still running included
+        """
+        budget = self.daily_budgets.get(provider) or {}
+        with self._lock:
+            spent = self._today_spend(provider)
+            for unit, limit in budget.items():
+                if limit and spent.get(unit, 0) >= limit:
+                    raise BudgetExceeded(f"Daily {unit} budget of {limit} for {provider} is used up")
+            spent["requests"] += requests
+            spent["tokens"] += tokens
+            return self._spend_day
+
+    def settle_spend(self, provider: str, day, reserved_tokens: int, used_tokens: int):
+        """Replace a reservation's token estimate with the tokens the call used"""
+        with self._lock:
+            if day != self._spend_day:
+                return  # Reserved on a day whose counters are gone
+            spent = self._today_spend(provider)
+            spent["tokens"] = max(0, spent["tokens"] + used_tokens - reserved_tokens)
+
+    def call(self, provider: str, fn: Callable, *args, tokens: int = 0,
+             usage: Optional[Callable] = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) against a provider's budget, bucket and backoff
+
+        Args:
+            tokens: Estimated tokens of the call, reserved before it goes out
+            usage: Tokens the call used, from its result (the estimate stands without it);
+                a failed call keeps its reservation
+        """
+        key = f"provider:{provider}"
+        day = self.reserve_spend(provider, tokens=tokens)
+        self.acquire(key)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.report(key, status_of(e))
+            raise
+        self.report(key, 200)
+        if usage is not None:
+            self.settle_spend(provider, day, tokens, usage(result))
+        return result
+
+    async def acall(self, provider: str, fn: Callable, *args, tokens: int = 0,
+                    usage: Optional[Callable] = None, **kwargs):
+        """Async version of call for coroutine functions"""
+        key = f"provider:{provider}"
+        day = self.reserve_spend(provider, tokens=tokens)
+        await self.acquire_async(key)
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self.report(key, status_of(e))
+            raise
+        self.report(key, 200)
+        if usage is not None:
+            self.settle_spend(provider, day, tokens, usage(result))
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "keys": {
+                    key: {
+                        "rate": round(state.bucket.rate, 3),
+                        "base_rate": state.base_rate,
+                        "throttled": state.throttled,
+                        "waited_seconds": round(state.waited_seconds, 3),
+                    }
+                    for key, state in self._keys.items()
+                },
+                "spend_today": {provider: dict(spent) for provider, spent in self._spend.items()},
+            }
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_budget(prefix: str) -> Dict[str, int]:
+    budget = {}
+    for unit in ("requests", "tokens"):
+        value = os.getenv(f"{prefix}_{unit.upper()}")
+        if value:
+            budget[unit] = int(value)
+    return budget
+
+
+# Shared limiter for the scraper, website discovery and the assistant
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide rate limiter configured from the environment (None if disabled)"""
+    global _rate_limiter
+    if os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    if _rate_limiter is None:
+        providers = ("tavily", "serpapi", "openai")
+        _rate_limiter = RateLimiter(
+            provider_rates={
+                "tavily": _env_float('RATE_LIMIT_TAVILY', 5.0),
+                "serpapi": _env_float('RATE_LIMIT_SERPAPI', 2.0),
+                "openai": _env_float('RATE_LIMIT_OPENAI', 5.0),
+            },
+            host_rate=_env_float('RATE_LIMIT_PER_HOST', 2.0),
+            burst=_env_float('RATE_LIMIT_BURST', 4.0),
+            daily_budgets={
+                provider: budget for provider in providers
+                if (budget := _env_budget(f"DAILY_BUDGET_{provider.upper()}"))
+            },
+        )
+    return _rate_limiter
+
+
+def limited_call(provider: str, fn: Callable, *args, tokens: int = 0, usage: Optional[Callable] = None, **kwargs):
+    """fn(*args, **kwargs) through the shared limiter (a plain call when limiting is disabled)"""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return fn(*args, **kwargs)
+    return limiter.call(provider, fn, *args, tokens=tokens, usage=usage, **kwargs)
+
+
+async def limited_acall(provider: str, fn: Callable, *args, tokens: int = 0, usage: Optional[Callable] = None,
+                        **kwargs):
+    """Async version of limited_call"""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return await fn(*args, **kwargs)
+    return await limiter.acall(provider, fn, *args, tokens=tokens, usage=usage, **kwargs)
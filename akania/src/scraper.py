@@ -1,9 +1,33 @@
 """
 Web scraping logic for extracting company data.
 """
-import requests
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders import WebBaseLoader
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import os
+from typing import AsyncIterator, List, Optional
+
+from langchain_core.documents import Document
+from fetcher import AsyncFetcher
+from page_cache import PageCache
+from rate_limiter import get_rate_limiter
+
+# Shared page cache, so retries and re-runs reuse already downloaded pages
+_page_cache: Optional[PageCache] = None
+
+def get_page_cache() -> Optional[PageCache]:
+    """Process-wide page cache configured from the environment (None if disabled)"""
+    global _page_cache
+    if os.getenv('PAGE_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    if _page_cache is None:
+        _page_cache = PageCache(
+            cache_dir=os.getenv('PAGE_CACHE_DIR', '.page_cache'),
+            ttl_seconds=float(os.getenv('PAGE_CACHE_TTL_SECONDS', str(24 * 3600))),
+            max_bytes=int(float(os.getenv('PAGE_CACHE_MAX_MB', '200')) * 1024 * 1024),
+        )
+    return _page_cache
 
 def extract_urls_from_tavily(tavily_response):
     """Extract all URLs from Tavily search results"""
@@ -11,15 +35,63 @@ def extract_urls_from_tavily(tavily_response):
     urls = [result.get('url') for result in results if result.get('url')]
     return urls
 
-def scrape_urls(urls):
-    """Scrape content from URLs"""
-    scraped_docs = []
-    for url in urls:
+# (fetcher, its event loop) of the pooled_fetcher() block the current task runs in
+_current_fetcher: contextvars.ContextVar = contextvars.ContextVar("current_fetcher", default=None)
+
+@contextlib.asynccontextmanager
+async def pooled_fetcher(**fetcher_options) -> AsyncIterator[AsyncFetcher]:
+    """
+    One fetcher for every scrape_urls_async and stream_urls call made inside the block
+
+    Calls from tasks created in the block (a batch run's workers) share its
+    connection pool and per-host limits; their own fetcher options other than
+    main_content are ignored.
+    """
+    fetcher_options.setdefault("cache", get_page_cache())
+    fetcher_options.setdefault("rate_limiter", get_rate_limiter())
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        token = _current_fetcher.set((fetcher, asyncio.get_running_loop()))
         try:
-            loader = WebBaseLoader([url])
-            docs = loader.load()
-            scraped_docs.extend(docs)
-        except Exception as e:
-            print(f"Failed to scrape {url}: {e}")
-            continue
-    return scraped_docs
+            yield fetcher
+        finally:
+            _current_fetcher.reset(token)
+
+def current_fetcher() -> Optional[AsyncFetcher]:
+    """The fetcher of the enclosing pooled_fetcher() block, if it runs on this event loop"""
+    current = _current_fetcher.get()
+    if current is None or current[1] is not asyncio.get_running_loop():
+        return None  # A context copied to another thread and loop (asyncio.to_thread)
+    return current[0]
+
+async def scrape_urls_async(urls: List[str], **fetcher_options) -> List[Document]:
+    """Scrape content from URLs concurrently, keeping the input order"""
+    fetcher = current_fetcher()
+    if fetcher is not None:
+        return await fetcher.fetch_all(urls, main_content=fetcher_options.get("main_content"))
+    async with pooled_fetcher(**fetcher_options) as fetcher:
+        return await fetcher.fetch_all(urls)
+
+async def stream_urls(urls: List[str], **fetcher_options) -> AsyncIterator[Document]:
+    """Scrape content from URLs, yielding each document as soon as it arrives"""
+    fetcher = current_fetcher()
+    if fetcher is not None:
+        async for document in fetcher.stream(urls, main_content=fetcher_options.get("main_content")):
+            yield document
+        return
+    async with pooled_fetcher(**fetcher_options) as fetcher:
+        async for document in fetcher.stream(urls):
+            yield document
+
+def scrape_urls(urls, **fetcher_options):
+    """Scrape content from URLs (sync wrapper around the concurrent fetcher)"""
+    if not urls:
+        return []
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(scrape_urls_async(urls, **fetcher_options))
+
+    # Called from inside an event loop: run on a separate thread with its own loop
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, scrape_urls_async(urls, **fetcher_options)).result()
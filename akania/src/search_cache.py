@@ -0,0 +1,186 @@
+"""
+Memoizing layer for web search calls (Tavily, SerpAPI).
+
+Results are cached in an in-memory LRU, optionally backed by SQLite so they
+survive re-runs, and expire after a TTL. Keys combine the normalized query, the
+engine and max_results. Concurrent identical lookups are coalesced
+(single-flight): only the first caller hits the search API, the others wait for
+its result.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and trim punctuation so equivalent queries share a key"""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" .?!,;:")
+
+
+def cache_key(engine: str, query: str, max_results: int) -> str:
+    return f"{engine}|{max_results}|{normalize_query(query)}"
+
+
+class _InFlight:
+    """A search currently being executed on behalf of several callers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SearchCache:
+    """LRU + optional SQLite cache for search results with single-flight coalescing"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 7 * 24 * 3600,
+                 db_path: Optional[str] = None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            self._db.commit()
+
+    def _get_cached(self, key: str):
+        """Fresh cached value or None (lock held)"""
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            result, stored_at = entry
+            if now - stored_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return result
+            del self._entries[key]
+
+        if self._db is not None:
+            row = self._db.execute("SELECT result, stored_at FROM search_results WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl_seconds:
+                result = json.loads(row[0])
+                self._remember(key, result, row[1])
+                return result
+        return None
+
+    def _remember(self, key: str, result, stored_at: float):
+        """Put a value in the in-memory LRU (lock held)"""
+        self._entries[key] = (result, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, key: str, result):
+        now = self.clock()
+        with self._lock:
+            self._remember(key, result, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_results (key, result, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result, ensure_ascii=False), now),
+                )
+                self._db.commit()
+
+    def get_or_search(self, engine: str, query: str, max_results: int, search_fn: Callable[[], Any]):
+        """
+        Return the cached result for this search, running search_fn at most once
+
+        Args:
+            engine: Search engine name (part of the cache key)
+            query: Search query (normalized for the key)
+            max_results: Result limit (part of the cache key)
+            search_fn: Zero-argument callable performing the real search
+
+        Returns:
+            The search result. Empty results and errors are not cached.
+        """
+        key = cache_key(engine, query, max_results)
+        with self._lock:
+            cached = self._get_cached(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            in_flight.result = search_fn()
+            if in_flight.result:
+                self._store(key, in_flight.result)
+            return in_flight.result
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_results")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """Hit ratio and number of search API calls saved"""
+        lookups = self.hits + self.misses + self.coalesced
+        saved = self.hits + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "saved_calls": saved,
+            "hit_ratio": round(saved / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Shared search cache for the discovery service and the assistant
+_search_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Process-wide search cache configured from the environment (None if disabled)"""
+    global _search_cache
+    if os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    if _search_cache is None:
+        _search_cache = SearchCache(
+            ttl_seconds=float(os.getenv('SEARCH_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+            db_path=os.getenv('SEARCH_CACHE_DB', '.search_cache.sqlite') or None,
+        )
+    return _search_cache
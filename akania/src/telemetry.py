@@ -0,0 +1,307 @@
+"""
+Lightweight tracing and metrics for the extraction pipeline and the chat API.
+
+- span("fetch", url=...) times a block of work. Finished spans are written as
+  one JSON object per line to the "akania.trace" logger (see configure_trace_log
+  and TRACE_LOG), observed in the process-wide METRICS registry, and added to
+  the current run's histograms when inside trace_run().
+- METRICS holds counters, gauges and histograms and renders them in the
+  Prometheus text exposition format for the API's /metrics endpoint.
+
+Spans nest through a context variable, so asyncio tasks and to_thread calls
+started inside a span report it as their parent.
+"""
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+TRACE_LOGGER = logging.getLogger("akania.trace")
+
+# Latency buckets in seconds, from a cached page read to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    """Bucketed distribution that also keeps recent samples for percentiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_samples: int = 1000):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+
+    def percentile(self, fraction: float) -> float:
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))]
+
+    def summary(self, scale: float = 1000.0) -> Dict:
+        """count, p50, p95, max and total (durations in ms with the default scale)"""
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(0.5) * scale, 2),
+            "p95": round(self.percentile(0.95) * scale, 2),
+            "max": round(self.max * scale, 2),
+            "total": round(self.sum * scale, 2),
+        }
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms with labels, rendered for Prometheus"""
+
+    def __init__(self, prefix: str = "akania"):
+        self.prefix = prefix
+        self._kinds: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._values: Dict[str, Dict[LabelKey, object]] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, kind: str, name: str, labels: Dict, help_text: str = ""):
+        """Series dict of a metric, created on first use (lock held)"""
+        if name not in self._kinds:
+            self._kinds[name] = kind
+            self._help[name] = help_text or name.replace("_", " ")
+            self._values[name] = {}
+        elif self._kinds[name] != kind:
+            raise ValueError(f"Metric {name} is a {self._kinds[name]}, not a {kind}")
+        return self._values[name]
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels):
+        with self._lock:
+            series = self._series("counter", name, labels, help_text)
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help_text: str = "", **labels):
+        with self._lock:
+            self._series("gauge", name, labels, help_text)[_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, help_text: str = "", buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            series = self._series("histogram", name, labels, help_text)
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def get(self, name: str, **labels):
+        """Current value of a counter or gauge (a Histogram for histograms), or None"""
+        with self._lock:
+            return self._values.get(name, {}).get(_label_key(labels))
+
+    def reset(self):
+        with self._lock:
+            self._kinds.clear()
+            self._help.clear()
+            self._values.clear()
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._kinds):
+                full_name = f"{self.prefix}_{name}"
+                kind = self._kinds[name]
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(self._values[name].items()):
+                    if kind != "histogram":
+                        lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+                        continue
+                    for bound, count in zip(value.buckets, value.bucket_counts):
+                        le = (("le", _format_value(bound)),)
+                        lines.append(f"{full_name}_bucket{_format_labels(key + le)} {count}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key + (('le', '+Inf'),))} {value.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {_format_value(value.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Process-wide registry shared by the pipeline and the API
+METRICS = MetricsRegistry()
+
+
+class RunTrace:
+    """Per-run histograms: duration of every span name and totals of its numeric attributes"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.durations: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, span: "Span"):
+        with self._lock:
+            self.durations.setdefault(span.name, Histogram()).observe(span.duration)
+            if span.status == "error":
+                self.errors[span.name] = self.errors.get(span.name, 0) + 1
+            totals = self.totals.setdefault(span.name, {})
+            for attribute, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[attribute] = totals.get(attribute, 0) + value
+
+    def summary(self) -> Dict:
+        """Per span name: count, errors, p50/p95/max/total ms and attribute totals"""
+        with self._lock:
+            return {
+                name: {
+                    **{f"{key}_ms" if key != "count" else key: value
+                       for key, value in histogram.summary().items()},
+                    "errors": self.errors.get(name, 0),
+                    **{attribute: round(total, 3) for attribute, total in self.totals.get(name, {}).items()},
+                }
+                for name, histogram in sorted(self.durations.items())
+            }
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("akania_span", default=None)
+_current_run: contextvars.ContextVar = contextvars.ContextVar("akania_run", default=None)
+
+
+class Span:
+    """One timed unit of work; attributes set on it end up in the JSON log line"""
+
+    def __init__(self, name: str, attributes: Dict, parent: Optional["Span"], run: Optional[RunTrace]):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        if parent:
+            self.trace_id = parent.trace_id
+        else:
+            self.trace_id = run.trace_id if run else uuid.uuid4().hex[:16]
+        self.status = "ok"
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "event": "span",
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            **self.attributes,
+        }
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Time the enclosed block as a span; an exception marks it as an error and is re-raised"""
+    run = _current_run.get()
+    current = Span(name, attributes, _current_span.get(), run)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        _finish(current, run)
+
+
+def _finish(finished: Span, run: Optional[RunTrace]):
+    METRICS.observe("span_duration_seconds", finished.duration, "Duration of traced operations", span=finished.name)
+    if finished.status == "error":
+        METRICS.inc("span_errors_total", help_text="Traced operations that raised", span=finished.name)
+    if run is not None:
+        run.record(finished)
+    if TRACE_LOGGER.isEnabledFor(logging.INFO):
+        TRACE_LOGGER.info(json.dumps(finished.to_dict(), ensure_ascii=False, default=str))
+
+
+@contextmanager
+def trace_run(name: str) -> Iterator[RunTrace]:
+    """Collect the spans of everything run inside the block into one RunTrace"""
+    run = RunTrace(name)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+_trace_handler: Optional[logging.Handler] = None
+
+
+def configure_trace_log(target: Optional[str] = None) -> Optional[logging.Handler]:
+    """
+    Send span JSON lines to `target` ("stderr" or a file path, default TRACE_LOG)
+
+    Replaces the handler of an earlier call. Returns the handler, or None when
+    tracing output is off.
+    """
+    global _trace_handler
+    target = target if target is not None else os.getenv('TRACE_LOG', '')
+    if _trace_handler is not None:
+        TRACE_LOGGER.removeHandler(_trace_handler)
+        _trace_handler.close()
+        _trace_handler = None
+    if not target or target.lower() in ('0', 'off', 'false', 'no'):
+        return None
+    handler = logging.StreamHandler() if target == "stderr" else logging.FileHandler(target, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    TRACE_LOGGER.addHandler(handler)
+    TRACE_LOGGER.setLevel(logging.INFO)
+    TRACE_LOGGER.propagate = False
+    _trace_handler = handler
+    return handler
+
+
+def print_run_summary(summary: Dict):
+    """Per-span latency table of a RunTrace summary"""
+    print(f"{'span':<14}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}  totals")
+    for name, row in summary.items():
+        extra = {key: value for key, value in row.items()
+                 if key not in ("count", "errors", "p50_ms", "p95_ms", "max_ms", "total_ms")}
+        totals = " ".join(f"{key}={value:g}" for key, value in extra.items())
+        print(f"{name:<14}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['max_ms']:>10}  {totals}")
+
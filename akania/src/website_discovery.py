@@ -3,17 +3,43 @@ Website discovery module for finding company websites.
 Based on Tavily search and SerpAPI implementations.
 """
 import os
-from typing import List, Dict, Optional
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Optional
+from urllib.parse import urlsplit
 from langchain_tavily import TavilySearch
 from langchain_community.utilities import SerpAPIWrapper
+from page_cache import normalize_url
+from rate_limiter import RateLimiter, get_rate_limiter
+from telemetry import span
+from search_cache import SearchCache, get_search_cache
+
+# Sites that mention companies but are never the company website itself
+DIRECTORY_DOMAINS = (
+    "linkedin.com", "facebook.com", "instagram.com", "twitter.com", "x.com",
+    "crunchbase.com", "wikipedia.org", "youtube.com", "bloomberg.com",
+)
+
+# Words of a company query that say nothing about the company's domain
+GENERIC_NAME_WORDS = {
+    "the", "and", "of", "company", "group", "ltd", "limited", "inc", "sa", "sarl",
+    "plc", "llc", "industries", "holdings",
+}
 
 
 class WebsiteDiscoveryService:
     """Service for discovering company websites using multiple search engines"""
     
-    def __init__(self):
+    def __init__(self, search_cache: Optional[SearchCache] = None, engine_deadline: float = 10.0,
+                 rate_limiter: Optional[RateLimiter] = None):
         self.tavily_search = None
         self.serp_search = None
+        self.search_cache = search_cache if search_cache is not None else get_search_cache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self.engine_deadline = engine_deadline
+        self.engines: Dict[str, Callable[[str, int], List[str]]] = {}
+        self.last_discovery: Dict = {}
         self._initialize_search_engines()
     
     def _initialize_search_engines(self):
@@ -32,6 +58,37 @@ class WebsiteDiscoveryService:
                 self.serp_search = SerpAPIWrapper()
         except Exception as e:
             print(f"SerpAPI initialization failed: {e}")
+        
+        if self.tavily_search:
+            self.register_engine("tavily", self.search_with_tavily)
+        if self.serp_search:
+            self.register_engine("serpapi", self.search_with_serpapi)
+    
+    def register_engine(self, name: str, search_fn: Callable[[str, int], List[str]]):
+        """Add a search engine: search_fn(company_query, max_results) -> list of URLs"""
+        self.engines[name] = search_fn
+    
+    def _cached_search(self, engine: str, query: str, max_results: int, search_fn) -> List[str]:
+        """Run a search through the shared cache (identical concurrent lookups share one call)"""
+        with span("search", engine=engine, query=query) as current:
+            called = []
+
+            def counted_search():
+                called.append(True)
+                return search_fn()
+
+            if self.search_cache:
+                urls = self.search_cache.get_or_search(engine, query, max_results, counted_search)
+            else:
+                urls = counted_search()
+            current.set(urls=len(urls or []), cached=not called)
+            return urls
+
+    def _provider_call(self, provider: str, fn):
+        """Call a search API through the shared rate limiter and daily budget"""
+        if not self.rate_limiter:
+            return fn()
+        return self.rate_limiter.call(provider, fn)
     
     def extract_urls_from_tavily(self, tavily_response: Dict) -> List[str]:
         """Extract all URLs from Tavily search results"""
@@ -43,66 +100,140 @@ class WebsiteDiscoveryService:
         return urls
     
     def search_with_tavily(self, company_query: str, max_results: int = 5) -> List[str]:
-        """Search for company URLs using Tavily"""
+        """Search for company URLs using Tavily (errors propagate to discover_company_websites)"""
         if not self.tavily_search:
             return []
         
-        try:
-            query = f"I need only website urls for {company_query}"
-            response = self.tavily_search.invoke({"query": query})
-            urls = self.extract_urls_from_tavily(response)
-            return urls[:max_results]
-        except Exception as e:
-            print(f"Tavily search error: {e}")
+        query = f"I need only website urls for {company_query}"
+        
+        def search():
+            response = self._provider_call("tavily", lambda: self.tavily_search.invoke({"query": query}))
+            return self.extract_urls_from_tavily(response)[:max_results]
+        
+        return self._cached_search("tavily", query, max_results, search)
+    
+    def extract_urls_from_serpapi(self, serp_response: Dict) -> List[str]:
+        """Extract URLs from SerpAPI results (knowledge graph website first, then organic links)"""
+        if not serp_response:
             return []
+        
+        urls = []
+        website = (serp_response.get('knowledge_graph') or {}).get('website')
+        if website:
+            urls.append(website)
+        for result in serp_response.get('organic_results', []):
+            if result.get('link'):
+                urls.append(result['link'])
+        return urls
     
-    def search_with_serpapi(self, company_query: str) -> List[str]:
-        """Search for company URLs using SerpAPI"""
+    def search_with_serpapi(self, company_query: str, max_results: int = 5) -> List[str]:
+        """Search for company URLs using SerpAPI (errors propagate to discover_company_websites)"""
         if not self.serp_search:
             return []
         
-        try:
-            query = f"I need website urls for {company_query}"
-            response = self.serp_search.run(query)
-            # Parse response and extract URLs
-            # Note: SerpAPI response parsing would need to be implemented
-            # based on actual response format
-            return []
-        except Exception as e:
-            print(f"SerpAPI search error: {e}")
-            return []
+        query = f"{company_query} official website"
+        
+        def search():
+            response = self._provider_call("serpapi", lambda: self.serp_search.results(query))
+            return self.extract_urls_from_serpapi(response)[:max_results]
+        
+        return self._cached_search("serpapi", query, max_results, search)
+    
+    def rank_urls(self, engine_results: Dict[str, List[str]], company_name: str) -> List[str]:
+        """
+        Merge URLs from several engines into one ranked, de-duplicated list
+        
+        URLs are ordered by relevance to the company name, then by how many
+        engines returned them, then by their best position in any engine.
+        """
+        candidates = {}
+        for engine_name, urls in engine_results.items():
+            for position, url in enumerate(urls):
+                if not self.validate_website_url(url):
+                    continue
+                key = normalize_url(url)
+                if key not in candidates:
+                    candidates[key] = {"url": url, "engines": set(), "best_position": position}
+                candidate = candidates[key]
+                candidate["engines"].add(engine_name)
+                candidate["best_position"] = min(candidate["best_position"], position)
+        
+        ranked = sorted(
+            candidates.values(),
+            key=lambda c: (-self.url_relevance(c["url"], company_name), -len(c["engines"]), c["best_position"]),
+        )
+        return [candidate["url"] for candidate in ranked]
     
-    def discover_company_websites(self, company_query: str, max_urls: int = 3) -> List[str]:
+    def discover_company_websites(self, company_query: str, max_urls: int = 3, mode: str = "merge",
+                                  engine_deadlines: Optional[Dict[str, float]] = None) -> List[str]:
         """
-        Discover company websites using available search engines
+        Discover company websites by querying all configured engines concurrently
         
         Args:
             company_query: Company name and optionally country/region
             max_urls: Maximum number of URLs to return
+            mode: "merge" waits for every engine (up to its deadline) and merges the
+                results; "race" returns as soon as max_urls relevant URLs have arrived
+            engine_deadlines: Per-engine deadlines in seconds (default engine_deadline)
         
         Returns:
             List of discovered website URLs
         """
-        all_urls = []
+        if mode not in ("merge", "race"):
+            raise ValueError(f"Unknown discovery mode: {mode}")
         
-        # Try Tavily first
-        tavily_urls = self.search_with_tavily(company_query, max_urls)
-        all_urls.extend(tavily_urls)
+        self.last_discovery = {"engines": {}, "mode": mode}
+        if not self.engines:
+            return []
         
-        # If we don't have enough URLs, try SerpAPI
-        if len(all_urls) < max_urls and self.serp_search:
-            serp_urls = self.search_with_serpapi(company_query)
-            all_urls.extend(serp_urls)
+        company_name = company_query.split('(')[0].strip()
+        engine_deadlines = engine_deadlines or {}
+        engine_results: Dict[str, List[str]] = {}
+        start = time.monotonic()
         
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_urls = []
-        for url in all_urls:
-            if url not in seen:
-                seen.add(url)
-                unique_urls.append(url)
+        executor = ThreadPoolExecutor(max_workers=len(self.engines))
+        try:
+            pending = {
+                executor.submit(search_fn, company_query, max(max_urls, 5)): name
+                for name, search_fn in self.engines.items()
+            }
+            deadlines = {
+                future: start + engine_deadlines.get(name, self.engine_deadline)
+                for future, name in pending.items()
+            }
+            
+            while pending:
+                timeout = max(0.0, min(deadlines[future] for future in pending) - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = pending.pop(future)
+                    elapsed = round(time.monotonic() - start, 3)
+                    try:
+                        engine_results[name] = future.result() or []
+                        self.last_discovery["engines"][name] = {"status": "ok", "seconds": elapsed}
+                    except Exception as e:
+                        print(f"{name} search error: {e}")
+                        self.last_discovery["engines"][name] = {"status": "error", "seconds": elapsed}
+                
+                now = time.monotonic()
+                for future in [future for future in pending if deadlines[future] <= now]:
+                    name = pending.pop(future)
+                    self.last_discovery["engines"][name] = {"status": "deadline", "seconds": round(now - start, 3)}
+                
+                if mode == "race" and pending:
+                    ranked = self.rank_urls(engine_results, company_name)
+                    relevant = [url for url in ranked if self.url_relevance(url, company_name) > 0]
+                    if len(relevant) >= max_urls:
+                        for future, name in pending.items():
+                            self.last_discovery["engines"][name] = {"status": "cancelled", "seconds": None}
+                        break
+        finally:
+            # Never wait for engines that lost the race or missed their deadline
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        return unique_urls[:max_urls]
+        self.last_discovery["seconds"] = round(time.monotonic() - start, 3)
+        return self.rank_urls(engine_results, company_name)[:max_urls]
     
     def validate_website_url(self, url: str) -> bool:
         """Basic validation of website URL"""
@@ -116,38 +247,59 @@ class WebsiteDiscoveryService:
         # Add more validation logic as needed
         return True
     
+    def company_name_words(self, company_name: str) -> List[str]:
+        """Distinctive lowercase words of a company name, without the country suffix"""
+        company_name = company_name.split('(')[0]
+        words = re.findall(r"[a-z0-9]+", company_name.lower())
+        return [word for word in words if len(word) > 1 and word not in GENERIC_NAME_WORDS]
+    
+    def url_relevance(self, url: str, company_name: str) -> int:
+        """
+        Score how likely a URL is the company's own site: 3 a name word is a host
+        label, 2 a host label starts with the squashed name, 1 path, 0 other
+        """
+        words = self.company_name_words(company_name)
+        if not words:
+            return 0
+        
+        parts = urlsplit(url.lower())
+        host = parts.hostname or ""
+        if any(host == domain or host.endswith("." + domain) for domain in DIRECTORY_DOMAINS):
+            return 1 if any(word in parts.path for word in words) else 0
+        
+        # Whole labels only ("lapaire" in lapaire-glasses.com, not "glasses" in sunglasseshut.com)
+        labels = re.split(r"[.-]", host[4:] if host.startswith("www.") else host)
+        if any(word in labels for word in words):
+            return 3
+        squashed = "".join(words)
+        if any(label.startswith(squashed) for label in host.replace("-", "").split(".")):
+            return 2
+        if any(word in parts.path for word in words):
+            return 1
+        return 0
+    
     def filter_relevant_urls(self, urls: List[str], company_name: str) -> List[str]:
         """Filter URLs to keep only those likely to be company websites"""
         if not urls:
             return []
         
-        # Simple filtering - prioritize domains that contain company name
-        company_words = company_name.lower().split()
-        
-        relevant_urls = []
-        other_urls = []
-        
-        for url in urls:
-            if any(word in url.lower() for word in company_words):
-                relevant_urls.append(url)
-            else:
-                other_urls.append(url)
-        
-        # Return relevant URLs first, then others
-        return relevant_urls + other_urls
+        # Prioritize domains that contain the company name, then URLs that
+        # mention it in the path (e.g. directory pages); keep the rest last
+        return sorted(urls, key=lambda url: -self.url_relevance(url, company_name))
 
 
 # Convenience function for quick usage
-def discover_websites(company_query: str, max_urls: int = 3) -> List[str]:
+def discover_websites(company_query: str, max_urls: int = 3, mode: str = "merge") -> List[str]:
     """
     Quick function to discover company websites
     
     Args:
         company_query: Company name and optionally country/region
         max_urls: Maximum number of URLs to return
+        mode: "merge" (wait for all engines) or "race" (first good results)
     
     Returns:
         List of discovered website URLs
     """
     service = WebsiteDiscoveryService()
-    return service.discover_company_websites(company_query, max_urls)
+    return service.discover_company_websites(company_query, max_urls, mode=mode)
@@ -0,0 +1,98 @@
+"""
+Pytest configuration: make the flat-imported source modules (and benchmark helpers) importable.
+"""
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+for path in (os.path.join(ROOT_DIR, 'akania', 'src'), os.path.join(ROOT_DIR, 'backend'),
+             os.path.join(ROOT_DIR, 'akania', 'scripts')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Point the shared caches and the profile store at a per-test directory"""
+    import fingerprint_store
+    import profile_store
+    import rate_limiter
+    import scraper
+    import search_cache
+
+    monkeypatch.setenv("PAGE_CACHE_DIR", str(tmp_path / "page_cache"))
+    monkeypatch.setenv("SEARCH_CACHE_DB", str(tmp_path / "search_cache.sqlite"))
+    monkeypatch.setenv("PROFILE_STORE_URL", f"sqlite:///{tmp_path / 'profiles.sqlite'}")
+    monkeypatch.setenv("KNOWLEDGE_INDEX_PATH", str(tmp_path / "index" / "knowledge_index.json"))
+    monkeypatch.setenv("FINGERPRINT_DB", str(tmp_path / "fingerprints.sqlite"))
+    monkeypatch.setattr(scraper, "_page_cache", None)
+    monkeypatch.setattr(search_cache, "_search_cache", None)
+    monkeypatch.setattr(profile_store, "_profile_store", None)
+    monkeypatch.setattr(fingerprint_store, "_fingerprint_store", None)
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", None)
+
+
+class ThinFirstResultSearch:
+    """Recorded search where the first query for a "hard" company only finds its home page"""
+
+    def __init__(self, search):
+        self.search = search
+
+    def invoke(self, payload):
+        from assistant import first_search_query
+
+        response = self.search.invoke(payload)
+        query = payload["query"]
+        if " hard " in query and query.startswith(first_search_query("").strip()):
+            response["results"] = response["results"][:1]
+        return response
+
+
+class OrderedAttemptChain:
+    """
+    Extraction chain that only gets the company name out of a single page (the
+    thin first attempt of a hard company) and lets a test order the attempts:
+    with retry_first set, the first attempt's call waits until the retry's returned
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.retry_first = False
+        self.first_called = threading.Event()
+        self.retry_returned = threading.Event()
+
+    def invoke(self, inputs):
+        from company_profiles import CompanyInfo
+
+        if len(inputs["urls"]) >= 2:
+            result = self.chain.invoke(inputs)
+            self.retry_returned.set()
+            return result
+        self.first_called.set()
+        if self.retry_first:
+            self.retry_returned.wait(10)
+        result = self.chain.invoke(inputs)
+        return CompanyInfo(company_name=result.company_name, source_urls=list(inputs["urls"]))
+
+
+@pytest.fixture
+def hard_company(monkeypatch):
+    """Local pages, stub LLM, search and chain for "hard" companies whose first query finds one page"""
+    from langchain_openai import ChatOpenAI
+
+    from assistant import build_extraction_chain
+    from benchmark_suite import FixtureSiteServer, RecordedTavilySearch, load_company_info_fixture
+    from stub_llm_server import StubLLMServer
+
+    monkeypatch.setenv("PAGE_CACHE_ENABLED", "false")
+    with FixtureSiteServer() as site, \
+            StubLLMServer(latency=0.0, structured_replies=load_company_info_fixture()) as stub:
+        chain = OrderedAttemptChain(build_extraction_chain(ChatOpenAI(
+            model="gpt-4o-mini-2024-07-18", base_url=stub.base_url, api_key="stub-key")))
+        yield SimpleNamespace(site=site, stub=stub, search=ThinFirstResultSearch(RecordedTavilySearch(site.base_url)),
+                              chain=chain)
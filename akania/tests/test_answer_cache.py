@@ -0,0 +1,68 @@
+"""
+Tests for the chat answer cache.
+"""
+from answer_cache import AnswerCache, depends_on_history, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+HISTORY = [{"user_message": "Tell me about Sylndr", "ai_response": "Sylndr sells used cars."}]
+
+
+def test_normalized_questions_share_an_entry():
+    assert normalize_question("What does Sylndr do?") == normalize_question("tell me about SYLNDR")
+    cache = AnswerCache()
+    cache.store("What does Sylndr do?", 1, "It sells used cars.", latency_seconds=1.5)
+
+    entry = cache.lookup("Tell me about Sylndr", 1)
+    assert entry.answer == "It sells used cars."
+    assert cache.lookup("Who founded Sylndr?", 1) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (1, 1, 1.5)
+
+
+def test_new_knowledge_generation_invalidates_answers():
+    cache = AnswerCache()
+    cache.store("What does Sylndr do?", 1, "old answer", 1.0)
+    assert cache.lookup("What does Sylndr do?", 2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_and_lru_eviction():
+    clock = FakeClock()
+    cache = AnswerCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.store("Sylndr", 1, "a", 1.0)
+    cache.store("Lapaire", 1, "b", 1.0)
+    cache.lookup("Sylndr", 1)
+    cache.store("Paystack", 1, "c", 1.0)
+    assert cache.lookup("Lapaire", 1) is None
+    assert cache.stats()["evictions"] == 1
+
+    clock.now += 61
+    assert cache.lookup("Sylndr", 1) is None
+
+
+def test_similarity_threshold_reuses_near_identical_questions():
+    exact = AnswerCache()
+    similar = AnswerCache(similarity_threshold=0.75)
+    for cache in (exact, similar):
+        cache.store("Sylndr founders", 1, "Omar Saleh and Amr Mazen", 2.0)
+
+    assert exact.lookup("Sylndr founder", 1) is None
+    assert similar.lookup("Sylndr founder", 1).answer == "Omar Saleh and Amr Mazen"
+    assert similar.lookup("Lapaire glasses founders", 1) is None
+    assert similar.stats()["similar_hits"] == 1
+
+
+def test_follow_up_questions_depend_on_history():
+    assert depends_on_history("Who are its founders?", HISTORY)
+    assert depends_on_history("What about Kenya?", HISTORY)
+    assert not depends_on_history("Who founded Lapaire Glasses?", HISTORY)
+    assert not depends_on_history("Who are its founders?", [])
@@ -1,5 +1,156 @@
 """
-Unit tests for the assistant.
+Unit tests for the assistant, run offline against the recorded fixtures.
 """
-def test_stub():
-    assert True
+from langchain_openai import ChatOpenAI
+
+import threading
+import time
+
+from assistant import (
+    SharedScrapes,
+    build_extraction_chain,
+    extract_company_data,
+    is_result_incomplete,
+    merge_company_info,
+    merge_results,
+    reduce_for_extraction,
+    search_company_urls,
+    unchanged_profile,
+)
+from benchmark_suite import FixtureSiteServer, RecordedTavilySearch, load_company_info_fixture
+from company_profiles import CompanyInfo, KeyPeople, save_company_profile
+from fingerprint_store import get_fingerprint_store
+from scraper import scrape_urls
+from stub_llm_server import StubLLMServer
+
+
+def test_search_company_urls_replays_recorded_tavily_results_through_the_cache():
+    tavily = RecordedTavilySearch("http://pages.test")
+
+    urls = search_company_urls(tavily, "I need only website urls for Sylndr (Egypt)")
+    assert urls == ["http://pages.test/sylndr_home.html", "http://pages.test/sylndr_about.html"]
+    assert search_company_urls(tavily, "I need only website urls for Sylndr (Egypt)") == urls
+    assert tavily.calls == 1
+    assert search_company_urls(tavily, "I need only website urls for Unknown Co (Mali)") == []
+
+
+def test_extraction_chain_end_to_end_with_local_pages_and_stub_llm():
+    with FixtureSiteServer() as site, StubLLMServer(latency=0.0, structured_replies=load_company_info_fixture()) as stub:
+        urls = search_company_urls(RecordedTavilySearch(site.base_url), "Lapaire Glasses (Kenya)")
+        docs = scrape_urls(urls, main_content=True)
+        content = reduce_for_extraction(docs, "Lapaire Glasses (Kenya)")
+        chain = build_extraction_chain(ChatOpenAI(model="gpt-4o-mini-2024-07-18", base_url=stub.base_url,
+                                                  api_key="stub-key"))
+        result = chain.invoke({"content": content.text, "urls": urls})
+
+    assert len(docs) == 2
+    assert content.tokens_after <= content.tokens_before
+    assert result.company_name == "Lapaire Glasses"
+    assert "Kenya" in result.countries
+    assert not is_result_incomplete(result)
+
+
+def test_merge_results_keeps_the_more_complete_attempt():
+    partial = CompanyInfo(company_name="Sylndr")
+    complete = CompanyInfo(company_name="Sylndr", countries=["Egypt"], sector=["Automotive"],
+                           business_description="Used cars marketplace")
+
+    assert is_result_incomplete(partial)
+    merged = merge_results(partial, complete)
+    assert merged.countries == ["Egypt"]
+    assert merge_results(None, complete) is complete
+
+
+def test_merge_company_info_merges_every_field():
+    first = CompanyInfo(company_name="Sylndr", countries=["Egypt"], key_people=[KeyPeople(name="Omar", title="CEO")],
+                        source_urls=["https://sylndr.com/"])
+    retry = CompanyInfo(company_name="Sylndr Inc", countries=["egypt", "Kenya"], sector=["Automotive"],
+                        key_people=[KeyPeople(name="omar ", title="Founder"), KeyPeople(name="Amr", title="CTO")],
+                        transactions="Raised $12.6M seed", source_urls=["https://SYLNDR.com", "https://sylndr.com/about"])
+
+    merged = merge_company_info(first, retry)
+    assert merged.company_name == "Sylndr"
+    assert merged.countries == ["Egypt", "Kenya"]
+    assert merged.sector == ["Automotive"]
+    assert [person.name for person in merged.key_people] == ["Omar", "Amr"]
+    assert merged.transactions == "Raised $12.6M seed"
+    assert merged.source_urls == ["https://sylndr.com/", "https://sylndr.com/about"]
+    assert first.countries == ["Egypt"]  # Inputs are left untouched
+
+
+def test_shared_scrapes_fetch_each_url_once_across_attempts():
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def scrape(urls, main_content=True):
+        calls.append(list(urls))
+        started.set()
+        release.wait(5)
+        from langchain_core.documents import Document
+        return [Document(page_content=url, metadata={"source": url}) for url in urls]
+
+    scrapes = SharedScrapes(scrape)
+    results = {}
+    first = threading.Thread(target=lambda: results.setdefault("first", scrapes.scrape(["http://a.test/", "http://b.test/"])))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.setdefault("second", scrapes.scrape(["http://b.test", "http://c.test/"])))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert sorted(map(tuple, calls)) == [("http://a.test/", "http://b.test/"), ("http://c.test/",)]
+    assert [doc.page_content for doc in results["second"]] == ["http://b.test/", "http://c.test/"]
+
+
+def test_speculative_retry_answers_hard_companies_in_one_round_trip(monkeypatch, hard_company):
+    saved = []
+    monkeypatch.setattr("assistant.save_company_profile", lambda result: saved.append(result))
+    site, chain = hard_company.site, hard_company.chain
+    sequential = extract_company_data("Sylndr hard 1 (Egypt)", speculative=False,
+                                      search=hard_company.search, chain=chain)
+    sequential_pages = site.requests
+
+    # The retry completes while the thin first attempt is still in its LLM call
+    chain.retry_first = True
+    chain.first_called.clear()
+    chain.retry_returned.clear()
+    speculative = extract_company_data("Sylndr hard 2 (Egypt)", speculative=True,
+                                       search=hard_company.search, chain=chain)
+    assert chain.first_called.wait(5)
+
+    assert not is_result_incomplete(sequential) and not is_result_incomplete(speculative)
+    # The retry won: the unfinished thin first attempt is not merged in
+    assert set(speculative.source_urls) < set(sequential.source_urls)
+    # The home page found by both queries is fetched once
+    assert sequential_pages == 3 and site.requests - sequential_pages == 2
+    assert len(saved) == 2
+    # The first attempt had not finished: its sources are not the saved result's fingerprint
+    assert get_fingerprint_store().get("Sylndr hard 1 (Egypt)") is not None
+    assert get_fingerprint_store().get("Sylndr hard 2 (Egypt)") is None
+
+
+def test_speculative_refresh_of_unchanged_sources_skips_the_llm(hard_company):
+    query = "Sylndr hard 1 (Egypt)"
+    first = extract_company_data(query, speculative=False, search=hard_company.search, chain=hard_company.chain)
+    calls = hard_company.stub.requests
+
+    again = extract_company_data(query, refresh=True, speculative=True,
+                                 search=hard_company.search, chain=hard_company.chain)
+    assert again.company_name == first.company_name
+    # Neither attempt calls the LLM: the retry waits for the first attempt's fingerprint check
+    assert hard_company.stub.requests == calls
+
+
+def test_unchanged_sources_find_a_profile_merged_on_its_website():
+    save_company_profile(CompanyInfo(company_name="Merec Industries", countries=["South Africa"],
+                                     source_urls=["https://www.merecindustries.com/en/"]))
+    urls = ["https://merecindustries.com/about"]
+    key = save_company_profile(CompanyInfo(company_name="Merec", source_urls=urls))
+    assert key == "merec industries"
+
+    # Fingerprints recorded before the merge name the profile as it was saved then
+    get_fingerprint_store().record("Merec (South Africa)", urls, "hash", "Merec")
+    assert unchanged_profile("Merec (South Africa)", urls, "hash").company_name == "Merec Industries"
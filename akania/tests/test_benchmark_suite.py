@@ -0,0 +1,21 @@
+"""
+Smoke test for the offline benchmark suite (small sizes, no network).
+"""
+from benchmark_suite import HEADLINE_METRICS, headline, run_suite
+
+
+def test_quick_suite_sections_produce_headline_metrics():
+    document = run_suite(("discovery", "scraping", "pipeline"), quick=True, search_latency=0.0,
+                         page_latency=0.0, llm_latency=0.0)
+
+    results = document["results"]
+    assert results["discovery"]["api_calls"] == 2  # warm lookups hit the search cache
+    assert results["scraping"]["scraped"] == results["scraping"]["pages"]
+    assert results["pipeline"]["saved"] == results["pipeline"]["companies"]
+    assert results["pipeline"]["llm_requests"] == results["pipeline"]["companies"]
+    assert set(headline(document)) <= set(HEADLINE_METRICS)
+    assert "pipeline.companies_per_second" in headline(document)
+    # Batched extraction packs the companies into fewer LLM calls
+    batched = results["pipeline_batched"]
+    assert batched["saved"] == batched["companies"]
+    assert batched["llm_requests"] < batched["companies"]
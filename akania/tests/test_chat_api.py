@@ -0,0 +1,264 @@
+"""
+Tests for the chat API with a fake async LLM.
+"""
+import asyncio
+import importlib
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class SlowFakeLLM:
+    """Async chat model stand-in that sleeps like a remote completion"""
+
+    def __init__(self, delay=0.0, reply="stub answer"):
+        self.delay = delay
+        self.reply = reply
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        return AIMessage(content=self.reply)
+
+    async def astream(self, messages):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        for i, word in enumerate(self.reply.split(" ")):
+            yield AIMessageChunk(content=word if i == 0 else f" {word}")
+
+
+@pytest.fixture()
+def main(monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_RELOAD_INTERVAL", "0")
+    import main as main_module
+    main_module = importlib.reload(main_module)
+    fake_llm = SlowFakeLLM()
+    monkeypatch.setattr(main_module.CHAT_LLM, "_llm", fake_llm)
+    main_module.fake_llm = fake_llm
+    return main_module
+
+
+def test_chat_endpoint_uses_shared_llm_and_keeps_history(main):
+    with TestClient(main.app) as client:
+        assert client.post("/chat", json={"message": "Tell me about Sylndr"}).json() == {"response": "stub answer"}
+        client.post("/chat", json={"message": "Who is its CEO?"})
+        history = client.get("/chat-history").json()
+
+    assert history["count"] == 2
+    system_prompt = main.fake_llm.calls[0][0].content
+    assert "Sylndr" in system_prompt
+    # The second call carries the first exchange as history
+    assert [m.content for m in main.fake_llm.calls[1][1:3]] == ["Tell me about Sylndr", "stub answer"]
+
+
+def test_concurrent_responses_do_not_block_each_other(main):
+    main.fake_llm.delay = 0.2
+
+    async def ask_many():
+        return await asyncio.gather(*(main.get_ai_response(f"question {i}") for i in range(10)))
+
+    start = time.perf_counter()
+    answers = asyncio.run(ask_many())
+    assert answers == ["stub answer"] * 10
+    assert time.perf_counter() - start < 1.0
+
+
+def test_concurrency_limit(main, monkeypatch):
+    main.fake_llm.delay = 0.1
+    monkeypatch.setattr(main.CHAT_LLM, "max_concurrency", 2)
+    monkeypatch.setattr(main.CHAT_LLM, "_semaphore", None)
+
+    async def ask_many():
+        return await asyncio.gather(*(main.get_ai_response(f"question {i}") for i in range(4)))
+
+    start = time.perf_counter()
+    asyncio.run(ask_many())
+    assert time.perf_counter() - start >= 0.2
+
+
+def read_events(response):
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines.get("event", "message"), json.loads(lines["data"])))
+    return events
+
+
+def test_stream_endpoint_sends_tokens_then_done_and_updates_history(main):
+    with TestClient(main.app) as client:
+        response = client.post("/chat/stream", json={"message": "Tell me about Sylndr"})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = read_events(response)
+
+        assert [data["token"] for name, data in events if name == "message"] == ["stub", " answer"]
+        name, done = events[-1]
+        assert name == "done"
+        assert done["response"] == "stub answer"
+        assert done["ttft_ms"] <= done["total_ms"]
+
+        history = client.get("/chat-history").json()
+        assert history["count"] == 1
+        assert history["history"][0]["ai_response"] == "stub answer"
+
+        # The streamed exchange is part of the context for the next question
+        client.post("/chat", json={"message": "Who is its CEO?"})
+        assert [m.content for m in main.fake_llm.calls[1][1:3]] == ["Tell me about Sylndr", "stub answer"]
+        assert client.get("/chat-history").json()["count"] == 2
+        assert client.get("/health").json()["streaming"]["streams"] == 1
+
+
+def test_stream_reports_error_when_llm_fails(main, monkeypatch):
+    async def broken(messages):
+        raise RuntimeError("provider down")
+        yield
+
+    monkeypatch.setattr(main.fake_llm, "astream", broken)
+    with TestClient(main.app) as client:
+        events = read_events(client.post("/chat/stream", json={"message": "hi"}))
+
+    assert events[0][1]["token"] == main.ERROR_RESPONSE
+    assert events[-1][1]["response"] == main.ERROR_RESPONSE
+
+
+def test_stream_failing_mid_reply_ends_with_an_error_and_is_not_stored(main, monkeypatch):
+    async def cut_off(messages):
+        yield AIMessageChunk(content="Sylndr is")
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(main.fake_llm, "astream", cut_off)
+    with TestClient(main.app) as client:
+        events = read_events(client.post("/chat/stream", json={"message": "Tell me about Sylndr"}))
+        assert events == [("message", {"token": "Sylndr is"}),
+                          ("error", {"error": main.ERROR_RESPONSE, "response": "Sylndr is"})]
+        assert client.get("/chat-history").json()["count"] == 0
+
+
+def test_system_prompt_is_stable_and_instrumented(main):
+    snapshot = main.KNOWLEDGE.snapshot
+    first = main.build_chat_messages("Tell me about Sylndr", [])[0][1]
+    second = main.build_chat_messages("Sylndr founders?", [])[0][1]
+    prefix = main.system_prompt_prefix(snapshot)
+
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert main.system_prompt_prefix(snapshot) is prefix
+    # Same retrieved companies render to the same bytes, whatever their rank
+    assert main.build_chat_messages("Tell me about Sylndr", [])[0][1] == first
+
+    stats = main.PROMPT_STATS[-1]
+    assert stats["prompt_tokens"] > stats["system_tokens"] > 0
+    assert stats["build_ms"] >= 0
+    with TestClient(main.app) as client:
+        assert client.get("/health").json()["prompt"]["requests"] == 3
+
+
+def test_history_is_server_side_and_token_budgeted(main, monkeypatch):
+    main.fake_llm.reply = "word " * 200
+    with TestClient(main.app) as client:
+        for i in range(8):
+            client.post("/chat", json={"message": f"question {i}"})
+        # The cookie carries the session id only, however long the conversation
+        assert len(client.cookies.get("session")) < 200
+        assert client.get("/chat-history").json()["count"] == 8
+
+        monkeypatch.setattr(main, "HISTORY_TOKEN_BUDGET", 800)
+        client.post("/chat", json={"message": "last question"})
+
+    # Each exchange is 200-260 tokens (tiktoken or estimate), so only the 3 newest fit the budget
+    history_messages = main.fake_llm.calls[-1][1:-1]
+    assert [m.content for m in history_messages[::2]] == ["question 5", "question 6", "question 7"]
+
+
+def test_repeated_questions_are_answered_from_cache(main):
+    with TestClient(main.app) as client:
+        client.post("/chat", json={"message": "What does Sylndr do?"})
+        assert client.post("/chat", json={"message": "tell me about sylndr"}).json() == {"response": "stub answer"}
+        # A follow-up leaning on the conversation is never served from the cache
+        client.post("/chat", json={"message": "Who are its founders?"})
+        client.post("/chat", json={"message": "Who are its founders?"})
+        events = read_events(client.post("/chat/stream", json={"message": "What does Sylndr do"}))
+        metrics = client.get("/metrics/answer-cache").json()
+
+    assert len(main.fake_llm.calls) == 3
+    assert events[-1][1]["response"] == "stub answer"
+    assert metrics["enabled"] is True
+    assert (metrics["hits"], metrics["misses"], metrics["bypassed"]) == (2, 1, 2)
+
+    main.KNOWLEDGE.replace(main.KNOWLEDGE.snapshot.companies)
+    asyncio.run(main.get_ai_response("What does Sylndr do?"))
+    assert len(main.fake_llm.calls) == 4
+
+
+def test_metrics_endpoint_reports_chat_latency_and_knowledge_size(main):
+    with TestClient(main.app) as client:
+        client.post("/chat", json={"message": "Tell me about Sylndr"})
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE akania_chat_request_seconds histogram" in text
+    assert 'akania_chat_request_seconds_count{endpoint="chat"}' in text
+    companies = len(main.KNOWLEDGE.snapshot.companies)
+    assert f"akania_knowledge_companies {companies}" in text
+    assert 'akania_span_duration_seconds_count{span="chat_llm"}' in text
+
+
+def test_liveness_before_readiness_and_chat_waits_for_the_knowledge_base(main):
+    # Without the lifespan nothing loads the knowledge base in the background
+    client = TestClient(main.app)
+    assert client.get("/health/live").json()["status"] == "alive"
+    assert client.get("/health/ready").status_code == 503
+    assert client.get("/health").json()["ready"] is False
+
+    # A chat request during startup waits for the load instead of answering without knowledge
+    assert client.post("/chat", json={"message": "Tell me about Sylndr"}).json() == {"response": "stub answer"}
+    assert "Sylndr" in main.fake_llm.calls[0][0].content
+    ready = client.get("/health/ready")
+    assert ready.status_code == 200
+    assert "knowledge_ms" in ready.json()["startup"]
+
+
+def test_startup_loads_knowledge_in_the_background(main):
+    with TestClient(main.app) as client:
+        deadline = time.time() + 10
+        while client.get("/health/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.01)
+        startup = client.get("/health").json()["startup"]
+
+    assert startup["imports_ms"] <= startup["serving_ms"] <= startup["ready_ms"]
+
+
+def test_companies_endpoint_filters_by_facets_and_paginates(main):
+    with TestClient(main.app) as client:
+        kenya = client.get("/companies", params={"country": "kenya"}).json()
+        agriculture = client.get("/companies", params={"sector": "Agriculture", "limit": 1}).json()
+        second_page = client.get("/companies", params={"sector": "Agriculture", "limit": 1, "offset": 1}).json()
+        both = client.get("/companies", params={"country": "Mozambique", "sector": "agriculture"}).json()
+        facets = client.get("/companies/facets").json()["facets"]
+        invalid = client.get("/companies", params={"limit": 0})
+
+    assert [c["company_name"] for c in kenya["companies"]] == ["Lapaire Glasses"]
+    assert agriculture["total"] == 2 and len(agriculture["companies"]) == 1
+    assert second_page["companies"][0]["company_name"] != agriculture["companies"][0]["company_name"]
+    assert [c["company_name"] for c in both["companies"]] == ["Merec Industries"]
+    assert facets["sector"]["Agriculture"] == 2
+    assert invalid.status_code == 422
+    assert main.fake_llm.calls == []
+
+
+def test_structured_questions_are_answered_without_the_llm(main):
+    with TestClient(main.app) as client:
+        founder = client.post("/chat", json={"message": "Who is the founder of Lapaire Glasses?"}).json()
+        mozambique = client.post("/chat/stream", json={"message": "Which companies operate in Mozambique?"})
+        open_ended = client.post("/chat", json={"message": "Tell me about Sylndr"}).json()
+        metrics = client.get("/metrics").text
+
+    assert "Jérôme Lapaire" in founder["response"]
+    assert "Merec Industries" in mozambique.text
+    assert open_ended == {"response": "stub answer"}
+    assert len(main.fake_llm.calls) == 1
+    assert 'akania_chat_routed_total{route="people"}' in metrics
+    assert 'akania_chat_routed_total{route="llm"}' in metrics
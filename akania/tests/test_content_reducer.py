@@ -0,0 +1,50 @@
+"""
+Tests for content reduction before LLM extraction, on saved HTML pages.
+"""
+import os
+
+from content_reducer import estimate_tokens, reduce_documents
+from fetcher import html_to_document
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+
+def load(name, main_content=True):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return html_to_document(f"https://example.com/{name}", f.read(), main_content=main_content)
+
+
+def test_main_content_drops_navigation_footer_banners_and_scripts():
+    raw = load("sylndr_about.html", main_content=False).page_content
+    text = load("sylndr_about.html").page_content
+
+    assert "Careers" in raw and "All rights reserved" in raw
+    for boilerplate in ("Careers", "All rights reserved", "use cookies", "Subscribe to our newsletter", "gtag"):
+        assert boilerplate not in text
+    assert "Sylndr was founded in Cairo in 2022 by Omar El Defrawy and Amr Mazen" in text.replace("\n", " ")
+    assert len(text) < len(raw) * 0.6
+
+
+def test_paragraphs_repeated_across_pages_are_kept_once():
+    docs = [load("sylndr_home.html"), load("sylndr_about.html")]
+    reduced = reduce_documents(docs, "Sylndr", token_budget=10000)
+
+    assert reduced.text.count("200-point inspection") == 1
+    assert reduced.duplicates >= 3
+    assert reduced.text.startswith("Source: https://example.com/sylndr_home.html")
+
+
+def test_token_budget_keeps_the_most_relevant_paragraphs():
+    docs = [load("sylndr_home.html"), load("sylndr_about.html")]
+    reduced = reduce_documents(docs, "Sylndr", token_budget=250)
+
+    assert reduced.tokens_after <= 250
+    assert estimate_tokens(reduced.text) == reduced.tokens_after
+    assert "Series A" in reduced.text
+    # Listing rows say nothing about the company and are the first to go
+    assert "Hyundai Elantra" not in reduced.text
+
+
+def test_plain_string_documents_are_accepted():
+    reduced = reduce_documents(["Lapaire was founded in 2018 in Nairobi, Kenya.\nok"], "Lapaire Glasses")
+    assert reduced.text == "Source: page 1\nLapaire was founded in 2018 in Nairobi, Kenya."
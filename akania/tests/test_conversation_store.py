@@ -0,0 +1,78 @@
+"""
+Tests for the server-side conversation store.
+"""
+from conversation_store import MemoryConversationStore, SQLiteConversationStore, open_conversation_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def exchange(i):
+    return {"user_message": f"question {i}", "ai_response": f"answer {i}"}
+
+
+def test_memory_store_keeps_newest_items_and_evicts_least_recent_session():
+    store = MemoryConversationStore(max_sessions=2)
+    for i in range(5):
+        store.append("a", exchange(i), max_items=3)
+    assert [item["user_message"] for item in store.get("a")] == ["question 2", "question 3", "question 4"]
+
+    store.append("b", exchange(0))
+    store.get("a")  # touch "a" so "b" is the least recently used
+    store.append("c", exchange(0))
+    assert store.get("b") == []
+    assert len(store.get("a")) == 3
+    assert store.stats()["evicted"] == 1
+
+
+def test_memory_store_expires_idle_sessions():
+    clock = FakeClock()
+    store = MemoryConversationStore(ttl_seconds=60, clock=clock)
+    store.append("a", exchange(0))
+    clock.now += 59
+    assert len(store.get("a")) == 1
+    clock.now += 61
+    assert store.get("a") == []
+    assert store.stats()["expired"] == 1
+
+
+def test_sqlite_store_persists_and_expires(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "conversations.sqlite")
+    store = SQLiteConversationStore(path, ttl_seconds=60, clock=clock)
+    store.append("a", exchange(0))
+    store.append("a", exchange(1))
+    store.close()
+
+    reopened = SQLiteConversationStore(path, ttl_seconds=60, clock=clock)
+    assert [item["ai_response"] for item in reopened.get("a")] == ["answer 0", "answer 1"]
+    reopened.clear("a")
+    assert reopened.get("a") == []
+
+    reopened.append("b", exchange(0))
+    clock.now += 120
+    assert reopened.get("b") == []
+
+
+def test_sqlite_store_purges_expired_sessions_once_per_interval(tmp_path):
+    clock = FakeClock()
+    store = SQLiteConversationStore(str(tmp_path / "conversations.sqlite"), ttl_seconds=60, clock=clock,
+                                    purge_interval=300)
+    store.append("a", exchange(0))
+    clock.now += 120
+    store.append("b", exchange(0))
+    assert store.stats()["sessions"] == 2  # "a" expired, but the last purge is recent
+    clock.now += 300
+    store.append("b", exchange(1))
+    assert store.stats()["sessions"] == 1
+
+
+def test_open_conversation_store_by_url(tmp_path):
+    assert isinstance(open_conversation_store("memory://"), MemoryConversationStore)
+    store = open_conversation_store(f"sqlite:///{tmp_path / 'c.sqlite'}")
+    assert isinstance(store, SQLiteConversationStore)
@@ -0,0 +1,144 @@
+"""
+Tests for company entity resolution and de-duplication.
+"""
+import json
+
+from company_profiles import CompanyInfo, KeyPeople, save_company_profile
+from entity_resolution import (
+    EntityIndex,
+    EntityResolver,
+    canonical_name,
+    deduplicate_store,
+    find_duplicates,
+    registrable_domain,
+)
+from profile_store import JsonDirectoryProfileStore, SQLiteProfileStore, get_profile_store
+
+
+def profile(name, countries=(), urls=(), **fields):
+    return {"company_name": name, "countries": list(countries), "sector": [], "key_people": [],
+            "source_urls": list(urls), **fields}
+
+
+def test_canonical_names_drop_legal_forms_and_punctuation():
+    assert canonical_name("Moni-Shop") == "moni shop"
+    assert canonical_name("Moni Shop SARL") == "moni shop"
+    assert canonical_name("The MONI SHOP S.A.R.L.") == "moni shop"
+    assert canonical_name("Ltd") == "ltd"
+    assert registrable_domain("https://www.shop.example.co.ke/about") == "example.co.ke"
+    assert registrable_domain("http://127.0.0.1:8000/") == ""
+
+
+def test_index_matches_name_variants_and_own_websites_only():
+    index = EntityIndex()
+    index.add("moni shop", profile("Moni-Shop", ["DRC"]))
+    index.add("merec industries", profile("Merec Industries", urls=["https://www.merecindustries.com/en/"]))
+    index.add("shoprite", profile("Shoprite", urls=["https://clubofmozambique.com/news/1"]))
+    index.add("lapaire glasses", profile("Lapaire Glasses", ["Kenya"]))
+
+    assert index.match(profile("Moni Shop SARL")) == "moni shop"
+    assert index.match(profile("Merec", urls=["https://merecindustries.com"])) == "merec industries"
+    # A news site citing both companies says nothing
+    assert index.match(profile("Shop", urls=["https://clubofmozambique.com/news/2"])) is None
+    assert index.match(profile("Lapaire Glasses Kenya", ["Kenya"])) is None
+    assert index.match(profile("Lapaire Glasses", ["Kenya"]), exclude="lapaire glasses") is None
+
+
+def test_blocking_keeps_comparisons_far_below_all_pairs():
+    syllables = ["ka", "mo", "zu", "le", "ri", "ba", "no", "ti", "se", "wa", "pe", "du"]
+    index = EntityIndex()
+    for i in range(3000):
+        name = "".join(syllables[(i // len(syllables) ** power) % len(syllables)] for power in range(4))
+        index.add(name, profile(f"{name.title()} Holdings {i}"))
+    assert index.match(profile("Kamozule Holdings 17")) is None
+    assert index.comparisons < 3000 // 10
+
+
+def test_save_merges_a_duplicate_into_the_stored_profile():
+    store = get_profile_store()  # Seeded from data/, which has Moni-Shop
+    before = store.count()
+    key = save_company_profile(CompanyInfo(company_name="Moni Shop SARL", countries=["Congo", "Gabon"],
+                                           business_description="Supermarket in Kinshasa",
+                                           key_people=[KeyPeople(name="Toussaint Ndombasi", title="CEO")],
+                                           source_urls=["https://monishop.org/about"]))
+
+    assert key == "moni shop" and store.count() == before
+    merged = store.get("Moni-Shop")
+    assert merged["company_name"] == "Moni-Shop"
+    # The new values come first, filled in from the stored profile
+    assert merged["countries"] == ["Congo", "Gabon", "République Démocratique du Congo"]
+    assert merged["business_description"] == "Supermarket in Kinshasa"
+    assert merged["key_people"] == [{"name": "Toussaint Ndombasi", "title": "CEO"}]
+    assert merged["sector"] == ["Retail", "Agroalimentaire", "Distribution", "Supermarket"]
+    assert merged["source_urls"][0] == "https://monishop.org/about" and len(merged["source_urls"]) == 6
+
+
+def test_resolver_sees_profiles_written_by_other_writers(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    resolver = EntityResolver(store)
+    resolver.save(profile("Sylndr", ["Egypt"]))
+    store.upsert(profile("Lapaire Glasses", ["Kenya"]))  # Not through the resolver
+    assert resolver.resolve(profile("Lapaire Glasses Ltd")) == "lapaire glasses"
+    store.delete("Lapaire Glasses")
+    assert resolver.resolve(profile("Lapaire Glasses Ltd")) is None
+    store.close()
+
+
+def test_saves_read_the_store_version_once_and_resync_only_for_other_writers(tmp_path):
+    calls = []
+
+    class CountingStore(SQLiteProfileStore):
+        def version(self):
+            calls.append("version")
+            return super().version()
+
+        def changed_since(self, timestamp):
+            calls.append("changed_since")
+            return super().changed_since(timestamp)
+
+    store = CountingStore(str(tmp_path / "profiles.sqlite"))
+    resolver = EntityResolver(store)
+    for i in range(5):
+        resolver.save(profile(f"Company {i}", ["Kenya"]))
+    assert calls == ["version"] * 5
+
+    calls.clear()
+    store.upsert(profile("Lapaire Glasses", ["Kenya"]))  # Not through the resolver
+    assert resolver.save(profile("Lapaire Glasses Ltd", ["Kenya"])) == ("lapaire glasses", "lapaire glasses")
+    assert calls == ["version", "changed_since"]
+    store.close()
+
+
+def test_bulk_pass_merges_duplicates_of_a_data_directory(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    files = {
+        # Files of older versions: same company under several spellings
+        "Moni-Shop.json": profile("Moni-Shop", ["DRC"], ["https://www.monishop.org/"], sector=["Retail"]),
+        "Moni_Shop_SARL.json": profile("Moni Shop SARL", ["Congo"], business_description="Supermarket"),
+        "moni_shop.json": profile("moni shop", [], ["https://monishop.org/contact"]),
+        "Sylndr.json": profile("Sylndr", ["Egypt"]),
+    }
+    for filename, data in files.items():
+        (data_dir / filename).write_text(json.dumps(data), encoding="utf-8")
+    store = JsonDirectoryProfileStore(str(data_dir))
+
+    assert [len(group) for group in find_duplicates(store.all())] == [3]
+    # The most complete profile keeps its name
+    assert deduplicate_store(store, dry_run=True) == [("Moni-Shop", ["Moni Shop SARL", "moni shop"])]
+    assert store.count() == 4
+
+    deduplicate_store(store)
+    assert sorted(path.name for path in data_dir.iterdir()) == ["Moni-Shop.json", "Sylndr.json"]
+    merged = JsonDirectoryProfileStore(str(data_dir)).get("Moni-Shop")
+    assert merged["countries"] == ["DRC", "Congo"]
+    assert merged["business_description"] == "Supermarket"
+    assert merged["source_urls"] == ["https://www.monishop.org/", "https://monishop.org/contact"]
+
+
+def test_json_files_of_different_companies_never_collide(tmp_path):
+    store = JsonDirectoryProfileStore(str(tmp_path))
+    store.upsert(profile("FooBar"))
+    store.upsert(profile("Foo(Bar)"))
+    store.upsert(profile("Acme/Kenya"))
+    assert sorted(p["company_name"] for p in store.all()) == ["Acme/Kenya", "Foo(Bar)", "FooBar"]
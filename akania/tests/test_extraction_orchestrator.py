@@ -0,0 +1,159 @@
+"""
+Tests for the batch extraction pipeline using fake stages.
+"""
+import asyncio
+import time
+
+from assistant import batch_extraction_token_estimate
+from company_profiles import CompanyInfo, CompanyInfoBatch, NumberedCompanyInfo
+from extraction_orchestrator import ExtractionPipeline, run_batch
+
+
+def fake_stages(saved, delay=0.0, incomplete_first=()):
+    async def search_fn(search_query):
+        await asyncio.sleep(delay)
+        return [f"https://example.com/{search_query}"]
+
+    async def scrape_fn(urls):
+        await asyncio.sleep(delay)
+        return [f"content of {url}" for url in urls]
+
+    async def extract_fn(docs, urls):
+        await asyncio.sleep(delay)
+        name = urls[0].split("/")[-1]
+        if any(company in name for company in incomplete_first) and name.startswith("I need"):
+            return CompanyInfo(company_name=name)
+        return CompanyInfo(company_name=name, countries=["Kenya"], sector=["Retail"], business_description="desc")
+
+    async def save_fn(result):
+        saved.append(result.company_name)
+
+    return dict(search_fn=search_fn, scrape_fn=scrape_fn, extract_fn=extract_fn, save_fn=save_fn)
+
+
+def test_pipeline_processes_every_company():
+    saved = []
+    report = run_batch(["A (Kenya)", "B (Egypt)", "C (Ghana)"], **fake_stages(saved))
+    assert report["saved"] == 3
+    assert len(saved) == 3
+    assert {stage["stage"]: stage["processed"] for stage in report["stages"]}["extract"] == 3
+    # Every company went through one traced reduce and LLM span
+    assert report["spans"]["reduce"]["count"] == 3
+    assert report["spans"]["llm"]["count"] == 3
+    assert report["spans"]["llm"]["tokens_out"] > 0
+
+
+def test_incomplete_result_is_retried_with_alternate_query():
+    saved = []
+    report = run_batch(["Hard (Kenya)"], **fake_stages(saved, incomplete_first=("Hard",)))
+    assert report["saved"] == 1
+    assert saved == ["Hard company about business information profile"]
+    assert {stage["stage"]: stage["processed"] for stage in report["stages"]}["search"] == 2
+
+
+def test_stages_overlap_across_companies():
+    saved = []
+    queries = [f"Company {i}" for i in range(6)]
+    start = time.perf_counter()
+    run_batch(queries, search_workers=3, scrape_workers=3, llm_workers=3, **fake_stages(saved, delay=0.05))
+    # Sequential processing would take 6 companies x 3 stages x 0.05s = 0.9s
+    assert time.perf_counter() - start < 0.6
+
+
+def test_checkpoint_resumes_finished_companies(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    saved = []
+    run_batch(["A", "B"], checkpoint_path=checkpoint, **fake_stages(saved))
+
+    saved_again = []
+    pipeline = ExtractionPipeline(checkpoint_path=checkpoint, **fake_stages(saved_again))
+    report = asyncio.run(pipeline.run(["A", "B", "C", "C", "A"]))
+    assert (report["companies"], report["skipped_from_checkpoint"], report["processed"]) == (3, 2, 1)
+    assert len(saved_again) == 1
+
+
+def test_refresh_skips_llm_for_companies_with_unchanged_sources(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    pages = {}
+    extracted = []
+
+    def stages(saved):
+        base = fake_stages(saved)
+
+        async def scrape_fn(urls):
+            return [pages.get(url, f"About {url}: founded in 2020, operates in Kenya") for url in urls]
+
+        async def extract_fn(content, urls):
+            extracted.append(urls[0])
+            return await base["extract_fn"](content, urls)
+
+        return dict(base, scrape_fn=scrape_fn, extract_fn=extract_fn, checkpoint_path=checkpoint,
+                    profile_exists=lambda name: name in saved)
+
+    saved = []
+    run_batch(["A (Kenya)", "B (Egypt)"], **stages(saved))
+    assert len(extracted) == 2
+
+    # Without --refresh the checkpoint skips everything; with it, fingerprints decide
+    report = run_batch(["A (Kenya)", "B (Egypt)"], refresh=True, **stages(saved))
+    assert report["sources"] == {"skipped_unchanged": 2, "rescraped": 2, "reextracted": 0}
+    assert len(extracted) == 2
+
+    pages["https://example.com/I need only website urls for B (Egypt)"] = "B was acquired in 2024"
+    report = run_batch(["A (Kenya)", "B (Egypt)"], refresh=True, **stages(saved))
+    assert report["sources"] == {"skipped_unchanged": 1, "rescraped": 2, "reextracted": 1}
+    assert extracted[-1].endswith("B (Egypt)")
+
+
+def batch_stages(saved, batches, drop=()):
+    """fake_stages plus a batched extractor that leaves out the companies named in `drop`"""
+    base = fake_stages(saved)
+    singles = []
+
+    async def extract_fn(content, urls):
+        singles.append(urls[0])
+        return await base["extract_fn"](content, urls)
+
+    async def batch_extract_fn(entries):
+        batches.append([query for query, _, _ in entries])
+        companies = []
+        for number, (query, content, urls) in enumerate(entries, 1):
+            if not any(name in query for name in drop):
+                info = await base["extract_fn"](content, urls)
+                companies.append(NumberedCompanyInfo(company_number=number, info=info))
+        return CompanyInfoBatch(companies=companies)
+
+    return dict(base, extract_fn=extract_fn, batch_extract_fn=batch_extract_fn, batch_wait=0.05), singles
+
+
+def test_batched_extraction_shares_llm_calls_between_companies():
+    saved, batches = [], []
+    stages, singles = batch_stages(saved, batches)
+    queries = [f"Company {i}" for i in range(6)]
+    report = run_batch(queries, batch_token_budget=100000, batch_size=4, **stages)
+
+    assert report["saved"] == 6
+    assert sorted(name.split("for ")[-1] for name in saved) == queries
+    assert [len(batch) for batch in batches] == [4, 2]
+    assert singles == []
+    assert report["llm"]["calls"] == 2 and report["llm"]["calls_per_company"] == round(2 / 6, 3)
+
+
+def test_batches_respect_the_token_budget():
+    saved, batches = [], []
+    stages, _ = batch_stages(saved, batches)
+    one_company = batch_extraction_token_estimate(["content of https://example.com/I need only website urls"])
+    run_batch([f"Company {i}" for i in range(4)], batch_token_budget=one_company + 300, **stages)
+    # Not even two companies fit, so every company gets its own call
+    assert batches == []
+
+
+def test_companies_left_out_of_a_batch_fall_back_to_single_calls():
+    saved, batches = [], []
+    stages, singles = batch_stages(saved, batches, drop=("B",))
+    report = run_batch(["A (Kenya)", "B (Egypt)", "C (Ghana)"], batch_token_budget=100000, **stages)
+
+    assert report["saved"] == 3
+    assert len(batches) == 1
+    assert singles == ["https://example.com/I need only website urls for B (Egypt)"]
+    assert report["llm"]["fallbacks"] == 1 and report["llm"]["calls"] == 2
@@ -0,0 +1,18 @@
+"""
+Tests for the source fingerprint store.
+"""
+from fingerprint_store import FingerprintStore, content_hash
+
+
+def test_fingerprint_matches_same_urls_and_content_only(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.sqlite"))
+    urls = ["https://sylndr.com/about", "https://sylndr.com/"]
+    store.record("Sylndr (Egypt)", urls, content_hash("page text"), "Sylndr")
+
+    assert store.unchanged("sylndr (egypt)", list(reversed(urls)), content_hash("page text")).profile_name == "Sylndr"
+    assert store.unchanged("Sylndr (Egypt)", urls, content_hash("new page text")) is None
+    assert store.unchanged("Sylndr (Egypt)", urls[:1], content_hash("page text")) is None
+    assert store.unchanged("Lapaire (Kenya)", urls, content_hash("page text")) is None
+
+    store.close()
+    assert FingerprintStore(str(tmp_path / "fingerprints.sqlite")).count() == 1
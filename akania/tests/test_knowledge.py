@@ -0,0 +1,159 @@
+"""
+Tests for incremental knowledge base hot reload.
+"""
+import asyncio
+import time
+
+from knowledge import KnowledgeBase
+from profile_store import SQLiteProfileStore
+from retrieval import KnowledgeIndex
+
+
+def profile(name, country="Kenya"):
+    return {"company_name": name, "countries": [country], "sector": ["Retail"], "key_people": []}
+
+
+def test_reload_picks_up_new_changed_and_deleted_profiles(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert_many([profile("Alpha"), profile("Beta")])
+    knowledge = KnowledgeBase(store)
+    first = knowledge.load()
+    assert first.generation == 1 and len(first.companies) == 2
+
+    assert knowledge.reload() is False
+    assert knowledge.snapshot is first
+
+    store.upsert(profile("Gamma", "Ghana"))
+    store.upsert(profile("Alpha", "Egypt"))
+    store.delete("Beta")
+    assert knowledge.reload() is True
+
+    second = knowledge.snapshot
+    assert second.generation == 2
+    assert [c["company_name"] for c in second.companies] == ["Alpha", "Gamma"]
+    assert second.profiles_by_key["alpha"]["countries"] == ["Egypt"]
+    assert second.index.search("Ghana", top_k=1)[0]["company_name"] == "Gamma"
+    # The old snapshot is untouched for requests still using it
+    assert len(first.companies) == 2
+
+
+def test_reload_only_indexes_changed_profiles_and_leaves_the_persisted_index(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert_many([profile(f"Company {i}", "Ghana" if i % 2 else "Kenya") for i in range(20)])
+    index_path = tmp_path / "index" / "knowledge_index.json"
+    knowledge = KnowledgeBase(store, index_path=str(index_path))
+    knowledge.load()
+    persisted_at = index_path.stat().st_mtime_ns
+
+    time.sleep(0.01)
+    store.upsert(profile("Company 3", "Egypt"))
+    store.upsert(profile("Zeta Foods", "Kenya"))
+    assert knowledge.reload() is True
+    assert index_path.stat().st_mtime_ns == persisted_at
+
+    # The same index as a full build of the new profiles
+    reloaded = knowledge.snapshot.index
+    rebuilt = KnowledgeIndex().build(knowledge.snapshot.companies)
+    assert reloaded.doc_lengths == rebuilt.doc_lengths
+    assert {term: sorted(p) for term, p in reloaded.postings.items()} == \
+        {term: sorted(p) for term, p in rebuilt.postings.items()}
+    assert reloaded.search("Egypt", top_k=1)[0]["company_name"] == "Company 3"
+
+
+def test_reload_async_runs_off_the_event_loop(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    knowledge = KnowledgeBase(store)
+    knowledge.load()
+    store.upsert(profile("Delta"))
+
+    assert asyncio.run(knowledge.reload_async()) is True
+    assert knowledge.snapshot.to_dict()["companies"] == 1
+
+
+def test_context_blocks_are_rendered_once_and_reused_across_reloads(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert_many([profile("Alpha"), profile("Beta")])
+    rendered = []
+
+    def render(company):
+        rendered.append(company["company_name"])
+        return f"[{company['company_name']} {company['countries'][0]}]"
+
+    knowledge = KnowledgeBase(store, render_context=render)
+    first = knowledge.load()
+    assert sorted(rendered) == ["Alpha", "Beta"]
+    assert first.context_block(first.profiles_by_key["beta"]) == "[Beta Kenya]"
+
+    store.upsert(profile("Alpha", "Egypt"))
+    knowledge.reload()
+    second = knowledge.snapshot
+    # Only the changed profile is re-rendered
+    assert sorted(rendered) == ["Alpha", "Alpha", "Beta"]
+    assert second.context_blocks["alpha"] == "[Alpha Egypt]"
+    assert second.context_blocks["beta"] is first.context_blocks["beta"]
+    assert [c["company_name"] for c in second.ordered([profile("Beta"), profile("Alpha")])] == ["Alpha", "Beta"]
+
+
+def test_concurrent_first_loads_share_one_store_read(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert_many([profile("Alpha"), profile("Beta")])
+    reads = []
+    original_all = store.all
+
+    def slow_all():
+        reads.append(1)
+        time.sleep(0.05)
+        return original_all()
+
+    store.all = slow_all
+    knowledge = KnowledgeBase(store)
+    assert not knowledge.loaded
+
+    async def load_concurrently():
+        return await asyncio.gather(*(knowledge.ensure_loaded_async() for _ in range(5)))
+
+    snapshots = asyncio.run(load_concurrently())
+    assert knowledge.loaded
+    assert len(reads) == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+
+def test_snapshot_file_is_shared_by_other_knowledge_bases(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert_many([profile("Alpha"), profile("Beta", "Ghana")])
+    render = lambda company: f"[{company['company_name']}]"  # noqa: E731
+    snapshot_path = str(tmp_path / "knowledge_snapshot.bin")
+    KnowledgeBase(store, render_context=render).save_snapshot_file(snapshot_path)
+
+    class NoReads:
+        def all(self):
+            raise AssertionError("the snapshot file should replace the full store read")
+
+        def version(self):
+            return store.version()
+
+    worker = KnowledgeBase(NoReads(), render_context=render, snapshot_path=snapshot_path)
+    snapshot = worker.ensure_loaded()
+    assert [c["company_name"] for c in snapshot.companies] == ["Alpha", "Beta"]
+    assert snapshot.context_block(snapshot.companies[1]) == "[Beta]"
+    assert snapshot.index.search("Ghana", top_k=1)[0]["company_name"] == "Beta"
+    assert snapshot.store_version == store.version()
+    assert worker.reload() is False
+
+    # Incremental reload continues from the store version recorded in the file
+    store.upsert(profile("Gamma"))
+    hot = KnowledgeBase(store, render_context=render, snapshot_path=snapshot_path)
+    hot.ensure_loaded()
+    assert hot.reload() is True
+    assert len(hot.snapshot.companies) == 3
+
+
+def test_unusable_snapshot_file_falls_back_to_the_store(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert(profile("Alpha"))
+    snapshot_path = tmp_path / "knowledge_snapshot.bin"
+    snapshot_path.write_bytes(b"not a snapshot")
+
+    knowledge = KnowledgeBase(store, snapshot_path=str(snapshot_path))
+    assert [c["company_name"] for c in knowledge.ensure_loaded().companies] == ["Alpha"]
+    assert KnowledgeBase(store, snapshot_path=str(tmp_path / "missing.bin")).ensure_loaded().companies
@@ -0,0 +1,112 @@
+"""
+Tests for the on-disk page cache.
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import AsyncFetcher
+from page_cache import PageCache, normalize_url
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        ETagHandler.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b"<html><body>Version one</body></html>"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def etag_server():
+    ETagHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_normalize_url_drops_tracking_and_fragment():
+    assert normalize_url("HTTPS://Sylndr.com:443/en/?utm_source=x&b=2&a=1#top") == "https://sylndr.com/en?a=1&b=2"
+    assert normalize_url("https://sylndr.com/?srsltid=abc") == normalize_url("https://sylndr.com")
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    clock = FakeClock()
+    cache = PageCache(cache_dir=str(tmp_path), ttl_seconds=60, clock=clock)
+    assert cache.lookup("https://a.com") is None
+
+    cache.store("https://a.com", "<html>a</html>", etag='"x"')
+    page = cache.lookup("https://a.com/?utm_campaign=1")
+    assert page.fresh and page.body == "<html>a</html>"
+
+    clock.now += 120
+    stale = cache.lookup("https://a.com")
+    assert not stale.fresh
+    assert stale.conditional_headers() == {"If-None-Match": '"x"'}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = PageCache(cache_dir=str(tmp_path))
+    cache.store("https://a.com", "same body")
+    cache.store("https://b.com", "same body")
+    assert cache.total_bytes() == len("same body")
+
+
+def test_lru_eviction_respects_size_cap(tmp_path):
+    clock = FakeClock()
+    cache = PageCache(cache_dir=str(tmp_path), max_bytes=25, clock=clock)
+    for name in ("a", "b", "c"):
+        clock.now += 1
+        cache.store(f"https://{name}.com", name * 10)
+    clock.now += 1
+    assert cache.lookup("https://b.com") is not None
+
+    clock.now += 1
+    cache.store("https://d.com", "d" * 10)
+    assert cache.total_bytes() <= 25
+    assert cache.lookup("https://b.com") is not None
+    assert cache.lookup("https://a.com") is None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_fetcher_revalidates_stale_entries(tmp_path, etag_server):
+    clock = FakeClock()
+    cache = PageCache(cache_dir=str(tmp_path), ttl_seconds=60, clock=clock)
+
+    async def fetch():
+        async with AsyncFetcher(cache=cache) as fetcher:
+            return await fetcher.fetch_html(f"{etag_server}/page")
+
+    assert "Version one" in asyncio.run(fetch())
+    assert "Version one" in asyncio.run(fetch())
+    assert ETagHandler.requests == [None]
+
+    clock.now += 120
+    assert "Version one" in asyncio.run(fetch())
+    assert ETagHandler.requests == [None, '"v1"']
+    assert cache.stats()["revalidated"] == 1
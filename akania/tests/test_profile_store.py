@@ -0,0 +1,93 @@
+"""
+Tests for the profile store backends.
+"""
+import os
+import time
+
+import pytest
+
+from company_profiles import CompanyInfo, KeyPeople, load_profiles, save_company_profile
+from profile_store import (
+    DATA_DIR,
+    JsonDirectoryProfileStore,
+    SQLiteProfileStore,
+    get_profile_store,
+    normalize_company_name,
+    open_profile_store,
+)
+
+
+def make_profile(name, countries, sectors):
+    return CompanyInfo(company_name=name, countries=countries, sector=sectors,
+                       key_people=[KeyPeople(name="Jane Doe", title="CEO")])
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    else:
+        backend = JsonDirectoryProfileStore(str(tmp_path / "json"))
+    yield backend
+    backend.close()
+
+
+def test_normalize_company_name():
+    assert normalize_company_name("  Société  Générale (SA) ") == "societe generale sa"
+
+
+def test_upsert_replaces_by_normalized_name(store):
+    store.upsert(make_profile("Moni-Shop", ["DRC"], ["Retail"]))
+    store.upsert(make_profile("moni shop", ["DRC", "Congo"], ["Retail"]))
+    assert store.count() == 1
+    assert store.get("MONI SHOP")["countries"] == ["DRC", "Congo"]
+
+
+def test_find_by_country_and_sector(store):
+    store.upsert_many([
+        make_profile("A", ["Kenya"], ["Agriculture"]),
+        make_profile("B", ["Kenya", "Uganda"], ["Fintech"]),
+        make_profile("C", ["Egypt"], ["Agriculture"]),
+    ])
+    assert [p["company_name"] for p in store.find(country="kenya")] == ["A", "B"]
+    assert [p["company_name"] for p in store.find(country="Kenya", sector="Agriculture")] == ["A"]
+    assert [p["company_name"] for p in store.find(sector="Agriculture", limit=1, offset=1)] == ["C"]
+
+
+def test_sqlite_keeps_names_that_collided_as_filenames(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert(make_profile("Acme (Kenya)", ["Kenya"], []))
+    store.upsert(make_profile("Acme Kenya Ltd", ["Kenya"], []))
+    assert store.count() == 2
+
+
+def test_import_and_export_round_trip(tmp_path):
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    imported = store.import_json_dir(DATA_DIR)
+    assert imported == len([f for f in os.listdir(DATA_DIR) if f.endswith(".json")])
+
+    exported = store.export_json_dir(str(tmp_path / "export"))
+    assert exported == imported
+    assert open_profile_store(f"json:///{tmp_path / 'export'}").count() == imported
+
+
+def test_save_company_profile_uses_shared_store():
+    assert get_profile_store().count() > 0  # seeded from data/
+    save_company_profile(make_profile("Brand New Co", ["Ghana"], ["Energy"]))
+    assert any(p["company_name"] == "Brand New Co" for p in load_profiles())
+
+
+def test_sqlite_store_imports_json_files_written_after_its_first_import(tmp_path):
+    data_dir = tmp_path / "data"
+    json_store = JsonDirectoryProfileStore(str(data_dir))
+    json_store.upsert(make_profile("A", ["Kenya"], []))
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    assert store.import_json_updates(str(data_dir)) == 1
+    assert store.import_json_updates(str(data_dir)) == 0
+
+    json_store.upsert(make_profile("B", ["Egypt"], []))
+    os.utime(data_dir / "B.json", (time.time() + 1, time.time() + 1))
+    store.upsert(make_profile("A", ["Kenya", "Uganda"], []))  # Newer than its file: kept
+    assert store.import_json_updates(str(data_dir)) == 1
+    assert store.get("B")["countries"] == ["Egypt"] and store.get("A")["countries"] == ["Kenya", "Uganda"]
+    store.close()
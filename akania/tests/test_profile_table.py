@@ -0,0 +1,59 @@
+"""
+Tests for the columnar profile table and its facet indexes.
+"""
+from profile_table import ProfileTable, intersect_sorted
+
+
+def profile(name, countries, sector):
+    return {"company_name": name, "countries": countries, "sector": sector, "key_people": []}
+
+
+def make_table():
+    return ProfileTable([
+        profile("Alpha", ["Kenya", "Uganda"], ["Fintech"]),
+        profile("Beta", ["kenya"], ["Agriculture", "Fintech"]),
+        profile("Gamma", ["Ghana"], "Agriculture"),
+        profile("Delta", ["Kenya", "Uganda"], ["Fintech"]),
+    ])
+
+
+def test_facet_filters_match_case_insensitively_and_intersect():
+    table = make_table()
+    assert list(table.select(country="KENYA")) == [0, 1, 3]
+    assert list(table.select(country="Kenya", sector="agriculture")) == [1]
+    assert list(table.select(sector="Agriculture")) == [1, 2]  # A plain string sector counts too
+    assert list(table.select(country="Mali")) == []
+    assert list(table.select()) == [0, 1, 2, 3]
+
+
+def test_pages_and_labels():
+    table = make_table()
+    total, page = table.page(country="Kenya", offset=1, limit=1)
+    assert total == 3
+    assert page == [{"company_name": "Beta", "countries": ["Kenya"], "sector": ["Agriculture", "Fintech"]}]
+    assert table.facet_counts()["country"] == {"Kenya": 3, "Uganda": 2, "Ghana": 1}
+
+
+def test_identical_value_combinations_are_shared():
+    table = make_table()
+    column = table.columns["country"]
+    assert column.rows[0] is column.rows[3]
+    assert column.values[0] is column.values[column.rows[3][0]]
+
+
+def test_intersect_sorted():
+    assert intersect_sorted([2, 5, 9], [1, 2, 3, 5, 8]) == [2, 5]
+    assert intersect_sorted([10], [1, 2]) == []
+
+
+def test_large_intersections_use_bitmasks_with_the_same_results():
+    companies = [profile(f"C{i}", ["Kenya" if i % 2 else "Ghana"], ["Fintech" if i % 3 else "Retail"])
+                 for i in range(3000)]
+    table = ProfileTable(companies)
+
+    rows = table.select(country="Kenya", sector="Fintech")
+    expected = [i for i in range(3000) if i % 2 and i % 3]
+    assert type(rows).__name__ == "MaskRows"
+    assert len(rows) == len(expected)
+    assert list(rows) == expected
+    assert rows[10:15] == expected[10:15]
@@ -0,0 +1,87 @@
+"""
+Tests for the query router that answers structured chat questions without the LLM.
+"""
+from knowledge import KnowledgeSnapshot, profile_key
+from query_router import QueryRouter
+from retrieval import KnowledgeIndex
+
+
+def profile(name, countries, sector, key_people=()):
+    return {"company_name": name, "countries": countries, "sector": sector,
+            "key_people": [{"name": person, "title": title} for person, title in key_people]}
+
+
+def make_snapshot():
+    profiles = [
+        profile("Lapaire Glasses", ["Kenya", "Uganda"], ["Eyewear Retail"], [("Jérôme Lapaire", "Founder")]),
+        profile("Merec Industries", ["South Africa", "Mozambique"], ["Agriculture", "Manufacturing"],
+                [("Amir Abdellatif", "Chief Executive Officer")]),
+        profile("Moni-Shop", ["Congo"], ["Retail"], [("Toussaint Ndombasi", "Owner")]),
+        profile("Shamba", ["Kenya"], ["Agriculture"], [("A. Otieno", "Co-Founder & CEO"), ("B. Wanjiru", "Co-founder")]),
+    ]
+    return KnowledgeSnapshot(1, {profile_key(p): p for p in profiles}, KnowledgeIndex())
+
+
+def route(question, router=None):
+    routed = (router or QueryRouter()).route(question, make_snapshot())
+    return (routed.intent, routed.answer) if routed else None
+
+
+def test_list_and_count_questions_use_the_facet_indexes():
+    assert route("Which companies operate in Mozambique?") == \
+        ("list", "Companies operating in Mozambique in my knowledge base (1):\n- Merec Industries")
+    assert route("list agriculture companies in kenya") == \
+        ("list", "Agriculture companies operating in Kenya in my knowledge base (1):\n- Shamba")
+    assert route("How many companies are in the agriculture sector?") == \
+        ("count", "I have 2 Agriculture companies in my knowledge base: Merec Industries and Shamba.")
+    assert route("How many retail companies operate in Kenya?") == \
+        ("count", "I don't have any Retail companies operating in Kenya in my knowledge base.")
+
+
+def test_long_lists_are_truncated():
+    intent, answer = route("What companies are in the database?", QueryRouter(max_listed=2))
+    assert intent == "list"
+    assert answer.splitlines() == ["Companies in my knowledge base (4):", "- Lapaire Glasses", "- Merec Industries",
+                                   "...and 2 more."]
+
+
+def test_lookups_on_one_company():
+    assert route("Who is the founder of Lapaire Glasses?") == \
+        ("people", "The founder of Lapaire Glasses is Jérôme Lapaire (Founder).")
+    assert route("who is the CEO of merec industries") == \
+        ("people", "The CEO of Merec Industries is Amir Abdellatif (Chief Executive Officer).")
+    assert route("Who are the co-founders of Shamba?") == \
+        ("people", "The founders of Shamba are A. Otieno (Co-Founder & CEO) and B. Wanjiru (Co-founder).")
+    assert route("Who is the CEO of Moni Shop?") == \
+        ("people", "The profile of Moni-Shop doesn't name a CEO. Key people on record: Toussaint Ndombasi (Owner).")
+    assert route("Who are the key people at Moni-Shop?") == \
+        ("people", "Key people at Moni-Shop: Toussaint Ndombasi (Owner).")
+    assert route("Where does Moni-Shop operate?") == ("countries", "Moni-Shop operates in Congo.")
+    assert route("What sector is Merec Industries in?") == \
+        ("sector", "Merec Industries is in the Agriculture and Manufacturing sectors.")
+
+
+def test_open_ended_and_ambiguous_questions_fall_through():
+    for question in [
+        "Tell me about Shamba",
+        "Who is its CEO?",
+        "Which companies in Kenya raised money?",
+        "Which companies operate in Nigeria?",  # Unknown country: the LLM says so
+        "Which companies operate in Kenya and Uganda?",
+        "Which companies compete with Shamba?",
+        "How many employees does Shamba have?",
+        "Who founded Shamba and where does it operate?",
+        "Who is Shamba?",  # Asks what the company is, not who works there
+        "Who are Merec Industries?",
+        "",
+    ]:
+        assert route(question) is None, question
+
+
+def test_phrase_index_is_built_once_per_snapshot():
+    router, snapshot = QueryRouter(), make_snapshot()
+    router.route("Where does Shamba operate?", snapshot)
+    index = router.phrase_index(snapshot)
+    router.route("Which companies operate in Kenya?", snapshot)
+    assert router.phrase_index(snapshot) is index
+    assert router.has_index(snapshot) and not router.has_index(make_snapshot())
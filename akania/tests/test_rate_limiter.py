@@ -0,0 +1,152 @@
+"""
+Tests for the shared rate limiter, driven by a fake clock.
+"""
+import threading
+
+import pytest
+
+from rate_limiter import BudgetExceeded, RateLimiter
+
+
+class FakeClock:
+    """Monotonic and wall clock in one; sleeping advances time instantly"""
+
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(clock, **options):
+    return RateLimiter(clock=clock, sleep=clock.sleep, wall_clock=clock, **options)
+
+
+class ThrottledError(Exception):
+    status_code = 429
+
+
+def test_bucket_allows_burst_then_paces_at_rate():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"tavily": 2.0}, burst=3)
+
+    for _ in range(3):
+        limiter.acquire("provider:tavily")
+    assert clock.slept == []
+
+    limiter.acquire("provider:tavily")
+    limiter.acquire("provider:tavily")
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+
+def test_hosts_and_providers_have_separate_buckets():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"openai": 10.0}, host_rate=1.0, burst=1)
+
+    limiter.acquire("host:sylndr.com")
+    limiter.acquire("host:lapaire.com")
+    limiter.acquire("provider:openai")
+    assert clock.slept == []
+
+    limiter.acquire("host:sylndr.com")
+    limiter.acquire("provider:openai")
+    # openai refilled while the host bucket waited
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_throttling_backs_off_and_recovers():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"openai": 4.0}, burst=10, backoff=1.0)
+
+    limiter.report("provider:openai", 429)
+    limiter.report("provider:openai", 503)
+    stats = limiter.stats()["keys"]["provider:openai"]
+    assert stats["rate"] == pytest.approx(1.0)
+    assert stats["throttled"] == 2
+
+    # Second failure doubles the backoff: blocked for 2 seconds
+    limiter.acquire("provider:openai")
+    assert sum(clock.slept) == pytest.approx(2.0)
+
+    for _ in range(3):
+        limiter.report("provider:openai", 200)
+    assert limiter.stats()["keys"]["provider:openai"]["rate"] == pytest.approx(2.2)
+    for _ in range(20):
+        limiter.report("provider:openai", 200)
+    assert limiter.stats()["keys"]["provider:openai"]["rate"] == pytest.approx(4.0)
+
+
+def test_retry_after_overrides_backoff():
+    clock = FakeClock()
+    limiter = make_limiter(clock, host_rate=5.0, backoff=1.0)
+
+    limiter.report("host:sylndr.com", 429, retry_after=7.5)
+    limiter.acquire("host:sylndr.com")
+    assert sum(clock.slept) == pytest.approx(7.5)
+
+
+def test_call_reports_failures_from_exception_status():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"tavily": 2.0})
+
+    def throttled():
+        raise ThrottledError("slow down")
+
+    with pytest.raises(ThrottledError):
+        limiter.call("tavily", throttled)
+    assert limiter.stats()["keys"]["provider:tavily"]["throttled"] == 1
+    assert limiter.call("tavily", lambda x: x * 2, 21) == 42
+
+
+def test_daily_budget_caps_spend_and_resets_next_day():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"openai": 100.0},
+                           daily_budgets={"openai": {"tokens": 1000}, "tavily": {"requests": 2}})
+
+    limiter.call("openai", lambda: "ok", tokens=600)
+    limiter.call("openai", lambda: "ok", tokens=600)
+    with pytest.raises(BudgetExceeded):
+        limiter.call("openai", lambda: "ok", tokens=10)
+
+    limiter.call("tavily", lambda: "ok")
+    limiter.call("tavily", lambda: "ok")
+    with pytest.raises(BudgetExceeded):
+        limiter.call("tavily", lambda: "ok")
+    assert limiter.stats()["spend_today"]["openai"] == {"requests": 2, "tokens": 1200}
+
+    clock.now += 24 * 3600
+    assert limiter.call("openai", lambda: "ok", tokens=10) == "ok"
+
+
+def test_budget_reservations_stop_concurrent_overshoot_and_settle_on_usage():
+    clock = FakeClock()
+    limiter = make_limiter(clock, provider_rates={"openai": 100.0}, daily_budgets={"openai": {"tokens": 1000}})
+    started, release = threading.Event(), threading.Event()
+
+    def slow_call():
+        started.set()
+        release.wait(5)
+        return "a reply of 200 tokens"
+
+    first = threading.Thread(target=lambda: limiter.call("openai", slow_call, tokens=1000, usage=lambda reply: 700))
+    first.start()
+    started.wait(5)
+    # The running call's reservation already spends the budget
+    with pytest.raises(BudgetExceeded):
+        limiter.call("openai", lambda: "ok", tokens=10)
+    release.set()
+    first.join(5)
+    assert limiter.stats()["spend_today"]["openai"] == {"requests": 1, "tokens": 700}
+
+    def broken():
+        raise RuntimeError("timeout")
+
+    # A failed call keeps its reservation
+    with pytest.raises(RuntimeError):
+        limiter.call("openai", broken, tokens=200, usage=lambda reply: 0)
+    assert limiter.stats()["spend_today"]["openai"] == {"requests": 2, "tokens": 900}
@@ -0,0 +1,65 @@
+"""
+Unit tests for the knowledge base retrieval index.
+"""
+from retrieval import KnowledgeIndex
+
+PROFILES = [
+    {
+        "company_name": "Sylndr",
+        "countries": ["Egypt"],
+        "sector": ["Automotive", "E-commerce"],
+        "business_description": "Used car marketplace to buy, sell and finance cars.",
+        "key_people": [{"name": "Omar El Defrawy", "title": "CEO"}],
+        "transactions": "Raised $15.7 million in Series A funding.",
+    },
+    {
+        "company_name": "Lapaire Glasses",
+        "countries": ["Kenya", "Ivory Coast"],
+        "sector": ["Eyewear", "Healthcare"],
+        "business_description": "Affordable prescription glasses across Africa.",
+        "key_people": [{"name": "Jonas Lapaire", "title": "Founder"}],
+        "transactions": None,
+    },
+    {
+        "company_name": "SanLei Premium Trout",
+        "countries": ["Lesotho"],
+        "sector": ["Aquaculture"],
+        "business_description": "Trout farming in the Katse dam.",
+        "key_people": [],
+        "transactions": None,
+    },
+]
+
+
+def test_search_ranks_matching_company_first():
+    index = KnowledgeIndex().build(PROFILES)
+    results = index.search("Who runs Sylndr?", top_k=2)
+    assert results[0]["company_name"] == "Sylndr"
+
+
+def test_search_matches_countries_and_people():
+    index = KnowledgeIndex().build(PROFILES)
+    assert index.search("trout farms in Lesotho", top_k=1)[0]["company_name"] == "SanLei Premium Trout"
+    assert index.search("Jonas", top_k=1)[0]["company_name"] == "Lapaire Glasses"
+
+
+def test_search_respects_top_k_and_no_match():
+    index = KnowledgeIndex().build(PROFILES)
+    assert len(index.search("Kenya Egypt Lesotho", top_k=2)) == 2
+    assert index.search("zzz unknown") == []
+
+
+def test_embedding_rerank_keeps_relevant_results():
+    index = KnowledgeIndex(use_embeddings=True).build(PROFILES)
+    assert index.search("eyewear glasses", top_k=1)[0]["company_name"] == "Lapaire Glasses"
+
+
+def test_load_or_build_reuses_persisted_index(tmp_path):
+    path = str(tmp_path / "index" / "knowledge_index.json")
+    built = KnowledgeIndex.load_or_build(PROFILES, path)
+    loaded = KnowledgeIndex.load_or_build(PROFILES, path)
+    assert loaded.fingerprint == built.fingerprint
+    assert loaded.search("Sylndr", top_k=1)[0]["company_name"] == "Sylndr"
+
+    changed = KnowledgeIndex.load_or_build(PROFILES[:1], path)
+    assert len(changed) == 1
@@ -0,0 +1,115 @@
+"""
+Tests for the concurrent scraper against a local HTTP stub server.
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import AsyncFetcher
+from scraper import pooled_fetcher, scrape_urls, scrape_urls_async, stream_urls
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    flaky_hits = 0
+
+    def do_GET(self):
+        if self.path == "/flaky" and StubHandler.flaky_hits == 0:
+            StubHandler.flaky_hits += 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+
+        body = f"<html lang='en'><head><title>Page {self.path}</title></head><body>Hello from {self.path}</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def stub_server():
+    StubHandler.flaky_hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_scrape_urls_keeps_order_and_drops_failures(stub_server):
+    docs = scrape_urls([f"{stub_server}/a", f"{stub_server}/missing", f"{stub_server}/b"])
+    assert [doc.metadata["source"] for doc in docs] == [f"{stub_server}/a", f"{stub_server}/b"]
+    assert "Hello from /a" in docs[0].page_content
+    assert docs[0].metadata["title"] == "Page /a"
+    assert docs[0].metadata["language"] == "en"
+
+
+def test_retries_transient_errors(stub_server):
+    docs = scrape_urls([f"{stub_server}/flaky"], backoff=0.01)
+    assert len(docs) == 1
+
+
+def test_timeout_gives_up(stub_server):
+    docs = scrape_urls([f"{stub_server}/slow"], timeout=0.05, retries=0)
+    assert docs == []
+
+
+def test_stream_yields_in_completion_order(stub_server):
+    async def collect():
+        return [doc.metadata["source"] async for doc in stream_urls([f"{stub_server}/slow", f"{stub_server}/fast"])]
+
+    assert asyncio.run(collect()) == [f"{stub_server}/fast", f"{stub_server}/slow"]
+
+
+def test_fetches_run_concurrently(stub_server):
+    urls = [f"{stub_server}/slow{i}" for i in range(4)]
+
+    async def fetch():
+        async with AsyncFetcher(per_host_limit=4) as fetcher:
+            return await fetcher.fetch_all(urls)
+
+    start = time.perf_counter()
+    docs = asyncio.run(fetch())
+    assert len(docs) == 4
+    assert time.perf_counter() - start < 1.0
+
+
+def test_scrapes_inside_a_pooled_fetcher_share_its_client_and_host_limits(stub_server, monkeypatch):
+    opened = []
+    enter = AsyncFetcher.__aenter__
+
+    async def counting_enter(self):
+        opened.append(self)
+        return await enter(self)
+
+    monkeypatch.setattr(AsyncFetcher, "__aenter__", counting_enter)
+
+    async def run():
+        async with pooled_fetcher(per_host_limit=1) as fetcher:
+            # Two companies scraped at once, as the batch pipeline's scrape workers do
+            first, second = await asyncio.gather(
+                asyncio.create_task(scrape_urls_async([f"{stub_server}/a"], main_content=True)),
+                asyncio.create_task(scrape_urls_async([f"{stub_server}/b"])),
+            )
+            streamed = [doc async for doc in stream_urls([f"{stub_server}/c"])]
+            return fetcher, first + second + streamed
+
+    fetcher, docs = asyncio.run(run())
+    assert opened == [fetcher]
+    assert list(fetcher._host_limits) == [stub_server.split("//")[1]]
+    # Each call still gets its own main_content setting
+    assert [doc.page_content.strip() for doc in docs] == ["Hello from /a", "Page /bHello from /b", "Page /cHello from /c"]
+    # Outside the block every call opens its own fetcher again
+    assert len(scrape_urls([f"{stub_server}/a"])) == 1 and len(opened) == 2
@@ -0,0 +1,83 @@
+"""
+Tests for the search result cache using a fake search engine.
+"""
+import threading
+import time
+
+import pytest
+
+from search_cache import SearchCache, normalize_query
+from website_discovery import WebsiteDiscoveryService
+
+
+class FakeTavily:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def invoke(self, payload):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"results": [{"url": f"https://example.com/{i}"} for i in range(5)]}
+
+
+def test_normalize_query():
+    assert normalize_query("  Sylndr   (Egypt)? ") == "sylndr (egypt)"
+
+
+def test_repeated_query_is_served_from_cache():
+    cache = SearchCache()
+    calls = []
+    for query in ("Sylndr (Egypt)", "sylndr  (egypt)"):
+        cache.get_or_search("tavily", query, 3, lambda: calls.append(1) or ["https://sylndr.com"])
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+    cache.get_or_search("tavily", "Sylndr (Egypt)", 5, lambda: calls.append(1) or ["https://sylndr.com"])
+    cache.get_or_search("serpapi", "Sylndr (Egypt)", 3, lambda: calls.append(1) or ["https://sylndr.com"])
+    assert len(calls) == 3
+
+
+def test_ttl_and_sqlite_persistence(tmp_path):
+    now = [0.0]
+    db_path = str(tmp_path / "search.sqlite")
+    cache = SearchCache(ttl_seconds=10, db_path=db_path, clock=lambda: now[0])
+    cache.get_or_search("tavily", "q", 3, lambda: ["a"])
+
+    reloaded = SearchCache(ttl_seconds=10, db_path=db_path, clock=lambda: now[0])
+    assert reloaded.get_or_search("tavily", "q", 3, lambda: pytest.fail("should be cached")) == ["a"]
+
+    now[0] = 20.0
+    assert reloaded.get_or_search("tavily", "q", 3, lambda: ["b"]) == ["b"]
+
+
+def test_empty_results_and_errors_are_not_cached():
+    cache = SearchCache()
+    assert cache.get_or_search("tavily", "q", 3, lambda: []) == []
+    with pytest.raises(RuntimeError):
+        cache.get_or_search("tavily", "q", 3, lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert cache.get_or_search("tavily", "q", 3, lambda: ["a"]) == ["a"]
+
+
+def test_concurrent_identical_lookups_share_one_call():
+    engine = FakeTavily(delay=0.2)
+    service = WebsiteDiscoveryService(search_cache=SearchCache())
+    service.tavily_search = engine
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.search_with_tavily("Sylndr (Egypt)", 3)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert engine.calls == 1
+    assert all(urls == results[0] for urls in results) and len(results) == 5
+    stats = service.search_cache.stats()
+    assert stats["saved_calls"] == 4
+    assert stats["hit_ratio"] == 0.8
@@ -0,0 +1,79 @@
+"""
+Tests for spans, per-run histograms and the Prometheus exposition.
+"""
+import asyncio
+import json
+
+import pytest
+
+from telemetry import MetricsRegistry, configure_trace_log, span, trace_run
+
+
+def test_spans_nest_and_feed_the_run_histograms():
+    with trace_run("batch") as run:
+        with span("search", engine="tavily") as outer:
+            with span("fetch", bytes=100) as inner:
+                pass
+        with span("fetch", bytes=50):
+            pass
+        with pytest.raises(ValueError):
+            with span("llm", tokens_in=10):
+                raise ValueError("boom")
+
+    assert inner.parent_id == outer.span_id
+    assert inner.trace_id == outer.trace_id == run.trace_id
+    summary = run.summary()
+    assert summary["fetch"]["count"] == 2
+    assert summary["fetch"]["bytes"] == 150
+    assert summary["llm"]["errors"] == 1
+    assert summary["search"]["p95_ms"] >= summary["search"]["p50_ms"] >= 0
+
+
+def test_async_tasks_inherit_the_current_span():
+    async def child():
+        with span("fetch") as inner:
+            return inner
+
+    async def main():
+        with span("scrape") as outer:
+            inner = await asyncio.create_task(child())
+        return outer, inner
+
+    outer, inner = asyncio.run(main())
+    assert inner.parent_id == outer.span_id
+
+
+def test_finished_spans_are_logged_as_json(tmp_path):
+    log_path = tmp_path / "traces.jsonl"
+    configure_trace_log(str(log_path))
+    try:
+        with span("save", company="Sylndr"):
+            pass
+    finally:
+        configure_trace_log("off")
+
+    line = json.loads(log_path.read_text().strip())
+    assert line["event"] == "span"
+    assert line["name"] == "save"
+    assert line["company"] == "Sylndr"
+    assert line["duration_ms"] >= 0
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.inc("requests_total", endpoint="chat")
+    registry.inc("requests_total", 2, endpoint="chat")
+    registry.set("knowledge_companies", 42)
+    registry.observe("latency_seconds", 0.2, buckets=(0.1, 0.5, 1.0))
+    registry.observe("latency_seconds", 0.7, buckets=(0.1, 0.5, 1.0))
+
+    text = registry.render_prometheus()
+    assert "# TYPE akania_requests_total counter" in text
+    assert 'akania_requests_total{endpoint="chat"} 3' in text
+    assert "akania_knowledge_companies 42" in text
+    assert 'akania_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'akania_latency_seconds_bucket{le="0.5"} 1' in text
+    assert 'akania_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "akania_latency_seconds_count 2" in text
+    with pytest.raises(ValueError):
+        registry.set("requests_total", 1)
@@ -0,0 +1,107 @@
+"""
+Tests for concurrent multi-engine website discovery using fake engines.
+"""
+import time
+
+import pytest
+
+from search_cache import SearchCache
+from website_discovery import WebsiteDiscoveryService
+
+
+def fake_engine(urls, delay=0.0, error=None):
+    def search(company_query, max_results):
+        time.sleep(delay)
+        if error:
+            raise error
+        return urls[:max_results]
+    return search
+
+
+@pytest.fixture()
+def service():
+    discovery = WebsiteDiscoveryService(search_cache=SearchCache())
+    discovery.engines = {}
+    return discovery
+
+
+def test_serpapi_results_are_parsed(service):
+    response = {
+        "knowledge_graph": {"website": "https://sylndr.com/"},
+        "organic_results": [{"link": "https://sylndr.com/en"}, {"title": "no link"}, {"link": "https://techcrunch.com/sylndr"}],
+    }
+    assert service.extract_urls_from_serpapi(response) == [
+        "https://sylndr.com/", "https://sylndr.com/en", "https://techcrunch.com/sylndr",
+    ]
+
+
+def test_filter_relevant_urls_prefers_company_domain(service):
+    urls = [
+        "https://www.linkedin.com/company/lapaire",
+        "https://news.example.com/article",
+        "https://lapaire.org/about",
+    ]
+    assert service.filter_relevant_urls(urls, "Lapaire Glasses (Kenya)") == [
+        "https://lapaire.org/about",
+        "https://www.linkedin.com/company/lapaire",
+        "https://news.example.com/article",
+    ]
+
+
+def test_url_relevance_matches_whole_host_labels(service):
+    assert service.url_relevance("https://www.lapaire-glasses.com/", "Lapaire Glasses (Kenya)") == 3
+    assert service.url_relevance("https://shop.lapaire.org/", "Lapaire Glasses (Kenya)") == 3
+    assert service.url_relevance("https://lapaireglasses.co.ke/", "Lapaire Glasses (Kenya)") == 2
+    assert service.url_relevance("https://sylndrcars.com/", "Sylndr") == 2
+    # A name word inside another word of the host is not the company's domain
+    assert service.url_relevance("https://www.sunglasseshut.com/", "Lapaire Glasses (Kenya)") == 0
+    assert service.url_relevance("https://www.sunglasseshut.com/lapaire", "Lapaire Glasses (Kenya)") == 1
+
+
+def test_merge_mode_combines_engines_and_dedupes(service):
+    service.register_engine("a", fake_engine(["https://news.example.com/x", "https://sylndr.com/?utm_source=a"]))
+    service.register_engine("b", fake_engine(["https://sylndr.com/", "https://other.example.com"]))
+    urls = service.discover_company_websites("Sylndr (Egypt)", max_urls=3)
+    assert urls[0].startswith("https://sylndr.com")
+    assert len(urls) == 3
+
+
+def test_failures_and_deadlines_do_not_block(service):
+    service.register_engine("broken", fake_engine([], error=RuntimeError("boom")))
+    service.register_engine("slow", fake_engine(["https://slow.example.com"], delay=1.0))
+    service.register_engine("fast", fake_engine(["https://sylndr.com"]))
+
+    start = time.perf_counter()
+    urls = service.discover_company_websites("Sylndr", engine_deadlines={"slow": 0.1})
+    assert time.perf_counter() - start < 0.5
+    assert urls == ["https://sylndr.com"]
+    engines = service.last_discovery["engines"]
+    assert engines["broken"]["status"] == "error"
+    assert engines["slow"]["status"] == "deadline"
+
+
+def test_built_in_engine_errors_are_reported_and_not_cached(service):
+    class DownTavily:
+        calls = 0
+
+        def invoke(self, payload):
+            DownTavily.calls += 1
+            raise RuntimeError("tavily down")
+
+    service.tavily_search = DownTavily()
+    service.register_engine("tavily", service.search_with_tavily)
+    assert service.discover_company_websites("Sylndr") == []
+    assert service.last_discovery["engines"]["tavily"]["status"] == "error"
+    service.discover_company_websites("Sylndr")
+    assert DownTavily.calls == 2
+
+
+def test_race_mode_returns_once_enough_relevant_urls(service):
+    service.register_engine("fast", fake_engine(["https://sylndr.com", "https://sylndr.com/en"]))
+    service.register_engine("slow", fake_engine(["https://blog.sylndr.com"], delay=1.0))
+
+    start = time.perf_counter()
+    urls = service.discover_company_websites("Sylndr", max_urls=2, mode="race")
+    assert time.perf_counter() - start < 0.5
+    assert urls == ["https://sylndr.com", "https://sylndr.com/en"]
+    assert service.last_discovery["engines"]["slow"]["status"] == "cancelled"
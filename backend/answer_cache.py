@@ -0,0 +1,160 @@
+"""
+Answer cache for repeated chat questions.
+
+Answers are keyed on the normalized question (lowercase word tokens without
+stopwords, so "What does Sylndr do?" and "Tell me about Sylndr" share an
+entry) within one knowledge-base generation; a reload that produces a new
+generation drops every cached answer. With a similarity threshold set, a miss
+falls back to the closest cached question by local hashed embedding.
+
+Questions that lean on the conversation ("what about its founders?") bypass
+the cache, because the same words mean something different in each chat.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from retrieval import HashingEmbedder, cosine, tokenize
+
+# Words that point back into the conversation
+FOLLOW_UP_WORDS = {
+    "it", "its", "they", "them", "their", "theirs", "he", "him", "his", "she", "her", "hers",
+    "this", "that", "these", "those", "same", "more", "also", "else", "other", "others",
+    "another", "previous", "above", "former", "latter",
+}
+FOLLOW_UP_OPENINGS = ("and ", "what about", "how about", "why")
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_question(question: str) -> str:
+    """Cache key text for a question"""
+    return " ".join(tokenize(question))
+
+
+def depends_on_history(question: str, chat_history: Optional[List[Dict]]) -> bool:
+    """True when the question only makes sense together with earlier exchanges"""
+    if not chat_history:
+        return False
+    lowered = question.lower().strip()
+    if lowered.startswith(FOLLOW_UP_OPENINGS):
+        return True
+    return any(word in FOLLOW_UP_WORDS for word in WORD_PATTERN.findall(lowered))
+
+
+class CachedAnswer:
+    def __init__(self, question: str, answer: str, latency_seconds: float, created: float,
+                 vector: Optional[List[float]] = None):
+        self.question = question
+        self.answer = answer
+        self.latency_seconds = latency_seconds
+        self.created = created
+        self.vector = vector
+        self.hits = 0
+
+
+class AnswerCache:
+    """LRU of answers per knowledge generation with TTL and optional similarity matching"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.0,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.embedder = HashingEmbedder() if similarity_threshold > 0 else None
+        self.generation = None
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def _check_generation(self, generation):
+        """Drop everything cached for an older knowledge generation (lock held)"""
+        if generation != self.generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.generation = generation
+
+    def _fresh(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry.created > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _most_similar(self, key: str) -> Optional[CachedAnswer]:
+        vector = self.embedder.embed(key)
+        best, best_score = None, self.similarity_threshold
+        for candidate_key in list(self._entries):
+            candidate = self._fresh(candidate_key)
+            if candidate is None or candidate.vector is None:
+                continue
+            score = cosine(vector, candidate.vector)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def lookup(self, question: str, generation) -> Optional[CachedAnswer]:
+        """Cached answer for the question in this generation, or None (counted as a miss)"""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._fresh(key) if key else None
+            if entry is None and key and self.embedder is not None:
+                entry = self._most_similar(key)
+                if entry is not None:
+                    self.similar_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(normalize_question(entry.question))
+            entry.hits += 1
+            self.hits += 1
+            self.saved_seconds += entry.latency_seconds
+            return entry
+
+    def store(self, question: str, generation, answer: str, latency_seconds: float):
+        key = normalize_question(question)
+        if not key:
+            return
+        vector = self.embedder.embed(key) if self.embedder is not None else None
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = CachedAnswer(question, answer, latency_seconds, self.clock(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "generation": self.generation,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,182 @@
+"""
+Server-side chat history, keyed by session id.
+
+The session cookie only carries a random session id; the exchanges themselves
+live here. Two backends share one interface:
+
+- MemoryConversationStore: in-process LRU with an idle TTL (default)
+- SQLiteConversationStore: survives restarts and can be shared by the workers
+  of one host
+
+Select one with CONVERSATION_STORE_URL ("memory://" or "sqlite:///path").
+"""
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+class ConversationStore(abc.ABC):
+    """Per-session list of chat exchanges, oldest first"""
+
+    @abc.abstractmethod
+    def get(self, session_id: str) -> List[Dict]:
+        """The session's exchanges (empty for an unknown or expired session)"""
+
+    @abc.abstractmethod
+    def append(self, session_id: str, item: Dict, max_items: int = 20) -> List[Dict]:
+        """Add an exchange, keep the newest `max_items`, and return the history"""
+
+    @abc.abstractmethod
+    def clear(self, session_id: str):
+        """Forget the session's exchanges"""
+
+    @abc.abstractmethod
+    def stats(self) -> Dict:
+        """Backend name and number of stored sessions"""
+
+
+class MemoryConversationStore(ConversationStore):
+    """In-process LRU of conversations; sessions idle longer than the TTL expire"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 86400.0,
+                 clock: Callable[[], float] = time.time):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (last_used, items)
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _live(self, session_id: str) -> Optional[List[Dict]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        last_used, items = entry
+        if self.clock() - last_used > self.ttl_seconds:
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        return items
+
+    def get(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            items = self._live(session_id)
+            if items is None:
+                return []
+            self._sessions[session_id] = (self.clock(), items)
+            self._sessions.move_to_end(session_id)
+            return list(items)
+
+    def append(self, session_id: str, item: Dict, max_items: int = 20) -> List[Dict]:
+        with self._lock:
+            items = (self._live(session_id) or []) + [item]
+            items = items[-max_items:]
+            self._sessions[session_id] = (self.clock(), items)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return list(items)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversations in SQLite; idle sessions are purged after the TTL, at most once per purge interval"""
+
+    def __init__(self, db_path: str, ttl_seconds: float = 86400.0, clock: Callable[[], float] = time.time,
+                 purge_interval: float = 60.0):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_id TEXT PRIMARY KEY,
+                items TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS conversations_by_age ON conversations (updated_at);
+        """)
+        self._db.commit()
+
+    def _live(self, session_id: str) -> Optional[List[Dict]]:
+        row = self._db.execute(
+            "SELECT items, updated_at FROM conversations WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or self.clock() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def get(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            return self._live(session_id) or []
+
+    def append(self, session_id: str, item: Dict, max_items: int = 20) -> List[Dict]:
+        with self._lock:
+            items = ((self._live(session_id) or []) + [item])[-max_items:]
+            now = self.clock()
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (session_id, items, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(items, ensure_ascii=False), now),
+            )
+            if now - self._purged_at >= self.purge_interval:
+                # Expired sessions are never read (see _live), so purging them can wait
+                self._db.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl_seconds,))
+                self._purged_at = now
+            self._db.commit()
+            return items
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessions = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return {"backend": "sqlite", "sessions": sessions}
+
+    def close(self):
+        self._db.close()
+
+
+def open_conversation_store(store_url: str, ttl_seconds: float = 86400.0,
+                            max_sessions: int = 10000) -> ConversationStore:
+    """
+    Open a store from a URL
+
+    Args:
+        store_url: "memory://" or "sqlite:///path/to/conversations.sqlite"
+
+    Returns:
+        The matching ConversationStore backend
+    """
+    if store_url in ("", "memory://"):
+        return MemoryConversationStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    if store_url.startswith("sqlite:///"):
+        return SQLiteConversationStore(store_url[len("sqlite:///"):], ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unsupported conversation store URL: {store_url}")
@@ -0,0 +1,249 @@
+"""
+In-memory knowledge base with incremental hot reload.
+
+The chat endpoint reads an immutable KnowledgeSnapshot (profiles plus the
+retrieval index built from them). A background task polls the profile store,
+loads only the profiles written since the last reload, builds the new snapshot
+off the event loop and swaps it in with a single assignment, so in-flight
+requests keep using the snapshot they started with.
+
+Each snapshot also carries the prompt context block rendered for every
+profile, so requests never re-format profiles; blocks of profiles that did not
+change are carried over from the previous generation.
+
+The first load can run in the background (ensure_loaded_async) so the server
+accepts connections before the knowledge base is ready; concurrent callers
+share that one load. With a snapshot_path (multi-worker production mode) the
+first load maps the snapshot file written once by the supervisor instead of
+reading the store and rebuilding the index; hot reload then continues
+incrementally from the store version recorded in the file.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from profile_store import normalize_company_name
+from profile_table import ProfileTable
+from retrieval import KnowledgeIndex
+from snapshot_file import read_snapshot_file, write_snapshot_file
+
+# Re-read profiles written this many seconds before the last seen write, so a
+# write committed slightly out of timestamp order is not missed
+RELOAD_SAFETY_WINDOW = 2.0
+
+
+def profile_key(company: Dict) -> str:
+    return normalize_company_name(company.get("company_name") or "")
+
+
+class KnowledgeSnapshot:
+    """Immutable view of the knowledge base for one reload generation"""
+
+    def __init__(self, generation: int, profiles_by_key: Dict[str, Dict], index: KnowledgeIndex,
+                 store_version: tuple = (), load_seconds: float = 0.0, changed: int = 0,
+                 context_blocks: Optional[Dict[str, str]] = None,
+                 render_context: Optional[Callable[[Dict], str]] = None):
+        self.generation = generation
+        self.profiles_by_key = profiles_by_key
+        self.companies: List[Dict] = [profiles_by_key[key] for key in sorted(profiles_by_key)]
+        self.index = index
+        self.context_blocks = context_blocks if context_blocks is not None else {}
+        self.render_context = render_context
+        self.store_version = store_version
+        self.load_seconds = load_seconds
+        self.changed = changed
+        self.loaded_at = datetime.now().isoformat()
+        self._table: Optional[ProfileTable] = None
+        self._table_lock = threading.Lock()
+
+    @property
+    def table_built(self) -> bool:
+        return self._table is not None
+
+    @property
+    def table(self) -> ProfileTable:
+        """Columnar profile table with facet indexes, built on first use"""
+        if self._table is None:
+            with self._table_lock:
+                if self._table is None:
+                    self._table = ProfileTable(self.companies)
+        return self._table
+
+    def context_block(self, company: Dict) -> str:
+        """The rendered prompt block for a profile of this snapshot"""
+        block = self.context_blocks.get(profile_key(company))
+        if block is None:
+            block = self.render_context(company) if self.render_context else ""
+        return block
+
+    def ordered(self, companies: List[Dict]) -> List[Dict]:
+        """Sort companies into the snapshot's stable (key) order"""
+        return sorted(companies, key=profile_key)
+
+    def to_dict(self) -> Dict:
+        return {
+            "generation": self.generation,
+            "companies": len(self.companies),
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_seconds * 1000, 2),
+            "changed_profiles": self.changed,
+        }
+
+
+class KnowledgeBase:
+    """Holds the current snapshot and reloads it incrementally from a ProfileStore"""
+
+    def __init__(self, store, index_path: Optional[str] = None, use_embeddings: bool = False,
+                 render_context: Optional[Callable[[Dict], str]] = None, snapshot_path: Optional[str] = None):
+        self.store = store
+        self.index_path = index_path
+        self.snapshot_path = snapshot_path
+        self.use_embeddings = use_embeddings
+        self.render_context = render_context
+        self._snapshot: Optional[KnowledgeSnapshot] = None
+        self._reload_lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> KnowledgeSnapshot:
+        return self.ensure_loaded()
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def ensure_loaded(self) -> KnowledgeSnapshot:
+        """The current snapshot, loading it first if there is none yet (callers share one load)"""
+        if self._snapshot is None:
+            with self._first_load_lock:
+                if self._snapshot is None and not (self.snapshot_path and self.load_snapshot_file(self.snapshot_path)):
+                    self.load()
+        return self._snapshot
+
+    async def ensure_loaded_async(self) -> KnowledgeSnapshot:
+        """ensure_loaded on a worker thread, so waiting for the first load never blocks the event loop"""
+        if self._snapshot is not None:
+            return self._snapshot
+        return await asyncio.to_thread(self.ensure_loaded)
+
+    def _build_index(self, companies: List[Dict], persist: bool = True,
+                     previous: Optional[KnowledgeIndex] = None) -> KnowledgeIndex:
+        if self.index_path and persist:
+            return KnowledgeIndex.load_or_build(companies, self.index_path, use_embeddings=self.use_embeddings)
+        return KnowledgeIndex(use_embeddings=self.use_embeddings).build(companies, previous=previous)
+
+    def _render_blocks(self, profiles_by_key: Dict[str, Dict]) -> Dict[str, str]:
+        if self.render_context is None:
+            return {}
+        previous = self._snapshot
+        blocks = {}
+        for key, profile in profiles_by_key.items():
+            # Unchanged profiles are carried over (re-read ones from the safety window compare equal)
+            old = previous.profiles_by_key.get(key) if previous is not None else None
+            if old is not None and key in previous.context_blocks and (old is profile or old == profile):
+                blocks[key] = previous.context_blocks[key]
+            else:
+                blocks[key] = self.render_context(profile)
+        return blocks
+
+    def _swap(self, profiles_by_key: Dict[str, Dict], store_version: tuple, started: float, changed: int,
+              persist: bool = True, previous: Optional[KnowledgeIndex] = None):
+        generation = self._snapshot.generation + 1 if self._snapshot else 1
+        companies = [profiles_by_key[key] for key in sorted(profiles_by_key)]
+        index = self._build_index(companies, persist, previous)
+        context_blocks = self._render_blocks(profiles_by_key)
+        # Single reference assignment: readers see either the old or the new snapshot
+        self._snapshot = KnowledgeSnapshot(generation, profiles_by_key, index, store_version,
+                                           time.perf_counter() - started, changed,
+                                           context_blocks, self.render_context)
+
+    def load(self) -> KnowledgeSnapshot:
+        """Full load of every profile in the store"""
+        with self._reload_lock:
+            started = time.perf_counter()
+            store_version = self.store.version()
+            profiles = self.store.all()
+            self._swap({profile_key(p): p for p in profiles}, store_version, started, len(profiles))
+        return self._snapshot
+
+    def load_snapshot_file(self, path: str) -> Optional[KnowledgeSnapshot]:
+        """Swap in the snapshot stored in a snapshot file (None if the file is missing or not usable)"""
+        with self._reload_lock:
+            started = time.perf_counter()
+            decoded = read_snapshot_file(path, use_embeddings=self.use_embeddings)
+            if decoded is None:
+                return None
+            profiles = decoded["profiles"]
+            keys = [profile_key(p) for p in profiles]
+            index = KnowledgeIndex.from_dict(decoded["index"], documents=profiles)
+            generation = self._snapshot.generation + 1 if self._snapshot else 1
+            self._snapshot = KnowledgeSnapshot(generation, dict(zip(keys, profiles)), index,
+                                               decoded["header"]["store_version"], time.perf_counter() - started,
+                                               len(profiles), dict(zip(keys, decoded["context_blocks"])),
+                                               self.render_context)
+        return self._snapshot
+
+    def save_snapshot_file(self, path: str) -> KnowledgeSnapshot:
+        """Write the current snapshot (loading it first) to a snapshot file for other processes"""
+        snapshot = self.ensure_loaded()
+        index_data = snapshot.index.to_dict()
+        del index_data["documents"]  # The profiles section, in the same order
+        blocks = [snapshot.context_block(company) for company in snapshot.companies]
+        write_snapshot_file(path, snapshot.companies, index_data, blocks, snapshot.store_version,
+                            use_embeddings=self.use_embeddings)
+        return snapshot
+
+    def replace(self, profiles: List[Dict]) -> KnowledgeSnapshot:
+        """Swap in an explicit set of profiles (benchmarks and tests)"""
+        with self._reload_lock:
+            self._swap({profile_key(p): p for p in profiles}, (), time.perf_counter(), len(profiles), persist=False)
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """
+        Incrementally reload changed profiles
+
+        Returns:
+            True if a new snapshot was swapped in, False if nothing changed
+        """
+        if self._snapshot is None:
+            self.ensure_loaded()
+            return True
+
+        with self._reload_lock:
+            current = self._snapshot
+            store_version = self.store.version()
+            if store_version == current.store_version:
+                return False
+
+            started = time.perf_counter()
+            since = (current.store_version[1] if current.store_version else 0.0) - RELOAD_SAFETY_WINDOW
+            changed_profiles = self.store.changed_since(since)
+            live_keys = self.store.keys()
+
+            profiles_by_key = {key: p for key, p in current.profiles_by_key.items() if key in live_keys}
+            for profile in changed_profiles:
+                profiles_by_key[profile_key(profile)] = profile
+
+            # Only the changed profiles are indexed again; the persisted index is left to full loads
+            self._swap(profiles_by_key, store_version, started, len(changed_profiles),
+                       persist=False, previous=current.index)
+            return True
+
+    async def reload_async(self) -> bool:
+        """Reload on a worker thread so the event loop is never blocked"""
+        return await asyncio.to_thread(self.reload)
+
+    async def watch(self, interval: float):
+        """Poll the store every `interval` seconds and hot-swap changes (run as a background task)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.reload_async():
+                    snapshot = self._snapshot
+                    print(f"🔄 Knowledge base reloaded: generation {snapshot.generation}, "
+                          f"{snapshot.changed} changed, {len(snapshot.companies)} companies")
+            except Exception as e:
+                print(f"Knowledge base reload failed: {e}")
@@ -0,0 +1,110 @@
+"""
+Shared asynchronous LLM client for the chat endpoint.
+
+One ChatOpenAI instance (and its pooled HTTP connections) is created lazily and
+reused by every request; calls go through `ainvoke` so a slow completion never
+blocks the event loop, and a semaphore caps how many completions run at once.
+`stream` yields the reply token by token for the streaming chat endpoint.
+
+langchain and httpx are imported on first use rather than at import time, so
+importing this module (and starting the server) stays cheap.
+"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# role -> langchain message class, filled on first use
+_message_types: Dict[str, type] = {}
+
+
+# Per-model tiktoken encodings; None when the encoding could not be loaded
+_encodings: Dict[str, Optional[object]] = {}
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Count tokens with the model's tiktoken encoding
+
+    Falls back to an estimate of 4 characters per token when tiktoken or its
+    encoding file is unavailable (e.g. offline).
+    """
+    if model not in _encodings:
+        try:
+            import tiktoken
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception:
+            _encodings[model] = None
+    encoding = _encodings[model]
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def to_langchain_messages(messages: List[Tuple[str, str]]) -> List:
+    """Convert (role, content) tuples to message objects (no template parsing of braces)"""
+    if not _message_types:
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        _message_types.update(system=SystemMessage, human=HumanMessage, assistant=AIMessage)
+    return [_message_types[role](content=content) for role, content in messages]
+
+
+class ChatLLM:
+    """Long-lived, connection-pooled async chat model with a concurrency limit"""
+
+    def __init__(self, model: str = "gpt-3.5-turbo", temperature: float = 0.7, max_concurrency: int = 32,
+                 timeout: float = 60.0, llm=None):
+        self.model = model
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._llm = llm
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+    @property
+    def llm(self):
+        """The shared chat model, created on first use"""
+        if self._llm is None:
+            import httpx
+            from langchain_openai import ChatOpenAI
+
+            self._llm = ChatOpenAI(
+                model=self.model,
+                temperature=self.temperature,
+                timeout=self.timeout,
+                http_async_client=httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                ),
+            )
+        return self._llm
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def complete(self, messages: List[Tuple[str, str]], llm=None) -> str:
+        """Generate a reply for (role, content) messages"""
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                response = await (llm or self.llm).ainvoke(to_langchain_messages(messages))
+            finally:
+                self.in_flight -= 1
+        return response.content
+
+    async def stream(self, messages: List[Tuple[str, str]], llm=None) -> AsyncIterator[str]:
+        """Yield the reply for (role, content) messages as the model produces it"""
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                async for chunk in (llm or self.llm).astream(to_langchain_messages(messages)):
+                    if chunk.content:
+                        yield chunk.content
+            finally:
+                self.in_flight -= 1
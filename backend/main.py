@@ -1,33 +1,106 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+import time
+
+# Startup timings are measured from here, before the framework imports
+STARTUP_STARTED = time.perf_counter()
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from pydantic import BaseModel
-import uvicorn
 import os
-import json
-import glob
-from typing import List, Dict
+import sys
+from typing import AsyncIterator, List, Dict, Optional
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 from datetime import datetime
 
 # Load environment variables
 load_dotenv('../.env')
 
-app = FastAPI(title="African Companies Chat Assistant")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The profile store lives with the extraction code in akania/src
+sys.path.insert(0, os.path.abspath(os.path.join(BASE_DIR, '..', 'akania', 'src')))
+from profile_store import get_profile_store  # noqa: E402
+from answer_cache import AnswerCache, depends_on_history  # noqa: E402
+from conversation_store import open_conversation_store  # noqa: E402
+from knowledge import KnowledgeBase, KnowledgeSnapshot  # noqa: E402
+from llm_client import ChatLLM, count_tokens  # noqa: E402
+from query_router import QueryRouter, RoutedAnswer  # noqa: E402
+from retrieval import KnowledgeIndex  # noqa: E402
+from telemetry import METRICS, configure_trace_log, span  # noqa: E402
+
+
+def ms_since_start() -> float:
+    return round((time.perf_counter() - STARTUP_STARTED) * 1000, 2)
+
+
+# Startup breakdown in ms: imports, app setup done, knowledge load, ready
+STARTUP_TIMINGS: Dict[str, float] = {"imports_ms": ms_since_start()}
+
+# Persisted next to data/ (not inside it, so it is never mistaken for a profile)
+INDEX_PATH = os.getenv('KNOWLEDGE_INDEX_PATH') or os.path.abspath(os.path.join(BASE_DIR, '..', 'index', 'knowledge_index.json'))
+
+# Snapshot file written once by start_server.py --production and mapped by
+# every worker for its first load (empty: load from the profile store)
+KNOWLEDGE_SNAPSHOT_PATH = os.getenv('KNOWLEDGE_SNAPSHOT_PATH', '')
+
+# Number of company profiles put into the prompt per question
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '5'))
+RETRIEVAL_USE_EMBEDDINGS = os.getenv('RETRIEVAL_USE_EMBEDDINGS', '').lower() in ('1', 'true', 'yes')
+
+# Maximum number of chat completions running at once on this worker
+CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '32'))
+
+# Seconds between checks for new/changed profiles (0 disables hot reload)
+KNOWLEDGE_RELOAD_INTERVAL = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', '30'))
+
+# Server-side chat history ("memory://" or "sqlite:///path"); the session
+# cookie only carries the session id
+CONVERSATION_STORE_URL = os.getenv('CONVERSATION_STORE_URL', 'memory://')
+CONVERSATION_TTL_SECONDS = float(os.getenv('CONVERSATION_TTL_SECONDS', '86400'))
+
+# Tokens of previous exchanges sent with each question (newest first)
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '2000'))
+
+# Answers to repeated questions, per knowledge generation (similarity 0 = exact
+# normalized match only; e.g. 0.9 also reuses near-identical questions)
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600'))
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0'))
+
+# Answer list/count/lookup questions ("which companies operate in Kenya?")
+# straight from the profiles, without an LLM call
+QUERY_ROUTER_ENABLED = os.getenv('QUERY_ROUTER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+QUERY_ROUTER_MAX_LISTED = int(os.getenv('QUERY_ROUTER_MAX_LISTED', '25'))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the knowledge base in the background and keep it fresh for the lifetime of the app"""
+    configure_trace_log()
+    STARTUP_TIMINGS["serving_ms"] = ms_since_start()
+    loader = asyncio.create_task(load_knowledge_in_background())
+    yield
+    loader.cancel()
+
+app = FastAPI(title="African Companies Chat Assistant", lifespan=lifespan)
 
 # Add session middleware for chat history
 app.add_middleware(SessionMiddleware, secret_key="your-secret-key-change-in-production")
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
 # Setup Jinja2 templates
-templates = Jinja2Templates(directory="templates")
+templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 # Add CORS middleware
 app.add_middleware(
@@ -49,46 +122,9 @@ class ChatHistoryItem(BaseModel):
     ai_response: str
     timestamp: str
 
-def load_company_knowledge_base():
-    """Load all company JSON files as knowledge base"""
-    knowledge_base = []
-    
-    # Load from the enhanced data directory
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-    data_dir = os.path.abspath(data_dir)
-    
-    print(f"Looking for JSON files in: {data_dir}")
-    
-    if os.path.exists(data_dir):
-        json_files = glob.glob(os.path.join(data_dir, '*.json'))
-        print(f"Found JSON files: {json_files}")
-        for file_path in json_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    company_data = json.load(f)
-                    knowledge_base.append(company_data)
-                    print(f"Loaded: {company_data.get('company_name', 'Unknown')}")
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
-    else:
-        print(f"Data directory not found: {data_dir}")
-    
-    print(f"Loaded {len(knowledge_base)} companies into knowledge base")
-    return knowledge_base
-
-# Load company knowledge at startup
-COMPANY_KNOWLEDGE = load_company_knowledge_base()
-
-def get_ai_response(user_message: str, chat_history: List[Dict] = None) -> str:
-    """Generate AI response using OpenAI and company knowledge with chat history"""
-    try:
-        # Setup OpenAI
-        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-        
-        # Create knowledge context
-        knowledge_context = ""
-        for company in COMPANY_KNOWLEDGE:
-            knowledge_context += f"""
+def format_company_context(company: Dict) -> str:
+    """Render one company profile as a block of the knowledge context"""
+    return f"""
 Company: {company.get('company_name', 'Unknown')}
 Countries: {', '.join(company.get('countries', []))}
 Sector: {company.get('sector', 'Unknown')}
@@ -96,45 +132,305 @@ Description: {company.get('business_description', 'No description available')}
 Key People: {', '.join([f"{person.get('name', 'Unknown')} ({person.get('title', 'Unknown role')})" for person in company.get('key_people', [])])}
 Transactions: {company.get('transactions', 'No transaction information available')}
 ---"""
-        
-        # Build chat history for context
-        messages = [
-            ("system", f"""You are a knowledgeable assistant specializing in African companies. 
-            Use the following company information to answer questions:
 
-{knowledge_context}
+def create_company_knowledge_base() -> KnowledgeBase:
+    """Knowledge base over the profile store (profiles are loaded on first use or by the startup task)"""
+    return KnowledgeBase(get_profile_store(), INDEX_PATH, use_embeddings=RETRIEVAL_USE_EMBEDDINGS,
+                         render_context=format_company_context, snapshot_path=KNOWLEDGE_SNAPSHOT_PATH or None)
+
+def load_company_knowledge_base(knowledge: KnowledgeBase) -> KnowledgeSnapshot:
+    """Load all company profiles from the profile store (an empty knowledge base if that fails)"""
+    started = time.perf_counter()
+    try:
+        knowledge.ensure_loaded()
+    except Exception as e:
+        print(f"Error loading profile store: {e}")
+        knowledge.replace([])
+    if "ready_ms" not in STARTUP_TIMINGS:
+        STARTUP_TIMINGS["knowledge_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        STARTUP_TIMINGS["ready_ms"] = ms_since_start()
+        print(f"Loaded {len(knowledge.snapshot.companies)} companies into knowledge base")
+    return knowledge.snapshot
+
+async def current_knowledge() -> KnowledgeSnapshot:
+    """The current snapshot; requests that arrive during startup wait for the shared first load"""
+    if KNOWLEDGE.loaded:
+        return KNOWLEDGE.snapshot
+    return await asyncio.to_thread(load_company_knowledge_base, KNOWLEDGE)
+
+async def load_knowledge_in_background():
+    """Startup task: first load off the event loop, then hot reload every KNOWLEDGE_RELOAD_INTERVAL"""
+    await asyncio.to_thread(load_company_knowledge_base, KNOWLEDGE)
+    print(f"Startup: imports {STARTUP_TIMINGS['imports_ms']}ms, serving after {STARTUP_TIMINGS['serving_ms']}ms, "
+          f"knowledge {STARTUP_TIMINGS['knowledge_ms']}ms, ready after {STARTUP_TIMINGS['ready_ms']}ms")
+    if KNOWLEDGE_RELOAD_INTERVAL > 0:
+        await KNOWLEDGE.watch(KNOWLEDGE_RELOAD_INTERVAL)
+
+# The retrieval index is built by the startup task (or on first use); the
+# snapshot is hot-swapped by the reload task when profiles change
+KNOWLEDGE = create_company_knowledge_base()
+
+def select_relevant_companies(user_message: str, chat_history: List[Dict] = None,
+                              index: KnowledgeIndex = None, top_k: int = None) -> List[Dict]:
+    """Pick the top-k profiles relevant to the question (and the previous question, for follow-ups)"""
+    index = index if index is not None else KNOWLEDGE.snapshot.index
+    top_k = top_k or RETRIEVAL_TOP_K
+
+    query = user_message
+    if chat_history:
+        query = f"{chat_history[-1].get('user_message', '')} {user_message}"
 
-Guidelines:
+    companies = index.search(query, top_k=top_k)
+    if not companies:
+        # Nothing matched (e.g. "what sectors are represented?") - fall back to
+        # a bounded sample so the prompt size stays flat
+        companies = index.documents[:top_k]
+    return companies
+
+SYSTEM_PROMPT_GUIDELINES = """Guidelines:
 - Answer questions based on the provided company data
 - If asked about a company not in your knowledge base, politely mention that you don't have information about that specific company
 - Be conversational and helpful
 - Focus on African business insights when relevant
 - If you don't have specific information, say so clearly
 - Remember the conversation context and refer to previous messages when relevant
-- Keep responses concise but informative""")
-        ]
-        
-        # Add chat history to messages
-        if chat_history:
-            for item in chat_history[-10:]:  # Keep last 10 exchanges for context
-                messages.append(("human", item.get("user_message", "")))
-                messages.append(("assistant", item.get("ai_response", "")))
-        
-        # Add current message
-        messages.append(("human", user_message))
-        
-        # Create prompt
-        prompt = ChatPromptTemplate.from_messages(messages)
-        
-        # Generate response
-        chain = prompt | llm
-        response = chain.invoke({})
+- Keep responses concise but informative"""
+
+# (snapshot, prefix) for the current knowledge generation
+_system_prompt_prefix = (None, "")
+
+def system_prompt_prefix(snapshot: KnowledgeSnapshot) -> str:
+    """
+    The static start of the system prompt, built once per knowledge generation
+
+    It is byte-identical across requests and comes before anything
+    question-specific, so provider-side prompt-prefix caching can reuse it.
+    """
+    global _system_prompt_prefix
+    cached_snapshot, prefix = _system_prompt_prefix
+    if cached_snapshot is not snapshot:
+        prefix = f"""You are a knowledgeable assistant specializing in African companies.
+Your knowledge base holds {len(snapshot.index)} companies.
+
+{SYSTEM_PROMPT_GUIDELINES}
+
+The most relevant companies for this question are:
+"""
+        _system_prompt_prefix = (snapshot, prefix)
+    return prefix
+
+# Recent per-request prompt measurements (build time and token counts)
+PROMPT_STATS = deque(maxlen=1000)
+
+def record_prompt_stats(messages: List[tuple], build_seconds: float, companies: int):
+    """Record the build time and token counts of one prompt"""
+    system_tokens = count_tokens(messages[0][1], CHAT_LLM.model)
+    other_tokens = sum(count_tokens(content, CHAT_LLM.model) for _, content in messages[1:])
+    PROMPT_STATS.append({
+        "build_ms": round(build_seconds * 1000, 3),
+        "companies": companies,
+        "system_tokens": system_tokens,
+        "prompt_tokens": system_tokens + other_tokens,
+    })
+
+def prompt_summary() -> Dict:
+    if not PROMPT_STATS:
+        return {"requests": 0}
+    build_ms = sorted(stat["build_ms"] for stat in PROMPT_STATS)
+    prompt_tokens = [stat["prompt_tokens"] for stat in PROMPT_STATS]
+    return {
+        "requests": len(PROMPT_STATS),
+        "build_p50_ms": build_ms[len(build_ms) // 2],
+        "build_max_ms": build_ms[-1],
+        "prompt_tokens_avg": round(sum(prompt_tokens) / len(prompt_tokens)),
+        "prompt_tokens_max": max(prompt_tokens),
+        "last": PROMPT_STATS[-1],
+    }
+
+def exchange_tokens(item: Dict) -> int:
+    """Token count of one exchange (stored on items created by new_chat_item)"""
+    tokens = item.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(item.get("user_message", "") + item.get("ai_response", ""), CHAT_LLM.model)
+    return tokens
+
+def trim_history(chat_history: List[Dict], budget: int = None) -> List[Dict]:
+    """The most recent exchanges whose combined tokens fit the budget, oldest first"""
+    budget = HISTORY_TOKEN_BUDGET if budget is None else budget
+    kept = []
+    used = 0
+    for item in reversed(chat_history):
+        used += exchange_tokens(item)
+        if used > budget:
+            break
+        kept.append(item)
+    kept.reverse()
+    return kept
+
+def build_chat_messages(user_message: str, chat_history: List[Dict] = None,
+                        snapshot: KnowledgeSnapshot = None, top_k: int = None) -> List[tuple]:
+    """Build the prompt messages for a question from the retrieved profiles and chat history"""
+    started = time.perf_counter()
+    snapshot = snapshot if snapshot is not None else KNOWLEDGE.snapshot
+    companies = select_relevant_companies(user_message, chat_history, index=snapshot.index, top_k=top_k)
+
+    # Cached blocks in stable order: the same companies always render to the same bytes
+    knowledge_context = "".join(snapshot.context_block(company) for company in snapshot.ordered(companies))
+    messages = [("system", system_prompt_prefix(snapshot) + knowledge_context)]
+
+    # Add as much recent chat history as fits the token budget
+    if chat_history:
+        for item in trim_history(chat_history):
+            messages.append(("human", item.get("user_message", "")))
+            messages.append(("assistant", item.get("ai_response", "")))
+
+    # Add current message
+    messages.append(("human", user_message))
+    record_prompt_stats(messages, time.perf_counter() - started, len(companies))
+    return messages
+
+# One shared, connection-pooled OpenAI client for all chat requests
+CHAT_LLM = ChatLLM(model="gpt-3.5-turbo", temperature=0.7, max_concurrency=CHAT_MAX_CONCURRENCY)
+
+ERROR_RESPONSE = "I apologize, but I'm having trouble processing your request right now. Please try again."
+
+ANSWER_CACHE = AnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=ANSWER_CACHE_SIMILARITY,
+) if ANSWER_CACHE_ENABLED else None
+
+def answer_cache_for(user_message: str, chat_history: List[Dict] = None):
+    """The answer cache, or None when disabled or the question depends on the conversation"""
+    if ANSWER_CACHE is None:
+        return None
+    if depends_on_history(user_message, chat_history):
+        ANSWER_CACHE.record_bypass()
+        return None
+    return ANSWER_CACHE
+
+QUERY_ROUTER = QueryRouter(max_listed=QUERY_ROUTER_MAX_LISTED)
+
+async def route_question(user_message: str, snapshot: KnowledgeSnapshot) -> Optional[RoutedAnswer]:
+    """The router's answer to a structured question (None: ask the LLM), counted per route"""
+    routed = None
+    if QUERY_ROUTER_ENABLED:
+        if not QUERY_ROUTER.has_index(snapshot):
+            # Names and facet values (and the profile table) are indexed off the event loop once per generation
+            await asyncio.to_thread(QUERY_ROUTER.phrase_index, snapshot)
+        with span("query_router") as routing:
+            routed = QUERY_ROUTER.route(user_message, snapshot)
+            routing.set(intent=routed.intent if routed else None)
+    METRICS.inc("chat_routed_total", help_text="Chat questions by how they were answered (router intent or llm)",
+                route=routed.intent if routed else "llm")
+    return routed
+
+async def get_ai_response(user_message: str, chat_history: List[Dict] = None, llm=None) -> str:
+    """Generate AI response using OpenAI and company knowledge with chat history"""
+    try:
+        # Requests that arrive during startup wait for the background load
+        snapshot = await current_knowledge()
+        routed = await route_question(user_message, snapshot)
+        if routed is not None:
+            return routed.answer
+        cache = answer_cache_for(user_message, chat_history)
+        cached = cache.lookup(user_message, snapshot.generation) if cache else None
+        if cached is not None:
+            return cached.answer
+
+        # Create prompt from the retrieved companies only
+        messages = build_chat_messages(user_message, chat_history, snapshot=snapshot)
         
-        return response.content
+        # Generate response without blocking the event loop
+        started = time.perf_counter()
+        with span("chat_llm", streamed=False):
+            ai_response = await CHAT_LLM.complete(messages, llm=llm)
+        if cache:
+            cache.store(user_message, snapshot.generation, ai_response, time.perf_counter() - started)
+        return ai_response
         
     except Exception as e:
         print(f"Error generating AI response: {e}")
-        return "I apologize, but I'm having trouble processing your request right now. Please try again."
+        return ERROR_RESPONSE
+
+async def stream_ai_response(user_message: str, chat_history: List[Dict] = None, llm=None) -> AsyncIterator[str]:
+    """
+    Same as get_ai_response, but yields the reply as the model produces it
+
+    A failure before the first token yields ERROR_RESPONSE; a failure after it
+    is raised, since the tokens already sent are an incomplete reply.
+    """
+    produced = False
+    try:
+        snapshot = await current_knowledge()
+        routed = await route_question(user_message, snapshot)
+        if routed is not None:
+            yield routed.answer
+            return
+        cache = answer_cache_for(user_message, chat_history)
+        cached = cache.lookup(user_message, snapshot.generation) if cache else None
+        if cached is not None:
+            yield cached.answer
+            return
+
+        messages = build_chat_messages(user_message, chat_history, snapshot=snapshot)
+        started = time.perf_counter()
+        tokens = []
+        async for token in CHAT_LLM.stream(messages, llm=llm):
+            produced = True
+            tokens.append(token)
+            yield token
+        if cache and tokens:
+            cache.store(user_message, snapshot.generation, "".join(tokens), time.perf_counter() - started)
+    except Exception as e:
+        print(f"Error streaming AI response: {e}")
+        if produced:
+            raise
+        yield ERROR_RESPONSE
+
+# Maximum number of exchanges kept per session
+MAX_HISTORY_EXCHANGES = 20
+
+CONVERSATIONS = open_conversation_store(CONVERSATION_STORE_URL, ttl_seconds=CONVERSATION_TTL_SECONDS)
+
+# Recent time-to-first-token samples for /chat/stream, in seconds
+STREAM_TTFT = deque(maxlen=1000)
+
+def new_chat_item(user_message: str, ai_response: str) -> Dict:
+    return {
+        "user_message": user_message,
+        "ai_response": ai_response,
+        "timestamp": datetime.now().isoformat(),
+        "tokens": count_tokens(user_message + ai_response, CHAT_LLM.model),
+    }
+
+def get_session_id(request: Request) -> str:
+    """The session's conversation id, assigned on first use"""
+    session_id = request.session.get("session_id")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        request.session["session_id"] = session_id
+    legacy_history = request.session.pop("chat_history", None)
+    if legacy_history:
+        # Move history from an old cookie-based session into the store
+        for item in legacy_history[-MAX_HISTORY_EXCHANGES:]:
+            CONVERSATIONS.append(session_id, item, MAX_HISTORY_EXCHANGES)
+    return session_id
+
+def sse_event(data: Dict, event: str = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def ttft_summary() -> Dict:
+    samples = sorted(STREAM_TTFT)
+    if not samples:
+        return {"streams": 0}
+    return {
+        "streams": len(samples),
+        "ttft_p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "ttft_p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+    }
 
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_page(request: Request):
@@ -143,60 +439,179 @@ async def get_chat_page(request: Request):
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: Request, message: ChatMessage):
-    """Main chat endpoint with session-based chat history"""
+    """Main chat endpoint with server-side chat history"""
     try:
-        # Get or initialize chat history from session
-        if "chat_history" not in request.session:
-            request.session["chat_history"] = []
-        
-        chat_history = request.session["chat_history"]
+        # Get chat history for this session from the conversation store
+        session_id = get_session_id(request)
+        chat_history = await asyncio.to_thread(CONVERSATIONS.get, session_id)
         
         # Generate AI response with chat history context
-        ai_response = get_ai_response(message.message, chat_history)
-        
-        # Add this exchange to chat history
-        chat_item = {
-            "user_message": message.message,
-            "ai_response": ai_response,
-            "timestamp": datetime.now().isoformat()
-        }
+        started = time.perf_counter()
+        ai_response = await get_ai_response(message.message, chat_history)
+        METRICS.observe("chat_request_seconds", time.perf_counter() - started,
+                        "Chat answer latency", endpoint="chat")
         
-        chat_history.append(chat_item)
-        
-        # Keep only last 20 exchanges to prevent session from getting too large
-        if len(chat_history) > 20:
-            chat_history = chat_history[-20:]
-        
-        request.session["chat_history"] = chat_history
+        # Add this exchange to chat history (the store keeps the last 20)
+        await asyncio.to_thread(CONVERSATIONS.append, session_id, new_chat_item(message.message, ai_response),
+                                MAX_HISTORY_EXCHANGES)
         
         return ChatResponse(response=ai_response)
     except Exception as e:
         print(f"Chat endpoint error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: Request, message: ChatMessage):
+    """
+    Streaming chat endpoint (server-sent events)
+
+    Sends one `data: {"token": ...}` event per chunk as the model produces it,
+    then an `event: done` carrying the full response and its timings. The
+    exchange joins the session history once the stream completes; when the
+    model fails mid-reply, an `event: error` with the partial response ends
+    the stream instead and nothing is stored.
+    """
+    session_id = get_session_id(request)
+    chat_history = await asyncio.to_thread(CONVERSATIONS.get, session_id)
+
+    async def events():
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = []
+        try:
+            async for token in stream_ai_response(message.message, chat_history):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+                yield sse_event({"token": token})
+        except Exception:
+            METRICS.inc("chat_stream_errors_total", help_text="Streamed replies cut off by a model failure")
+            yield sse_event({"error": ERROR_RESPONSE, "response": "".join(tokens)}, event="error")
+            return
+
+        ai_response = "".join(tokens)
+        await asyncio.to_thread(CONVERSATIONS.append, session_id, new_chat_item(message.message, ai_response),
+                                MAX_HISTORY_EXCHANGES)
+        finished = time.perf_counter()
+        ttft = (first_token_at or finished) - started
+        STREAM_TTFT.append(ttft)
+        METRICS.observe("chat_request_seconds", finished - started, "Chat answer latency", endpoint="chat_stream")
+        METRICS.observe("chat_ttft_seconds", ttft, "Time to the first streamed token")
+        yield sse_event({
+            "response": ai_response,
+            "ttft_ms": round(ttft * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2),
+        }, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/clear-history")
 async def clear_chat_history(request: Request):
     """Clear chat history for the current session"""
-    request.session["chat_history"] = []
+    await asyncio.to_thread(CONVERSATIONS.clear, get_session_id(request))
     return {"message": "Chat history cleared"}
 
 @app.get("/chat-history")
 async def get_chat_history(request: Request):
     """Get current chat history"""
-    chat_history = request.session.get("chat_history", [])
+    chat_history = await asyncio.to_thread(CONVERSATIONS.get, get_session_id(request))
     return {"history": chat_history, "count": len(chat_history)}
 
+async def profile_table(snapshot: KnowledgeSnapshot):
+    """The snapshot's profile table, built off the event loop the first time"""
+    if snapshot.table_built:
+        return snapshot.table
+    return await asyncio.to_thread(lambda: snapshot.table)
+
+@app.get("/companies")
+async def list_companies(country: Optional[str] = None, sector: Optional[str] = None,
+                         offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
+    """Companies operating in a country and/or sector, a page at a time (no LLM call)"""
+    snapshot = await current_knowledge()
+    total, companies = (await profile_table(snapshot)).page(country, sector, offset, limit)
+    return {"total": total, "offset": offset, "limit": limit, "companies": companies,
+            "generation": snapshot.generation}
+
+@app.get("/companies/facets")
+async def company_facets():
+    """Number of companies per country and per sector"""
+    snapshot = await current_knowledge()
+    return {"facets": (await profile_table(snapshot)).facet_counts(), "generation": snapshot.generation}
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and answering (does not wait for the knowledge base)"""
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - STARTUP_STARTED, 3)}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the knowledge base is loaded, 503 while it is still loading"""
+    if not KNOWLEDGE.loaded:
+        return JSONResponse({"status": "loading", "startup": STARTUP_TIMINGS}, status_code=503)
+    return {"status": "ready", "companies_loaded": len(KNOWLEDGE.snapshot.companies), "startup": STARTUP_TIMINGS}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "companies_loaded": len(COMPANY_KNOWLEDGE)}
+    if not KNOWLEDGE.loaded:
+        return {"status": "starting", "ready": False, "startup": STARTUP_TIMINGS}
+    snapshot = KNOWLEDGE.snapshot
+    return {
+        "status": "healthy",
+        "ready": True,
+        "startup": STARTUP_TIMINGS,
+        "companies_loaded": len(snapshot.companies),
+        "knowledge": snapshot.to_dict(),
+        "streaming": ttft_summary(),
+        "prompt": prompt_summary(),
+        "conversations": await asyncio.to_thread(CONVERSATIONS.stats),
+    }
+
+@app.get("/metrics/answer-cache")
+async def answer_cache_metrics():
+    """Answer cache hit rate and the LLM time it saved"""
+    if ANSWER_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **ANSWER_CACHE.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus metrics: chat latency, knowledge base size, caches and traced spans"""
+    METRICS.set("ready", 1 if KNOWLEDGE.loaded else 0, "Knowledge base loaded and serving")
+    for phase, value in STARTUP_TIMINGS.items():
+        METRICS.set("startup_seconds", value / 1000, "Startup timings since the first import",
+                    phase=phase[:-3])
+    if KNOWLEDGE.loaded:
+        snapshot = KNOWLEDGE.snapshot
+        METRICS.set("knowledge_companies", len(snapshot.companies), "Company profiles in the knowledge base")
+        METRICS.set("knowledge_generation", snapshot.generation, "Knowledge base generation")
+        METRICS.set("knowledge_load_seconds", snapshot.load_seconds, "Duration of the last knowledge load")
+    conversations = await asyncio.to_thread(CONVERSATIONS.stats)
+    METRICS.set("conversations_sessions", conversations["sessions"], "Stored chat sessions")
+    if ANSWER_CACHE is not None:
+        stats = ANSWER_CACHE.stats()
+        for outcome in ("hits", "misses", "bypassed"):
+            METRICS.set("answer_cache_lookups", stats[outcome], "Answer cache lookups by outcome", outcome=outcome)
+        METRICS.set("answer_cache_entries", stats["entries"], "Cached answers")
+    return PlainTextResponse(METRICS.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/reload-knowledge")
+async def reload_knowledge():
+    """Reload changed profiles now instead of waiting for the next poll"""
+    changed = await KNOWLEDGE.reload_async()
+    return {"reloaded": changed, "knowledge": KNOWLEDGE.snapshot.to_dict()}
 
 @app.get("/debug")
 async def debug_info():
     """Debug endpoint to check loaded data"""
+    companies = (await KNOWLEDGE.ensure_loaded_async()).companies
     return {
-        "companies_loaded": len(COMPANY_KNOWLEDGE),
-        "companies": [company.get('company_name', 'Unknown') for company in COMPANY_KNOWLEDGE]
+        "companies_loaded": len(companies),
+        "companies": [company.get('company_name', 'Unknown') for company in companies]
     }
 
 @app.post("/test-chat")
@@ -220,4 +635,6 @@ async def get_simple_chat(request: Request):
     return templates.TemplateResponse("simple.html", {"request": request})
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,181 @@
+"""
+Columnar, interned view of a knowledge snapshot's profiles with facet indexes.
+
+The /companies endpoint answers structured questions ("companies in Kenya",
+"agriculture companies in Mozambique") from this table, without an LLM call
+or a profile store query. Per row it keeps only what listings need: the
+company name, and the countries and sectors as tuples of ids into interned
+value tables. Identical tuples are shared, so a large table holds one tuple
+per distinct combination rather than two lists per profile.
+
+Facet indexes map every country and sector (normalized like the profile
+store's find()) to an array of row ids in snapshot order, so a one-facet
+filter is a slice of that array. Filters on several facets intersect the
+arrays; when every operand is large they are intersected as bitmasks (Python
+ints, built once per value and cached), so the cost does not grow with the
+number of matches.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from profile_store import normalize_facet
+
+FACETS = ("country", "sector")
+
+# Below this many rows, intersecting by binary search beats building bitmasks
+BITMASK_MIN_ROWS = 1024
+
+# Profile field holding each facet's values
+FACET_FIELDS = {"country": "countries", "sector": "sector"}
+
+
+def _facet_values(value) -> List[str]:
+    """Values of a facet field, which older profiles store as a plain string"""
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [item for item in value or [] if isinstance(item, str) and item.strip()]
+
+
+class FacetColumn:
+    """One facet: interned values, per-row value ids and the value -> rows index"""
+
+    __slots__ = ("values", "ids", "rows", "index", "_combinations", "_masks")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.rows: List[Tuple[int, ...]] = []
+        self.index: List[array] = []
+        self._combinations: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        self._masks: Dict[int, int] = {}
+
+    def append(self, row: int, raw_values: List[str]):
+        value_ids = []
+        for raw in raw_values:
+            key = normalize_facet(raw)
+            value_id = self.ids.get(key)
+            if value_id is None:
+                value_id = self.ids[key] = len(self.values)
+                # The first spelling seen is the one listings show
+                self.values.append(sys.intern(raw.strip()))
+                self.index.append(array("I"))
+            if value_id not in value_ids:
+                value_ids.append(value_id)
+                self.index[value_id].append(row)
+        combination = tuple(value_ids)
+        self.rows.append(self._combinations.setdefault(combination, combination))
+
+    def matching(self, value: str) -> Sequence[int]:
+        """Row ids having the value, in row order"""
+        value_id = self.ids.get(normalize_facet(value))
+        return self.index[value_id] if value_id is not None else ()
+
+    def mask(self, value: str, size: int) -> int:
+        """Bitmask of the rows having the value (bit i set for row i)"""
+        value_id = self.ids.get(normalize_facet(value))
+        if value_id is None:
+            return 0
+        mask = self._masks.get(value_id)
+        if mask is None:
+            bits = bytearray((size + 7) // 8)
+            for row in self.index[value_id]:
+                bits[row >> 3] |= 1 << (row & 7)
+            mask = self._masks[value_id] = int.from_bytes(bits, "little")
+        return mask
+
+    def labels(self, row: int) -> List[str]:
+        return [self.values[value_id] for value_id in self.rows[row]]
+
+    def counts(self) -> Dict[str, int]:
+        """Rows per value, most common first"""
+        ranked = sorted(range(len(self.values)), key=lambda value_id: (-len(self.index[value_id]), self.values[value_id]))
+        return {self.values[value_id]: len(self.index[value_id]) for value_id in ranked}
+
+
+def intersect_sorted(smaller: Sequence[int], larger: Sequence[int]) -> List[int]:
+    """Items of two ascending sequences present in both (binary search of each item of the smaller one)"""
+    matches, low, size = [], 0, len(larger)
+    for item in smaller:
+        low = bisect_left(larger, item, low)
+        if low == size:
+            break
+        if larger[low] == item:
+            matches.append(item)
+    return matches
+
+
+class MaskRows:
+    """Row ids of a bitmask in row order, counted and sliced without listing every match"""
+
+    def __init__(self, mask: int):
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __iter__(self):
+        bits = bin(self.mask)[:1:-1]  # Row 0 first
+        position = bits.find("1")
+        while position != -1:
+            yield position
+            position = bits.find("1", position + 1)
+
+    def __getitem__(self, index: slice) -> List[int]:
+        start, stop, _ = index.indices(len(self))
+        rows = []
+        for number, row in enumerate(self):
+            if number >= stop:
+                break
+            if number >= start:
+                rows.append(row)
+        return rows
+
+
+class ProfileTable:
+    """Company names plus country and sector facet columns, row-aligned with the snapshot's companies"""
+
+    def __init__(self, companies: List[Dict]):
+        self.names: List[str] = []
+        self.columns = {facet: FacetColumn() for facet in FACETS}
+        for row, company in enumerate(companies):
+            self.names.append(company.get("company_name") or "")
+            for facet, column in self.columns.items():
+                column.append(row, _facet_values(company.get(FACET_FIELDS[facet])))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def select(self, country: Optional[str] = None, sector: Optional[str] = None) -> Sequence[int]:
+        """Row ids matching every given facet, in row order"""
+        given = [(facet, value) for facet, value in (("country", country), ("sector", sector)) if value]
+        if not given:
+            return range(len(self))
+        filters = sorted(((self.columns[facet].matching(value), facet, value) for facet, value in given),
+                         key=lambda entry: len(entry[0]))
+        if len(filters) > 1 and len(filters[0][0]) >= BITMASK_MIN_ROWS:
+            mask = -1
+            for _, facet, value in filters:
+                mask &= self.columns[facet].mask(value, len(self))
+            return MaskRows(mask)
+        rows = filters[0][0]
+        for other, _, _ in filters[1:]:
+            rows = intersect_sorted(rows, other)
+        return rows
+
+    def row(self, row: int) -> Dict:
+        return {
+            "company_name": self.names[row],
+            "countries": self.columns["country"].labels(row),
+            "sector": self.columns["sector"].labels(row),
+        }
+
+    def page(self, country: Optional[str] = None, sector: Optional[str] = None,
+             offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """Total number of matches and one page of them"""
+        rows = self.select(country, sector)
+        return len(rows), [self.row(row) for row in rows[offset:offset + limit]]
+
+    def facet_counts(self) -> Dict[str, Dict[str, int]]:
+        return {facet: column.counts() for facet, column in self.columns.items()}
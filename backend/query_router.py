@@ -0,0 +1,271 @@
+"""
+Deterministic answers to structured chat questions, ahead of the LLM.
+
+Many chat questions are direct lookups on the loaded profiles:
+
+- list:      "Which companies operate in Mozambique?", "What companies are in the database?"
+- count:     "How many companies are in the agriculture sector in Kenya?"
+- people:    "Who is the founder of Lapaire Glasses?", "Who are the key people at Sylndr?"
+- countries: "Where does Merec Industries operate?"
+- sector:    "What sector is Moni-Shop in?"
+
+The router answers those from the snapshot (the profile table's facet indexes
+and the profiles' key_people) instead of a completion. It only answers when
+it understands the whole question: every word has to be a known company name,
+a known country or sector value, or part of the small vocabulary of the
+question patterns. Anything else ("Which fintech companies in Kenya raised
+money?", "What about its founders?") falls through to the LLM, so a routed
+answer is never a guess.
+
+Names and facet values are matched on word n-grams of the question, looked up
+in dicts built once per knowledge generation, so routing costs the same with
+ten profiles as with a hundred thousand.
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from profile_store import normalize_company_name
+
+# Longest company name or facet value, in words, looked for in a question
+MAX_PHRASE_WORDS = 8
+
+# Longer questions are never structured lookups
+MAX_QUESTION_WORDS = 30
+
+COMPANY_WORDS = {"company", "companies", "firm", "firms", "business", "businesses", "startup", "startups"}
+
+# Words a routed question may contain besides names, facet values, company and role words
+FILLER_WORDS = {
+    "a", "an", "the", "of", "in", "at", "for", "s", "and", "is", "are", "was", "were", "do", "does",
+    "there", "please", "me", "tell", "show", "list", "give", "name", "all", "every", "any", "you",
+    "your", "know", "have", "about", "my", "database", "knowledge", "base", "total", "currently", "which",
+    "what", "who", "whom", "where", "how", "many", "number", "operate", "operates", "operating", "active",
+    "present", "work", "works", "working", "sector", "sectors", "industry", "industries", "country",
+    "countries", "key", "people", "person", "persons", "team", "leadership", "leaders", "management",
+}
+
+# Question words and phrases (after PHRASE_ALIASES) naming a role, and the role they ask for
+ROLE_WORDS = {
+    "founder": "founder", "founders": "founder", "founded": "founder", "cofounder": "founder",
+    "cofounders": "founder", "ceo": "ceo", "ceos": "ceo", "cto": "cto", "cfo": "cfo", "coo": "coo",
+    "chairman": "chairman", "chairperson": "chairman", "chair": "chairman", "owner": "owner",
+    "owners": "owner", "owns": "owner", "director": "director", "directors": "director",
+    "president": "president",
+}
+
+# Title words matching each role
+ROLE_TITLE_WORDS = {
+    "founder": {"founder", "founders", "cofounder", "founded"},
+    "ceo": {"ceo"},
+    "cto": {"cto"},
+    "cfo": {"cfo"},
+    "coo": {"coo"},
+    "chairman": {"chairman", "chairperson", "chairwoman", "chair"},
+    "owner": {"owner", "proprietor"},
+    "director": {"director"},
+    "president": {"president"},
+}
+
+ROLE_LABELS = {"ceo": "CEO", "cto": "CTO", "cfo": "CFO", "coo": "COO"}
+
+# Multi-word spellings rewritten to one word before matching, in questions and titles
+PHRASE_ALIASES = (
+    ("chief executive officer", "ceo"), ("chief executive", "ceo"),
+    ("chief technology officer", "cto"), ("chief technical officer", "cto"),
+    ("chief financial officer", "cfo"), ("chief operating officer", "coo"),
+    ("managing director", "director"), ("co founder", "cofounder"), ("co founders", "cofounders"),
+)
+
+# Nouns asking for a company's people; "who" alone does not ("Who is Sylndr?" asks what the company is)
+PEOPLE_WORDS = {"people", "person", "persons", "team", "leadership", "leaders", "management"}
+COUNTRY_WORDS = {"where", "countries", "country", "operate", "operates", "operating", "active", "present"}
+SECTOR_WORDS = {"sector", "sectors", "industry", "industries"}
+
+
+class RoutedAnswer:
+    """A reply produced without the LLM"""
+
+    def __init__(self, intent: str, answer: str):
+        self.intent = intent
+        self.answer = answer
+
+
+def _words(text: str) -> List[str]:
+    """Normalized words of a question or title, with multi-word role spellings folded"""
+    normalized = f" {normalize_company_name(text)} "
+    for phrase, alias in PHRASE_ALIASES:
+        normalized = normalized.replace(f" {phrase} ", f" {alias} ")
+    return normalized.split()
+
+
+def _join(items: Sequence[str]) -> str:
+    """"a", "a and b", "a, b and c" """
+    if len(items) < 2:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _values(value) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [item for item in value or [] if isinstance(item, str) and item.strip()]
+
+
+def _person(person: Dict) -> str:
+    title = person.get("title")
+    return f"{person.get('name', 'Unknown')} ({title})" if title else person.get("name", "Unknown")
+
+
+class PhraseIndex:
+    """Company names and facet values of one snapshot, by normalized phrase"""
+
+    def __init__(self, snapshot):
+        # phrase -> ("company", profile key) or (facet, display value)
+        self.phrases: Dict[str, Tuple[str, str]] = {}
+        for facet, column in snapshot.table.columns.items():
+            for value in column.values:
+                self.phrases.setdefault(normalize_company_name(value), (facet, value))
+        # Company names win over facet values spelled the same way
+        for key in snapshot.profiles_by_key:
+            if key:
+                self.phrases[key] = ("company", key)
+
+    def mentions(self, words: List[str]) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """(mentions, other words): longest known phrases from left to right, and the words left over"""
+        found, rest, position = [], [], 0
+        while position < len(words):
+            for size in range(min(MAX_PHRASE_WORDS, len(words) - position), 0, -1):
+                match = self.phrases.get(" ".join(words[position:position + size]))
+                if match is not None:
+                    found.append(match)
+                    position += size
+                    break
+            else:
+                rest.append(words[position])
+                position += 1
+        return found, rest
+
+
+class QueryRouter:
+    """Answers list, count and lookup questions from a knowledge snapshot"""
+
+    def __init__(self, max_listed: int = 25):
+        self.max_listed = max_listed
+        self._phrases: Tuple[Optional[object], Optional[PhraseIndex]] = (None, None)
+        self._lock = threading.Lock()
+
+    def has_index(self, snapshot) -> bool:
+        return self._phrases[0] is snapshot
+
+    def phrase_index(self, snapshot) -> PhraseIndex:
+        """The phrase index of a snapshot, built once per snapshot"""
+        owner, index = self._phrases
+        if owner is not snapshot:
+            with self._lock:
+                owner, index = self._phrases
+                if owner is not snapshot:
+                    index = PhraseIndex(snapshot)
+                    self._phrases = (snapshot, index)
+        return index
+
+    def route(self, question: str, snapshot) -> Optional[RoutedAnswer]:
+        """The answer to a structured question, or None when the LLM has to answer it"""
+        words = _words(question)
+        if not words or len(words) > MAX_QUESTION_WORDS:
+            return None
+        mentions, rest = self.phrase_index(snapshot).mentions(words)
+        roles = {ROLE_WORDS[word] for word in rest if word in ROLE_WORDS}
+        if any(word not in FILLER_WORDS and word not in ROLE_WORDS and word not in COMPANY_WORDS for word in rest):
+            return None
+
+        companies = [value for kind, value in mentions if kind == "company"]
+        facets: Dict[str, str] = {}
+        for kind, value in mentions:
+            if kind != "company":
+                if kind in facets:
+                    return None  # "Kenya and Uganda" could mean either or both
+                facets[kind] = value
+
+        if companies:
+            # "Which companies ..." mentioning a name asks about other companies
+            if len(companies) > 1 or facets or COMPANY_WORDS & set(rest):
+                return None
+            return self._lookup(snapshot.profiles_by_key[companies[0]], set(rest), roles)
+        if roles or not COMPANY_WORDS & set(rest):
+            return None
+        if "how" in rest and "many" in rest or "number" in rest:
+            return self._count(snapshot, facets)
+        if {"which", "what", "list", "show", "name", "all"} & set(rest):
+            return self._list(snapshot, facets)
+        return None
+
+    def _selection(self, snapshot, facets: Dict[str, str]) -> Tuple[List[str], str, int]:
+        """Names of (the first max_listed) companies with the facet values, a description of them and their number"""
+        table = snapshot.table
+        rows = table.select(facets.get("country"), facets.get("sector"))
+        names = [table.names[row] for row in rows[:self.max_listed]] if len(rows) else []
+        description = "companies"
+        if "sector" in facets:
+            description = f"{facets['sector']} companies"
+        if "country" in facets:
+            description += f" operating in {facets['country']}"
+        return names, description, len(rows)
+
+    def _list(self, snapshot, facets: Dict[str, str]) -> RoutedAnswer:
+        names, description, total = self._selection(snapshot, facets)
+        if not total:
+            return RoutedAnswer("list", f"I don't have any {description} in my knowledge base.")
+        listed = "\n".join(f"- {name}" for name in names)
+        more = f"\n...and {total - len(names)} more." if total > len(names) else ""
+        return RoutedAnswer("list", f"{description[0].upper()}{description[1:]} in my knowledge base ({total}):\n"
+                                    f"{listed}{more}")
+
+    def _count(self, snapshot, facets: Dict[str, str]) -> RoutedAnswer:
+        names, description, total = self._selection(snapshot, facets)
+        if total == 1:
+            description = description.replace("companies", "company", 1)
+        if not total:
+            return RoutedAnswer("count", f"I don't have any {description} in my knowledge base.")
+        answer = f"I have {total} {description} in my knowledge base"
+        if total <= 5:
+            answer += f": {_join(names)}"
+        return RoutedAnswer("count", answer + ".")
+
+    def _lookup(self, company: Dict, rest: set, roles: set) -> Optional[RoutedAnswer]:
+        asks = [
+            intent for intent, cue in (("people", roles or PEOPLE_WORDS & rest),
+                                       ("countries", COUNTRY_WORDS & rest),
+                                       ("sector", SECTOR_WORDS & rest))
+            if cue
+        ]
+        # "Who ... operates in ..." and the like are not simple lookups
+        if len(asks) != 1 or len(roles) > 1:
+            return None
+        name = company.get("company_name") or "This company"
+        if asks[0] == "countries":
+            countries = _values(company.get("countries"))
+            if not countries:
+                return RoutedAnswer("countries", f"I don't have information about where {name} operates.")
+            return RoutedAnswer("countries", f"{name} operates in {_join(countries)}.")
+        if asks[0] == "sector":
+            sectors = _values(company.get("sector"))
+            if not sectors:
+                return RoutedAnswer("sector", f"I don't have information about the sector of {name}.")
+            noun = "sector" if len(sectors) == 1 else "sectors"
+            return RoutedAnswer("sector", f"{name} is in the {_join(sectors)} {noun}.")
+        return self._people(name, [p for p in company.get("key_people") or [] if isinstance(p, dict)], roles)
+
+    def _people(self, name: str, people: List[Dict], roles: set) -> RoutedAnswer:
+        if not people:
+            return RoutedAnswer("people", f"I don't have information about the key people of {name}.")
+        if not roles:
+            return RoutedAnswer("people", f"Key people at {name}: {_join([_person(p) for p in people])}.")
+        role = next(iter(roles))
+        label = ROLE_LABELS.get(role, role)
+        holders = [p for p in people if ROLE_TITLE_WORDS[role] & set(_words(p.get("title") or ""))]
+        if not holders:
+            return RoutedAnswer("people", f"The profile of {name} doesn't name a {label}. Key people on record: "
+                                          f"{_join([_person(p) for p in people])}.")
+        if len(holders) == 1:
+            return RoutedAnswer("people", f"The {label} of {name} is {_person(holders[0])}.")
+        return RoutedAnswer("people", f"The {label}s of {name} are {_join([_person(p) for p in holders])}.")
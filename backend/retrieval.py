@@ -0,0 +1,280 @@
+"""
+Local retrieval index over the company knowledge base.
+
+Builds a BM25 inverted index (plus optional hashed embedding vectors) from the
+CompanyInfo fields of every profile, so the chat endpoint only puts the top-k
+relevant companies into the prompt instead of the whole knowledge base.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+INDEX_VERSION = 1
+
+# Field weights: a term found in the company name counts more than one
+# buried in the description.
+FIELD_WEIGHTS = {
+    "company_name": 3,
+    "countries": 2,
+    "sector": 2,
+    "key_people": 2,
+    "business_description": 1,
+    "transactions": 1,
+}
+
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "are", "as", "at", "be", "by", "can",
+    "company", "companies", "do", "does", "for", "from", "has", "have", "how",
+    "i", "in", "is", "it", "its", "me", "of", "on", "or", "tell", "that",
+    "the", "their", "there", "this", "to", "was", "what", "which", "who",
+    "with", "you",
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def profile_fields(company: Dict) -> Dict[str, str]:
+    """Flatten the searchable CompanyInfo fields of a profile into plain text"""
+    people = company.get("key_people") or []
+    return {
+        "company_name": company.get("company_name") or "",
+        "countries": " ".join(company.get("countries") or []),
+        "sector": " ".join(company.get("sector") or []),
+        "key_people": " ".join(
+            f"{person.get('name', '')} {person.get('title', '')}" for person in people
+        ),
+        "business_description": company.get("business_description") or "",
+        "transactions": company.get("transactions") or "",
+    }
+
+
+def profiles_fingerprint(profiles: List[Dict]) -> str:
+    """Stable hash of the profile contents, used to detect a stale persisted index"""
+    digest = hashlib.sha1()
+    for company in profiles:
+        digest.update(json.dumps(company, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class HashingEmbedder:
+    """Dependency-free local embedding: hashed word and character trigram features"""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        features = list(tokens)
+        for token in tokens:
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, text: str) -> List[float]:
+        """Return an L2-normalised vector for the text"""
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            bucket = int(hashlib.md5(feature.encode("utf-8")).hexdigest()[:8], 16)
+            sign = 1.0 if bucket & 1 else -1.0
+            vector[(bucket >> 1) % self.dimensions] += sign
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            return vector
+        return [round(value / norm, 5) for value in vector]
+
+
+def cosine(left: List[float], right: List[float]) -> float:
+    """Dot product of two normalised vectors"""
+    return sum(a * b for a, b in zip(left, right))
+
+
+class KnowledgeIndex:
+    """BM25 index over company profiles with optional embedding re-ranking"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, use_embeddings: bool = False,
+                 embedding_weight: float = 0.5, candidate_pool: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.use_embeddings = use_embeddings
+        self.embedding_weight = embedding_weight
+        self.candidate_pool = candidate_pool
+        self.embedder = HashingEmbedder()
+        self.documents: List[Dict] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_doc_length = 0.0
+        self.vectors: List[List[float]] = []
+        self.fingerprint = ""
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def build(self, profiles: List[Dict], previous: Optional["KnowledgeIndex"] = None) -> "KnowledgeIndex":
+        """
+        Index the given profiles, replacing any previous contents
+
+        Args:
+            profiles: Profiles to index, in document order
+            previous: Index whose entries are reused for the profiles that are the
+                same objects as its documents (a hot reload only tokenizes the
+                changed ones); the result then has no fingerprint and is not persisted
+        """
+        postings = defaultdict(list)
+        self.documents = list(profiles)
+        self.doc_lengths = [0] * len(self.documents)
+        self.vectors = [[] for _ in self.documents] if self.use_embeddings else []
+
+        # Previous document id -> new document id of the profiles carried over
+        carried = {}
+        if previous is not None and previous.use_embeddings == self.use_embeddings:
+            previous_ids = {id(company): doc_id for doc_id, company in enumerate(previous.documents)}
+            for doc_id, company in enumerate(self.documents):
+                previous_id = previous_ids.get(id(company))
+                if previous_id is not None:
+                    carried[previous_id] = doc_id
+            for term, term_postings in previous.postings.items():
+                for previous_id, count in term_postings:
+                    doc_id = carried.get(previous_id)
+                    if doc_id is not None:
+                        postings[term].append([doc_id, count])
+            for previous_id, doc_id in carried.items():
+                self.doc_lengths[doc_id] = previous.doc_lengths[previous_id]
+                if self.use_embeddings:
+                    self.vectors[doc_id] = previous.vectors[previous_id]
+        reused = set(carried.values())
+
+        for doc_id, company in enumerate(self.documents):
+            if doc_id in reused:
+                continue
+            fields = profile_fields(company)
+            term_counts = Counter()
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    term_counts[token] += weight
+            for term, count in term_counts.items():
+                postings[term].append([doc_id, count])
+            self.doc_lengths[doc_id] = sum(term_counts.values())
+            if self.use_embeddings:
+                self.vectors[doc_id] = self.embedder.embed(" ".join(fields.values()))
+
+        self.postings = dict(postings)
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self.fingerprint = profiles_fingerprint(self.documents) if previous is None else ""
+        return self
+
+    def _bm25_scores(self, query_terms: List[str]) -> Dict[int, float]:
+        scores = defaultdict(float)
+        total_docs = len(self.documents)
+        for term in set(query_terms):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+            doc_freq = len(term_postings)
+            idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for doc_id, term_freq in term_postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_doc_length or 1)
+                scores[doc_id] += idf * term_freq * (self.k1 + 1) / (term_freq + self.k1 * length_norm)
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Return the top_k most relevant profiles for the query
+
+        Args:
+            query: Free-text question (optionally with recent conversation context)
+            top_k: Maximum number of profiles to return
+
+        Returns:
+            Profiles ordered by descending relevance (empty if nothing matched)
+        """
+        scores = self._bm25_scores(tokenize(query))
+        if not scores:
+            return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if self.use_embeddings and self.vectors:
+            candidates = ranked[:self.candidate_pool]
+            best = candidates[0][1] or 1.0
+            query_vector = self.embedder.embed(query)
+            ranked = sorted(
+                (
+                    (doc_id, score / best + self.embedding_weight * cosine(query_vector, self.vectors[doc_id]))
+                    for doc_id, score in candidates
+                ),
+                key=lambda item: (-item[1], item[0]),
+            )
+
+        return [self.documents[doc_id] for doc_id, _ in ranked[:top_k]]
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "k1": self.k1,
+            "b": self.b,
+            "use_embeddings": self.use_embeddings,
+            "documents": self.documents,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "avg_doc_length": self.avg_doc_length,
+            "vectors": self.vectors,
+        }
+
+    def save(self, path: str):
+        """Persist the index as JSON (written atomically)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["KnowledgeIndex"]:
+        """Load a persisted index, or None if missing, unreadable or from another version"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: Dict, documents: Optional[List[Dict]] = None) -> "KnowledgeIndex":
+        """Index from to_dict() output (documents may be passed separately to share the profile objects)"""
+        index = cls(k1=data["k1"], b=data["b"], use_embeddings=data["use_embeddings"])
+        index.fingerprint = data["fingerprint"]
+        index.documents = documents if documents is not None else data["documents"]
+        index.postings = data["postings"]
+        index.doc_lengths = data["doc_lengths"]
+        index.avg_doc_length = data["avg_doc_length"]
+        index.vectors = data["vectors"]
+        return index
+
+    @classmethod
+    def load_or_build(cls, profiles: List[Dict], path: str, use_embeddings: bool = False) -> "KnowledgeIndex":
+        """Reuse the persisted index when it matches the profiles, otherwise rebuild and save it"""
+        index = cls.load(path)
+        if (index is not None and index.fingerprint == profiles_fingerprint(profiles)
+                and index.use_embeddings == use_embeddings):
+            return index
+
+        index = cls(use_embeddings=use_embeddings).build(profiles)
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Could not persist knowledge index to {path}: {e}")
+        return index
@@ -0,0 +1,148 @@
+"""
+Compact, memory-mapped knowledge snapshot shared by server workers.
+
+In production mode (start_server.py --production) the supervisor loads the
+profile store, builds the retrieval index and renders every context block
+once, and writes the result to one file:
+
+    MAGIC | header length (4 bytes, little endian) | header (JSON) | sections
+
+Sections are marshal-encoded (profiles, index, context blocks). Each worker
+maps the file read-only and decodes the sections instead of reading every
+profile from the store, fingerprinting them and rebuilding the index; the
+mapped pages come from the OS page cache, so N workers read the file from
+disk once. marshal is specific to the Python version, which the header
+records: a file written by another version (or another format) is ignored
+and the worker falls back to a normal load.
+
+Usage (from backend/):
+    python snapshot_file.py --output ../index/knowledge_snapshot.bin
+"""
+import argparse
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+MAGIC = b"AKSNAP01"
+FORMAT_VERSION = 1
+SECTIONS = ("profiles", "index", "context_blocks")
+
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def _python_tag() -> str:
+    return f"{sys.implementation.name}-{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def write_snapshot_file(path: str, profiles: List[Dict], index_data: Dict, context_blocks: List[str],
+                        store_version: tuple = (), use_embeddings: bool = False) -> int:
+    """
+    Write a snapshot atomically
+
+    Args:
+        profiles: Profiles in the snapshot's key order (they double as the index documents)
+        index_data: KnowledgeIndex.to_dict() without "documents"
+        context_blocks: Rendered block of each profile, in the same order
+
+    Returns:
+        Size of the file in bytes
+    """
+    payloads = [marshal.dumps(profiles), marshal.dumps(index_data), marshal.dumps(context_blocks)]
+    sections, offset = {}, 0
+    for name, payload in zip(SECTIONS, payloads):
+        sections[name] = [offset, len(payload)]
+        offset += len(payload)
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "python": _python_tag(),
+        "store_version": list(store_version),
+        "use_embeddings": use_embeddings,
+        "profiles": len(profiles),
+        "created_at": time.time(),
+        "sections": sections,
+    }).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for payload in payloads:
+                f.write(payload)
+        # Workers that already mapped the old file keep reading it until they close it
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(MAGIC) + _HEADER_LENGTH.size + len(header) + offset
+
+
+def read_snapshot_file(path: str, use_embeddings: bool = False) -> Optional[Dict]:
+    """
+    Map a snapshot file and decode it
+
+    Returns:
+        {"header", "profiles", "index", "context_blocks"}, or None when the file
+        is missing, damaged, or written by another format or Python version
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return _decode(view, use_embeddings)
+            finally:
+                view.release()
+    except (OSError, ValueError, EOFError, TypeError, KeyError, struct.error) as e:
+        print(f"Knowledge snapshot file {path} not usable: {e}")
+        return None
+
+
+def _decode(view: memoryview, use_embeddings: bool) -> Optional[Dict]:
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not a knowledge snapshot file")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack(view[len(MAGIC):start])
+    header = json.loads(bytes(view[start:start + header_length]))
+    if header.get("format") != FORMAT_VERSION or header.get("python") != _python_tag():
+        return None
+    if header.get("use_embeddings") != use_embeddings:
+        return None
+
+    body = start + header_length
+    decoded = {"header": header}
+    for name in SECTIONS:
+        offset, length = header["sections"][name]
+        decoded[name] = marshal.loads(view[body + offset:body + offset + length])
+    if not (len(decoded["profiles"]) == len(decoded["context_blocks"]) == header["profiles"]):
+        raise ValueError("section lengths do not match the header")
+    header["store_version"] = tuple(header["store_version"])
+    return decoded
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Write the knowledge snapshot file shared by server workers")
+    parser.add_argument("--output", required=True, help="Snapshot file to write")
+    args = parser.parse_args()
+
+    # The knowledge base is configured exactly as the server configures it
+    from main import create_company_knowledge_base
+
+    started = time.perf_counter()
+    knowledge = create_company_knowledge_base()
+    snapshot = knowledge.save_snapshot_file(args.output)
+    print(f"📦 Wrote knowledge snapshot of {len(snapshot.companies)} companies to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KiB, {time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -44,6 +44,55 @@ function addMessage(content, isUser = false) {
     chatMessages.scrollTop = chatMessages.scrollHeight;
     
     console.log('Message added successfully');
+    return contentDiv;
+}
+
+function appendToMessage(contentDiv, text) {
+    contentDiv.textContent += text;
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+// Read server-sent events from a fetch response, calling onEvent(name, data)
+// for each complete event as it arrives
+function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    function handleFrame(frame) {
+        let eventName = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                eventName = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        if (dataLines.length) {
+            onEvent(eventName, JSON.parse(dataLines.join('\n')));
+        }
+    }
+
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (done) {
+                if (buffer.trim()) {
+                    handleFrame(buffer);
+                }
+                return;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+            return pump();
+        });
+    }
+
+    return pump();
 }
 
 function clearHistory() {
@@ -102,8 +151,10 @@ function sendMessage() {
     sendButton.textContent = 'Sending...';
     loading.style.display = 'block';
 
-    // Make the API call
-    fetch('/chat', {
+    // Stream the reply token by token; the bot message is created on the first token
+    let botMessage = null;
+
+    fetch('/chat/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -115,13 +166,26 @@ function sendMessage() {
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        return response.json();
+        return readEventStream(response, (eventName, data) => {
+            if (eventName === 'done') {
+                console.log('Chat stream finished:', data.ttft_ms, 'ms to first token,', data.total_ms, 'ms total');
+                return;
+            }
+            if (eventName === 'error') {
+                // The model failed mid-reply: the text so far is incomplete
+                console.error('Chat stream failed after', data.response.length, 'characters');
+                appendToMessage(botMessage, '\n\n' + data.error);
+                return;
+            }
+            if (!botMessage) {
+                loading.style.display = 'none';
+                botMessage = addMessage('', false);
+            }
+            appendToMessage(botMessage, data.token);
+        });
     })
-    .then(data => {
-        console.log('Chat API response data:', data);
-        if (data.response) {
-            addMessage(data.response, false);
-        } else {
+    .then(() => {
+        if (!botMessage) {
             addMessage('Sorry, I received an empty response.', false);
         }
     })
@@ -2,16 +2,74 @@
 """
 Startup script for the African Companies Chat Assistant.
 This script makes it easy to start the FastAPI server.
+
+Development (default): one worker with auto-reload.
+Production (--production): N workers (--workers, default CPU count), no
+auto-reload. The knowledge base is loaded once into a snapshot file that every
+worker maps read-only (backend/snapshot_file.py) instead of each worker
+parsing the whole profile store. Send SIGHUP to this script to rebuild the
+snapshot and restart the workers one at a time without dropping requests.
 """
 
 import os
 import sys
+import signal
 import subprocess
 import argparse
 import webbrowser
 import time
 from pathlib import Path
 
+def build_knowledge_snapshot(backend_dir: Path, snapshot_path: Path) -> bool:
+    """Write the shared knowledge snapshot file (workers fall back to the profile store if this fails)"""
+    result = subprocess.run([sys.executable, "snapshot_file.py", "--output", str(snapshot_path)], cwd=backend_dir)
+    if result.returncode != 0:
+        print("⚠️  Warning: could not build the knowledge snapshot; workers will load the profile store")
+    return result.returncode == 0
+
+def run_production(args, project_root: Path, backend_dir: Path) -> int:
+    """Run uvicorn with several workers over one shared knowledge snapshot"""
+    workers = args.workers or os.cpu_count() or 1
+    snapshot_path = project_root / "index" / "knowledge_snapshot.bin"
+    build_knowledge_snapshot(backend_dir, snapshot_path)
+
+    env = dict(os.environ, KNOWLEDGE_SNAPSHOT_PATH=str(snapshot_path))
+    if workers > 1 and env.get("CONVERSATION_STORE_URL", "memory://").startswith("memory://"):
+        # Requests of one session can land on any worker, so history must be shared
+        env["CONVERSATION_STORE_URL"] = f"sqlite:///{project_root / 'data' / 'conversations.sqlite'}"
+        print(f"💬 Chat history shared by the workers in {env['CONVERSATION_STORE_URL']}")
+
+    cmd = [
+        sys.executable, "-m", "uvicorn",
+        "main:app",
+        "--host", args.host,
+        "--port", str(args.port),
+        "--workers", str(workers),
+        "--timeout-graceful-shutdown", str(args.graceful_timeout),
+    ]
+    print(f"🏭 Production mode: {workers} worker(s), no auto-reload")
+    process = subprocess.Popen(cmd, env=env)
+
+    def restart_workers(signum, frame):
+        print("🔄 SIGHUP: rebuilding the knowledge snapshot and restarting workers one at a time")
+        build_knowledge_snapshot(backend_dir, snapshot_path)
+        # uvicorn starts each new worker before stopping the old one it replaces
+        process.send_signal(signal.SIGHUP)
+
+    def stop_workers(signum, frame):
+        process.send_signal(signal.SIGTERM)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, restart_workers)
+    signal.signal(signal.SIGTERM, stop_workers)
+    try:
+        return process.wait()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches uvicorn too; wait for in-flight requests to finish
+        process.wait()
+        print("\n👋 Server stopped by user")
+        return 0
+
 def main():
     """Start the FastAPI server for the African Companies Chat Assistant."""
     
@@ -21,6 +79,12 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind the server to (default: 0.0.0.0)")
     parser.add_argument("--no-reload", action="store_true", help="Disable auto-reload")
     parser.add_argument("--no-browser", action="store_true", help="Don't automatically open browser")
+    parser.add_argument("--production", action="store_true",
+                        help="Run several workers over a shared knowledge snapshot, without auto-reload")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes in production mode (default: CPU count)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="Seconds workers get to finish in-flight requests when stopping (default: 30)")
     args = parser.parse_args()
     
     # Get the project root directory
@@ -57,6 +121,14 @@ def main():
     print("⏹️  Press Ctrl+C to stop the server")
     print("-" * 50)
     
+    if args.production:
+        try:
+            return run_production(args, project_root, backend_dir)
+        except FileNotFoundError:
+            print("❌ Error: uvicorn not found. Please install requirements:")
+            print("pip install -r requirements.txt")
+            return 1
+    
     # Prepare uvicorn command
     cmd = [
         sys.executable, "-m", "uvicorn", 